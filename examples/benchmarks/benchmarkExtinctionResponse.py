@@ -0,0 +1,79 @@
+"""
+Validate the approximate galactic extinction of SedList's
+galacticDustResponse mode against the exact path (Sed.addDust applied
+to every Sed) and compare their speed.
+
+An ExtinctionResponseSurface is built for the cartoon Kurucz SEDs in
+tests/cartoonSedTestData/starSed/kurucz, ExtinctionResponseSurface.validate
+reports the largest error of its fits, and then N stars with random
+templates, magNorms and A(V) are loaded into SedLists with and without
+galacticDustResponse and their magnitudes are compared.
+
+usage: python benchmarkExtinctionResponse.py [n_sed ...]
+"""
+from __future__ import print_function
+from builtins import range
+import os
+import sys
+import time
+import numpy
+from lsst.utils import getPackageDir
+from lsst.sims.photUtils import Bandpass, BandpassDict, SedList, ExtinctionResponseSurface
+
+
+def make_bandpass_dict(wavelen):
+    """
+    Six top-hat bandpasses spanning wavelen
+    """
+    edges = numpy.linspace(wavelen[0], wavelen[-1], 7)
+    bandpass_list = []
+    for ix in range(6):
+        sb = numpy.where(numpy.logical_and(wavelen >= edges[ix], wavelen < edges[ix+1]),
+                         0.8, 0.0)
+        bandpass_list.append(Bandpass(wavelen=wavelen, sb=sb))
+    return BandpassDict(bandpass_list, ['u', 'g', 'r', 'i', 'z', 'y'])
+
+
+def time_magnitudes(bandpass_dict, sed_names, mag_norms, av_list, file_dir, response=None):
+    t_start = time.time()
+    sed_list = SedList(sed_names, mag_norms, fileDir=file_dir, galacticAvList=av_list,
+                       wavelenMatch=bandpass_dict.wavelenMatch,
+                       galacticDustResponse=response)
+    mags = bandpass_dict.magListForSedList(sed_list)
+    return time.time() - t_start, mags
+
+
+if __name__ == "__main__":
+
+    n_sed_list = [1000, 10000, 50000]
+    if len(sys.argv) > 1:
+        n_sed_list = [int(arg) for arg in sys.argv[1:]]
+
+    rng = numpy.random.RandomState(42)
+    bandpass_dict = make_bandpass_dict(numpy.arange(300.0, 1200.0, 1.0))
+
+    file_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests', 'cartoonSedTestData',
+                            'starSed', 'kurucz')
+    template_list = sorted(os.listdir(file_dir))
+
+    t_start = time.time()
+    response = ExtinctionResponseSurface(bandpass_dict, template_list, fileDir=file_dir,
+                                         avMax=3.0)
+    build_time = time.time() - t_start
+    max_error = response.validate()
+    print('%d templates; surface built in %.3f s' % (len(template_list), build_time))
+    print('largest fit error (validate): %.2e mag' % numpy.nanmax(max_error))
+
+    print('%10s %14s %14s %16s' % ('N', 'exact (s)', 'surface (s)', 'max |dmag|'))
+    for n_sed in n_sed_list:
+        sed_names = [template_list[ix] for ix in rng.randint(0, len(template_list), n_sed)]
+        mag_norms = rng.random_sample(n_sed)*5.0 + 15.0
+        av_list = rng.random_sample(n_sed)*3.0
+
+        exact_time, exact_mags = time_magnitudes(bandpass_dict, sed_names, mag_norms,
+                                                 av_list, file_dir)
+        fast_time, fast_mags = time_magnitudes(bandpass_dict, sed_names, mag_norms,
+                                               av_list, file_dir, response=response)
+
+        print('%10d %14.4f %14.4f %16.2e' % (n_sed, exact_time, fast_time,
+                                            numpy.nanmax(numpy.abs(exact_mags - fast_mags))))
@@ -0,0 +1,98 @@
+"""
+Compare the speed of read_ascii_columns (the reader behind
+Sed.readSED_flambda, Sed.readSED_fnu and Bandpass.readThroughput)
+against the readers those methods used to use: numpy.genfromtxt and
+a line-by-line python loop.
+
+The test files are synthetic SEDs written to a temporary directory,
+both plain and gzipped.
+
+usage: python benchmarkFileReading.py [n_rows] [n_repeats]
+"""
+from __future__ import print_function
+from builtins import range
+import sys
+import os
+import gzip
+import time
+import shutil
+import tempfile
+import numpy
+from lsst.sims.photUtils.FileUtils import read_ascii_columns
+
+
+def read_genfromtxt(file_name):
+    dtype = numpy.dtype([('wavelen', float), ('flambda', float)])
+    data = numpy.genfromtxt(file_name, dtype=dtype)
+    return data['wavelen'], data['flambda']
+
+
+def read_python_loop(file_name):
+    if file_name.endswith('.gz'):
+        f = gzip.open(file_name, 'rt')
+    else:
+        f = open(file_name, 'r')
+    wavelen = []
+    flambda = []
+    for line in f:
+        if line.startswith('#') or line.startswith('$') or line.startswith('!'):
+            continue
+        values = line.split()
+        if len(values) < 2:
+            continue
+        wavelen.append(float(values[0]))
+        flambda.append(float(values[1]))
+    f.close()
+    return numpy.array(wavelen), numpy.array(flambda)
+
+
+def time_reader(reader, file_name, n_repeats):
+    best = None
+    for ix in range(n_repeats):
+        t_start = time.time()
+        reader(file_name)
+        elapsed = time.time() - t_start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+if __name__ == "__main__":
+
+    n_rows = 20000
+    n_repeats = 5
+    if len(sys.argv) > 1:
+        n_rows = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_repeats = int(sys.argv[2])
+
+    rng = numpy.random.RandomState(42)
+    wavelen = numpy.sort(rng.random_sample(n_rows)*3000.0 + 9.0)
+    flambda = rng.random_sample(n_rows)*1.0e-10
+
+    scratch_dir = tempfile.mkdtemp(prefix='benchmarkFileReading')
+    plain_name = os.path.join(scratch_dir, 'sed.txt')
+    zipped_name = os.path.join(scratch_dir, 'sed.txt.gz')
+    lines = ['# wavelen (nm) flambda (ergs/cm^2/s/nm)\n']
+    lines += ['%.6e %.6e\n' % (ww, ff) for ww, ff in zip(wavelen, flambda)]
+    with open(plain_name, 'w') as output_file:
+        output_file.writelines(lines)
+    with gzip.open(zipped_name, 'wt') as output_file:
+        output_file.writelines(lines)
+
+    for file_name in (plain_name, zipped_name):
+        control = read_genfromtxt(file_name)
+        test = read_ascii_columns(file_name)
+        numpy.testing.assert_array_equal(control[0], test[0])
+        numpy.testing.assert_array_equal(control[1], test[1])
+
+    print('best of %d reads of a %d row SED' % (n_repeats, n_rows))
+    print('%20s %12s %12s' % ('reader', 'plain (s)', 'gzipped (s)'))
+    for label, reader in (('genfromtxt', read_genfromtxt),
+                          ('python loop', read_python_loop),
+                          ('read_ascii_columns', read_ascii_columns)):
+        print('%20s %12.4f %12.4f' % (label,
+                                      time_reader(reader, plain_name, n_repeats),
+                                      time_reader(reader, zipped_name, n_repeats)))
+
+    shutil.rmtree(scratch_dir)
@@ -0,0 +1,101 @@
+"""
+Compare the speed of BandpassDict.magArrayForSedList and
+BandpassDict.fluxArrayForSedList (which stack the flambda of the Seds
+into blocks and calculate their fluxes with matrix products) against
+the algorithm those methods used to use: a python loop calling
+Sed.manyFluxCalc on every Sed, followed by the conversion of the
+resulting list of lists into a dtyped array one row tuple at a time.
+
+The Seds are built from a handful of synthetic templates on the
+BandpassDict's wavelength grid (Seds built from the same template share
+their arrays, so that a million of them fit in memory) and are placed
+directly into a SedList, so that reading and normalizing them is not
+timed.  The legacy algorithm is only timed for N <= max_legacy_n (it
+takes minutes for N = 10^6).
+
+usage: python benchmarkSedListPhotometry.py [max_legacy_n] [n_sed ...]
+"""
+from __future__ import print_function
+from builtins import range
+import sys
+import time
+import numpy
+from lsst.sims.photUtils import Bandpass, BandpassDict, Sed, SedList
+
+
+def make_bandpass_dict(wavelen):
+    """
+    Six top-hat bandpasses spanning wavelen
+    """
+    edges = numpy.linspace(wavelen[0], wavelen[-1], 7)
+    bandpass_list = []
+    for ix in range(6):
+        sb = numpy.where(numpy.logical_and(wavelen >= edges[ix], wavelen < edges[ix+1]),
+                         0.8, 0.0)
+        bandpass_list.append(Bandpass(wavelen=wavelen, sb=sb))
+    return BandpassDict(bandpass_list, ['u', 'g', 'r', 'i', 'z', 'y'])
+
+
+def make_sed_list(wavelen, n_sed, n_templates, rng):
+    sed_list = SedList([], [], wavelenMatch=wavelen)
+    templates = []
+    for ix in range(n_templates):
+        temperature = 3000.0 + 1000.0*ix
+        flambda = 1.0/(wavelen**5*(numpy.exp(1.439e7/(wavelen*temperature)) - 1.0))
+        templates.append(flambda*1.0e-10/flambda.max())
+    for ix in rng.randint(0, n_templates, n_sed):
+        sed = Sed()
+        sed.wavelen = wavelen
+        sed.flambda = templates[ix]
+        sed_list._sed_list.append(sed)
+    return sed_list
+
+
+def legacy_mag_array(bandpass_dict, sed_list):
+    mag_list = []
+    for sed in sed_list:
+        sed.flambdaTofnu()
+        mag_list.append(sed.manyMagCalc(bandpass_dict.phiArray, bandpass_dict.wavelenStep))
+    mag_list = numpy.array(mag_list)
+    dtype = numpy.dtype([(bp, float) for bp in bandpass_dict.keys()])
+    return numpy.array([tuple(row) for row in mag_list], dtype=dtype)
+
+
+def time_call(function, *args):
+    t_start = time.time()
+    result = function(*args)
+    return time.time() - t_start, result
+
+
+if __name__ == "__main__":
+
+    max_legacy_n = 100000
+    n_sed_list = [1000, 100000, 1000000]
+    if len(sys.argv) > 1:
+        max_legacy_n = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        n_sed_list = [int(arg) for arg in sys.argv[2:]]
+
+    rng = numpy.random.RandomState(42)
+    wavelen = numpy.arange(300.0, 1200.0, 1.0)
+    bandpass_dict = make_bandpass_dict(wavelen)
+
+    print('%6d wavelength points, %d bandpasses' % (len(wavelen), len(bandpass_dict)))
+    print('%10s %14s %14s %14s' % ('N', 'legacy (s)', 'magArray (s)', 'fluxArray (s)'))
+    for n_sed in n_sed_list:
+        sed_list = make_sed_list(wavelen, n_sed, 10, rng)
+
+        mag_time, mag_array = time_call(bandpass_dict.magArrayForSedList, sed_list)
+        flux_time, flux_array = time_call(bandpass_dict.fluxArrayForSedList, sed_list)
+
+        if n_sed <= max_legacy_n:
+            legacy_time, legacy_array = time_call(legacy_mag_array, bandpass_dict, sed_list)
+            for bp in bandpass_dict.keys():
+                numpy.testing.assert_allclose(mag_array[bp], legacy_array[bp],
+                                              rtol=0.0, atol=1.0e-10)
+            legacy_time = '%14.4f' % legacy_time
+        else:
+            legacy_time = '%14s' % '-'
+
+        print('%10d %s %14.4f %14.4f' % (n_sed, legacy_time, mag_time, flux_time))
+        del sed_list, mag_array, flux_array
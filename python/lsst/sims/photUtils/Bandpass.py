@@ -63,9 +63,10 @@ import os
 import warnings
 import numpy
 import scipy.interpolate as interpolate
-import gzip
 from .PhysicalParameters import PhysicalParameters
+from .FileUtils import read_ascii_columns
 from .Sed import Sed  # For ZP_t and M5 calculations. And for 'fast mags' calculation.
+from .WavelenGrid import uniform_wavelen_grid, _wavelen_grid_matches_limits
 
 __all__ = ["Bandpass"]
 
@@ -199,37 +200,15 @@ class Bandpass(object):
                                     wavelen_min=self.wavelen_min, wavelen_max=self.wavelen_max,
                                     wavelen_step=self.wavelen_step)
         # Filename is single file, now try to open file and read data.
+        # The throughput file should have wavelength(A), throughput(Sb) as first two columns.
         try:
-            if filename.endswith('.gz'):
-                f = gzip.open(filename, 'rt')
-            else:
-                f = open(filename, 'r')
+            wavelen, sb = read_ascii_columns(filename)
         except IOError:
-            try:
-                if filename.endswith('.gz'):
-                    f = open(filename[:-3], 'r')
-                else:
-                    f = gzip.open(filename+'.gz', 'rt')
-            except IOError:
-                raise IOError('The throughput file %s does not exist' %(filename))
-        # The throughput file should have wavelength(A), throughput(Sb) as first two columns.
-        wavelen = []
-        sb = []
-        for line in f:
-            if line.startswith("#") or line.startswith('$') or line.startswith('!'):
-                continue
-            values = line.split()
-            if len(values)<2:
-                continue
-            if (values[0] == '$') or (values[0] =='#') or (values[0] =='!'):
-                continue
-            wavelen.append(float(values[0]))
-            sb.append(float(values[1]))
-        f.close()
+            raise IOError('The throughput file %s does not exist' %(filename))
         self.bandpassname = filename
         # Set up wavelen/sb.
-        self.wavelen = numpy.array(wavelen, dtype='float')
-        self.sb = numpy.array(sb, dtype='float')
+        self.wavelen = wavelen
+        self.sb = sb
         # Check that wavelength is monotonic increasing and non-repeating in wavelength. (Sort on wavelength).
         if len(self.wavelen) != len(numpy.unique(self.wavelen)):
             raise ValueError('The wavelength values in file %s are non-unique.' %(filename))
@@ -265,8 +244,8 @@ class Bandpass(object):
         # Set wavelen limits for this object, if any updates have been given.
         self.setWavelenLimits(wavelen_min, wavelen_max, wavelen_step)
         # Set up wavelen/sb on grid.
-        self.wavelen = numpy.arange(self.wavelen_min, self.wavelen_max+self.wavelen_step/2., self.wavelen_step,
-                                    dtype='float')
+        self.wavelen = numpy.copy(uniform_wavelen_grid(self.wavelen_min, self.wavelen_max,
+                                                       self.wavelen_step).wavelen)
         self.phi = None
         self.sb = numpy.ones(len(self.wavelen), dtype='float')
         # Set up a temporary bandpass object to hold data from each file.
@@ -327,19 +306,9 @@ class Bandpass(object):
         update_self = self.checkUseSelf(wavelen, wavelen)
         if update_self:
             wavelen = self.wavelen
-        wavelen_max_in = wavelen[len(wavelen)-1]
-        wavelen_min_in = wavelen[0]
-        wavelen_step_in = wavelen[1]-wavelen[0]
-        # Start check if data is already gridded.
-        need_regrid=True
-        # First check minimum/maximum and first step in array.
-        if ((wavelen_min_in == wavelen_min) and (wavelen_max_in == wavelen_max)):
-            # Then check on step size.
-            stepsize = numpy.unique(numpy.diff(wavelen))
-            if (len(stepsize) == 1) and (stepsize[0] == wavelen_step):
-                need_regrid = False
-        # At this point, need_grid=True unless it's proven to be False, so return value.
-        return need_regrid
+        # Check minimum/maximum and step size of the array (this is a comparison of
+        # limits if wavelen is the array of a WavelenGrid).
+        return not _wavelen_grid_matches_limits(wavelen, wavelen_min, wavelen_max, wavelen_step)
 
     def resampleBandpass(self, wavelen=None, sb=None,
                          wavelen_min=None, wavelen_max=None, wavelen_step=None):
@@ -359,8 +328,9 @@ class Bandpass(object):
         # Now, on with the resampling.
         if (wavelen.min() > wavelen_max) or (wavelen.max() < wavelen_min):
             raise Exception("No overlap between known wavelength range and desired wavelength range.")
-        # Set up gridded wavelength.
-        wavelen_grid = numpy.arange(wavelen_min, wavelen_max+wavelen_step/2.0, wavelen_step, dtype='float')
+        # Set up gridded wavelength (a copy of the WavelenGrid with these limits,
+        # which is what numpy.arange would give).
+        wavelen_grid = numpy.copy(uniform_wavelen_grid(wavelen_min, wavelen_max, wavelen_step).wavelen)
         # Do the interpolation of wavelen/sb onto the grid. (note wavelen/sb type failures will die here).
         f = interpolate.interp1d(wavelen, sb, fill_value=0, bounds_error=False)
         sb_grid = f(wavelen_grid)
@@ -1,15 +1,51 @@
 from builtins import zip
 from builtins import object
+from builtins import range
 import copy
 import numpy
 import os
+import multiprocessing
 from lsst.utils import getPackageDir
 from collections import OrderedDict
 from .Bandpass import Bandpass
 from .Sed import Sed
+from .SedList import SedList
+from .SedMatrixList import SedMatrixList
+from .WavelenGrid import get_wavelen_grid
+from .SedUtils import _getNormalizingMag
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
 
 __all__ = ["BandpassDict"]
 
+# the number of Seds whose flambda are stacked into a single block
+# (and multiplied by the phiArray at once) by
+# BandpassDict._fluxArrayForSedList
+_flux_block_rows = 1024
+
+# the parameters of the SedList constructor which have one value per Sed
+_sed_list_columns = ('sedNameList', 'magNormList', 'redshiftList',
+                     'internalAvList', 'galacticAvList')
+
+
+def _sedListPhotometry(bandpassDict, columns, sedListKwargs, indices, magnitudes):
+    """
+    Load the Seds described by columns (a dict of the per-Sed parameters of
+    the SedList constructor) into a SedList constructed with sedListKwargs
+    and return their magnitudes (if magnitudes is True) or fluxes in the
+    bandpasses of bandpassDict.  This is the work done by each process
+    of BandpassDict.magListForSedsInParallel.
+    """
+    kwargs = dict(sedListKwargs)
+    kwargs.update(columns)
+    sedList = SedList(**kwargs)
+    if magnitudes:
+        return bandpassDict._magArrayForSedList(sedList, indices=indices)
+    return bandpassDict._fluxArrayForSedList(sedList, indices=indices)
+
 class BandpassDict(object):
     """
     This class will wrap an OrderedDict of Bandpass instantiations.
@@ -41,6 +77,7 @@ class BandpassDict(object):
         with those Bandpasses.  These will be used as keys for the BandpassDict.
         """
         self._bandpassDict = OrderedDict()
+        self._wavelen_grid = None
         self._wavelen_match = None
         for bandpassName, bandpass in zip(bandpassNameList, bandpassList):
 
@@ -49,8 +86,11 @@ class BandpassDict(object):
                                    + "to BandpassDict")
 
             self._bandpassDict[bandpassName] = copy.deepcopy(bandpass)
-            if self._wavelen_match is None:
-                self._wavelen_match = self._bandpassDict[bandpassName].wavelen
+            if self._wavelen_grid is None:
+                # Seds resampled onto self._wavelen_match share its array, so that
+                # checking whether they need resampling is an identity comparison
+                self._wavelen_grid = get_wavelen_grid(bandpass.wavelen)
+                self._wavelen_match = self._wavelen_grid.wavelen
 
         dummySed = Sed()
         self._phiArray, self._wavelenStep = dummySed.setupPhiArray(list(self._bandpassDict.values()))
@@ -209,6 +249,9 @@ class BandpassDict(object):
             #This is to prevent the two arrays from getting out synch
             #(e.g. renormalizing flambda but forgettint to renormalize fnu)
             #
+            #flambdaTofnu() does nothing if it has already calculated fnu
+            #from the current flambda (e.g. for another BandpassDict)
+            #
             sedobj.flambdaTofnu()
 
             if indices is not None:
@@ -283,6 +326,141 @@ class BandpassDict(object):
         return outputDict
 
 
+    def _phiArrayForFlambda(self, indices=None):
+        """
+        Return the rows of the phiArray (all of them if indices is None)
+        multiplied by the conversion from flambda to fnu and by wavelenStep,
+        so that the product of a 2-D array of flambda sampled on
+        self._wavelen_match with the transpose of the result is the
+        2-D array of fluxes.
+        """
+        physParams = Sed()._physParams
+        conversion = (self._wavelen_match*self._wavelen_match*physParams.nm2m /
+                      physParams.lightspeed*physParams.ergsetc2jansky)
+        if indices is None:
+            phiArray = self._phiArray
+        else:
+            phiArray = self._phiArray[indices]
+        return phiArray*(conversion*self._wavelenStep)
+
+
+    def _fluxArrayForSedList(self, sedList, indices=None, output=None):
+        """
+        This is a private method which calculates the fluxes of all of the
+        Seds in sedList in each of the bandpasses stored in this Dict,
+        writing them into output (a 2-D numpy array whose rows are Seds and
+        whose columns are bandpasses; it is allocated if None).  The fluxes
+        of bandpasses not in indices are set to numpy.NaN.
+
+        If the Seds in sedList are sampled on self._wavelen_match, their
+        flambda are stacked into blocks of _flux_block_rows rows (the
+        flambdaMatrix of a SedMatrixList is used as is) and the fluxes of
+        each block are calculated with a single matrix product, with the
+        conversion from flambda to fnu folded into the phiArray.  Otherwise,
+        each Sed is passed through fluxListForSed.
+
+        If the galactic dust of sedList is evaluated from its
+        galacticDustResponse, the fluxes are then extincted accordingly.
+
+        Returns output
+        """
+        n_sed = len(sedList)
+        n_bp = len(self._bandpassDict)
+        if output is None:
+            output = numpy.empty((n_sed, n_bp), dtype=float)
+
+        if indices is not None:
+            indices = list(indices)
+            output[:] = numpy.NaN
+            if len(indices) == n_bp and indices == list(range(n_bp)):
+                indices = None
+
+        if n_sed == 0:
+            return output
+
+        if sedList.wavelenMatch is None or \
+           Sed()._needResample(wavelen_match=self._wavelen_match, wavelen=sedList.wavelenMatch):
+            for ix, sed_obj in enumerate(sedList):
+                output[ix] = self.fluxListForSed(sed_obj, indices=indices)
+            return self._applyDeltaMags(sedList, indices, output)
+
+        phiArrayT = self._phiArrayForFlambda(indices=indices).T
+        if isinstance(sedList, SedMatrixList):
+            flambdaMatrix = sedList.flambdaMatrix
+        else:
+            flambdaMatrix = None
+            block = numpy.empty((min(n_sed, _flux_block_rows), len(self._wavelen_match)),
+                                dtype=float)
+
+        for i_start in range(0, n_sed, _flux_block_rows):
+            i_end = min(i_start + _flux_block_rows, n_sed)
+            if flambdaMatrix is not None:
+                sub_block = flambdaMatrix[i_start:i_end]
+            else:
+                sub_block = block[:i_end-i_start]
+                for ix in range(i_start, i_end):
+                    sed_obj = sedList[ix]
+                    if sed_obj.wavelen is None:
+                        sub_block[ix-i_start] = numpy.NaN
+                    else:
+                        sub_block[ix-i_start] = sed_obj.flambda
+
+            if indices is None:
+                numpy.dot(sub_block, phiArrayT, out=output[i_start:i_end])
+            else:
+                output[i_start:i_end, indices] = numpy.dot(sub_block, phiArrayT)
+
+        return self._applyDeltaMags(sedList, indices, output)
+
+
+    def _applyDeltaMags(self, sedList, indices, output):
+        """
+        Multiply the fluxes in output (see _fluxArrayForSedList) by the
+        change in flux due to the galactic dust of sedList that was not
+        applied to its Seds (see SedList.galacticDustResponse), if any.
+
+        Returns output
+        """
+        deltaMags = sedList._galacticDustDeltaMags(self, indices=indices)
+        if deltaMags is None:
+            return output
+
+        if indices is None:
+            output *= numpy.power(10.0, -0.4*deltaMags)
+        else:
+            output[:, indices] *= numpy.power(10.0, -0.4*deltaMags[:, indices])
+        return output
+
+
+    def _magArrayForSedList(self, sedList, indices=None, output=None):
+        """
+        This is a private method which calculates the magnitudes of all of
+        the Seds in sedList in each of the bandpasses stored in this Dict,
+        writing them into output (see _fluxArrayForSedList).
+
+        Returns output
+        """
+        output = self._fluxArrayForSedList(sedList, indices=indices, output=output)
+        numpy.log10(output, out=output)
+        output *= -2.5
+        output -= Sed().zp
+        return output
+
+
+    def _structuredOutput(self, n_sed):
+        """
+        Allocate a dtyped numpy array keyed to the keys of this
+        BandpassDict with n_sed rows.
+
+        Returns the array and a 2-D float view of it (Seds are rows,
+        bandpasses are columns) that can be passed as output to
+        _fluxArrayForSedList and _magArrayForSedList.
+        """
+        dtype = numpy.dtype([(bp, float) for bp in self._bandpassDict.keys()])
+        outputArray = numpy.empty(n_sed, dtype=dtype)
+        return outputArray, outputArray.view(float).reshape(n_sed, len(self._bandpassDict))
+
+
     def magListForSedList(self, sedList, indices=None):
         """
         Return a 2-D array of magnitudes from a SedList.
@@ -299,7 +477,9 @@ class BandpassDict(object):
         For maximum efficiency, use the wavelenMatch keyword when loading
         SEDs into your SedList and make sure that wavelenMatch = myBandpassDict.wavelenMatch.
         That way, this method will not have to waste time resampling the Seds
-        onto the wavelength grid of the BandpassDict.
+        onto the wavelength grid of the BandpassDict, and the magnitudes of
+        the Seds will be calculated a block of Seds at a time with matrix
+        products (see SedMatrixList for a SedList stored as a single block).
 
         @param [in] sedList is a SedList containing the Seds
         whose magnitudes are desired.
@@ -314,26 +494,7 @@ class BandpassDict(object):
         (the columns)
         """
 
-        one_at_a_time = False
-        if sedList.wavelenMatch is None:
-            one_at_a_time = True
-        elif sedList[0]._needResample(wavelen_match=self._wavelen_match):
-            one_at_a_time = True
-
-        output_list = []
-        if one_at_a_time:
-            for sed_obj in sedList:
-                sub_list = self.magListForSed(sed_obj, indices=indices)
-                output_list.append(sub_list)
-        else:
-            # the difference between this block and the block above is that the block
-            # above performs the additional check of making sure that sed_obj.wavelen
-            # is equivalent to self._wavelen_match
-            for sed_obj in sedList:
-                sub_list = self._magListForSed(sed_obj, indices=indices)
-                output_list.append(sub_list)
-
-        return numpy.array(output_list)
+        return self._magArrayForSedList(sedList, indices=indices)
 
 
     def magArrayForSedList(self, sedList, indices=None):
@@ -365,12 +526,8 @@ class BandpassDict(object):
         @param [out] output_array is a dtyped numpy array of magnitudes (see above).
         """
 
-        magList = self.magListForSedList(sedList, indices=indices)
-
-        dtype = numpy.dtype([(bp, numpy.float) for bp in self._bandpassDict.keys()])
-
-        outputArray = numpy.array([tuple(row) for row in magList], dtype=dtype)
-
+        outputArray, output = self._structuredOutput(len(sedList))
+        self._magArrayForSedList(sedList, indices=indices, output=output)
         return outputArray
 
 
@@ -396,6 +553,9 @@ class BandpassDict(object):
             #This is to prevent the two arrays from getting out synch
             #(e.g. renormalizing flambda but forgettint to renormalize fnu)
             #
+            #flambdaTofnu() does nothing if it has already calculated fnu
+            #from the current flambda (e.g. for another BandpassDict)
+            #
             sedobj.flambdaTofnu()
 
             if indices is not None:
@@ -495,7 +655,9 @@ class BandpassDict(object):
         For maximum efficiency, use the wavelenMatch keyword when loading
         SEDs into your SedList and make sure that wavelenMatch = myBandpassDict.wavelenMatch.
         That way, this method will not have to waste time resampling the Seds
-        onto the wavelength grid of the BandpassDict.
+        onto the wavelength grid of the BandpassDict, and the fluxes of
+        the Seds will be calculated a block of Seds at a time with matrix
+        products (see SedMatrixList for a SedList stored as a single block).
 
         @param [in] sedList is a SedList containing the Seds
         whose fluxes are desired.
@@ -515,26 +677,7 @@ class BandpassDict(object):
         http://www.lsst.org/scientists/scibook
         """
 
-        one_at_a_time = False
-        if sedList.wavelenMatch is None:
-            one_at_a_time = True
-        elif sedList[0]._needResample(wavelen_match=self._wavelen_match):
-            one_at_a_time = True
-
-        output_list = []
-        if one_at_a_time:
-            for sed_obj in sedList:
-                sub_list = self.fluxListForSed(sed_obj, indices=indices)
-                output_list.append(sub_list)
-        else:
-            # the difference between this block and the block above is that the block
-            # above performs the additional check of making sure that sed_obj.wavelen
-            # is equivalent to self._wavelen_match
-            for sed_obj in sedList:
-                sub_list = self._fluxListForSed(sed_obj, indices=indices)
-                output_list.append(sub_list)
-
-        return numpy.array(output_list)
+        return self._fluxArrayForSedList(sedList, indices=indices)
 
 
     def fluxArrayForSedList(self, sedList, indices=None):
@@ -573,13 +716,298 @@ class BandpassDict(object):
         http://www.lsst.org/scientists/scibook
         """
 
-        fluxList = self.fluxListForSedList(sedList, indices=indices)
+        outputArray, output = self._structuredOutput(len(sedList))
+        self._fluxArrayForSedList(sedList, indices=indices, output=output)
+        return outputArray
+
+
+    def _loadSedStream(self, sedList, sedChunks, chunkSize):
+        """
+        This is a private generator which, for each chunk of at most chunkSize
+        Seds in sedChunks (see magListForSedStream), flushes sedList, loads the
+        chunk into it and yields it.
+        """
+        if chunkSize < 1:
+            raise ValueError("chunkSize must be >= 1; you gave %d" % chunkSize)
+
+        for chunk in sedChunks:
+            n_sed = len(chunk['sedNameList'])
+            for i_start in range(0, n_sed, chunkSize):
+                sub_chunk = {}
+                for column, values in chunk.items():
+                    if values is not None:
+                        values = values[i_start:i_start+chunkSize]
+                    sub_chunk[column] = values
+                sedList.flush()
+                sedList.loadSedsFromList(**sub_chunk)
+                yield sedList
+        sedList.flush()
+
+
+    def magListForSedStream(self, sedList, sedChunks, chunkSize=10000, indices=None):
+        """
+        Calculate the magnitudes of a stream of Seds too long to hold in memory at
+        once, a chunk at a time.
 
-        dtype = numpy.dtype([(bp, numpy.float) for bp in self._bandpassDict.keys()])
+        @param [in] sedList is a SedList (e.g. SedList([], [], wavelenMatch=myBandpassDict.wavelenMatch,
+        fileDir=...)) into which each chunk of Seds is loaded in turn.  It is flushed
+        before each chunk (and at the end of the stream), but keeps the dust model
+        coefficients, the magnitudes of the Sed files in the normalizing bandpass and
+        its other settings (e.g. wavelenMatch) from chunk to chunk.
 
-        outputArray = numpy.array([tuple(row) for row in fluxList], dtype=dtype)
+        @param [in] sedChunks is an iterable of chunks of Seds.  Each chunk is a dict
+        of the parameters of SedList.loadSedsFromList ('sedNameList', 'magNormList'
+        and optionally 'redshiftList', 'internalAvList' and 'galacticAvList');
+        sedChunksFromRows makes such chunks from an iterable of catalog rows.
 
-        return outputArray
+        @param [in] chunkSize is the largest number of Seds loaded into sedList at once
+        (longer chunks are split)
+
+        @param [in] indices is an optional list of indices indicating which bandpasses to actually
+        calculate magnitudes for (see magListForSedList)
+
+        @param [out] yields a 2-D numpy array of magnitudes (see magListForSedList)
+        for each chunk of at most chunkSize Seds, in order
+        """
+        for chunkList in self._loadSedStream(sedList, sedChunks, chunkSize):
+            yield self._magArrayForSedList(chunkList, indices=indices)
+
+
+    def fluxListForSedStream(self, sedList, sedChunks, chunkSize=10000, indices=None):
+        """
+        Calculate the fluxes of a stream of Seds too long to hold in memory at
+        once, a chunk at a time.  The parameters are those of magListForSedStream.
+
+        @param [out] yields a 2-D numpy array of fluxes (see fluxListForSedList)
+        for each chunk of at most chunkSize Seds, in order
+        """
+        for chunkList in self._loadSedStream(sedList, sedChunks, chunkSize):
+            yield self._fluxArrayForSedList(chunkList, indices=indices)
+
+
+    def _templatePhotometry(self, sedNameList, magNormList, fileDir='', specMap=None,
+                            normalizingBandpass=None, indices=None):
+        """
+        This is a private method which reads each unique Sed file named in
+        sedNameList once and calculates its fluxes in the bandpasses stored
+        in this Dict and its magnitude in the normalizing bandpass (see
+        fluxListForSedNames for the parameters).
+
+        Returns
+        -------
+        A 2-D numpy array of the fluxes of the (un-normalized) Sed files,
+        one row for each unique Sed file
+
+        A numpy array of the magnitudes of the Sed files in the
+        normalizing bandpass
+
+        A numpy array mapping each element of sedNameList to its row in
+        the first two outputs
+        """
+        uniqueNames, inverse = numpy.unique(numpy.asarray(sedNameList, dtype=str),
+                                            return_inverse=True)
+        templateFlux = numpy.empty((len(uniqueNames), len(self._bandpassDict)), dtype=float)
+        normMag = numpy.empty(len(uniqueNames), dtype=float)
+        for ix, sedName in enumerate(uniqueNames):
+            if sedName == "None":
+                templateFlux[ix] = numpy.NaN
+                normMag[ix] = numpy.NaN
+                continue
+
+            if specMap is not None:
+                fileName = os.path.join(fileDir, specMap[sedName])
+            else:
+                fileName = os.path.join(fileDir, sedName)
+
+            sedObj = Sed()
+            sedObj.readSED_flambda(fileName, cache_view=True)
+            normMag[ix] = _getNormalizingMag(sedObj, normalizingBandpass)
+            templateFlux[ix] = self.fluxListForSed(sedObj, indices=indices)
+
+        return templateFlux, normMag, inverse
+
+
+    def fluxListForSedNames(self, sedNameList, magNormList, fileDir='', specMap=None,
+                            normalizingBandpass=None, indices=None):
+        """
+        Return a 2-D array of the fluxes of the Seds that a SedList would
+        load from sedNameList and magNormList (with no redshift or
+        extinction), without loading them.
+
+        Normalizing an Sed multiplies all of its fluxes by the same factor,
+        so each unique Sed file is only read once: its fluxes and its
+        magnitude in the normalizing bandpass are calculated, and the fluxes
+        of every Sed made from it are those fluxes multiplied by
+        10**(-0.4*(magNorm - normalizing magnitude)).  The results agree
+        with those of fluxListForSedList to within floating point rounding.
+
+        @param [in] sedNameList is a list of SED file names ("None" yields
+        a row of numpy.NaN)
+
+        @param [in] magNormList is a list of magnitude normalizations
+        (in the normalizingBandpass) for each of the Seds
+
+        @param [in] fileDir, specMap and normalizingBandpass are as in the
+        SedList constructor
+
+        @param [in] indices is an optional list of indices indicating which bandpasses to actually
+        calculate fluxes for.  Other fluxes will be listed as numpy.NaN.
+
+        @param [out] output_list is a 2-D numpy array containing the fluxes
+        of each Sed (the rows) in each bandpass contained in this BandpassDict
+        (the columns)
+        """
+        templateFlux, normMag, inverse = self._templatePhotometry(sedNameList, magNormList,
+                                                                  fileDir=fileDir, specMap=specMap,
+                                                                  normalizingBandpass=normalizingBandpass,
+                                                                  indices=indices)
+        fNorm = numpy.power(10, (-0.4*(numpy.asarray(magNormList) - normMag[inverse])))
+        return templateFlux[inverse]*fNorm[:, None]
+
+
+    def magListForSedNames(self, sedNameList, magNormList, fileDir='', specMap=None,
+                           normalizingBandpass=None, indices=None):
+        """
+        Return a 2-D array of the magnitudes of the Seds that a SedList would
+        load from sedNameList and magNormList (with no redshift or
+        extinction), without loading them.
+
+        Normalizing an Sed shifts all of its magnitudes by the same amount,
+        so each unique Sed file is only read once: its magnitudes and its
+        magnitude in the normalizing bandpass are calculated, and the
+        magnitudes of every Sed made from it are those magnitudes plus
+        (magNorm - normalizing magnitude).  The results agree with those of
+        magListForSedList to within floating point rounding.
+
+        @param [in] sedNameList is a list of SED file names ("None" yields
+        a row of numpy.NaN)
+
+        @param [in] magNormList is a list of magnitude normalizations
+        (in the normalizingBandpass) for each of the Seds
+
+        @param [in] fileDir, specMap and normalizingBandpass are as in the
+        SedList constructor
+
+        @param [in] indices is an optional list of indices indicating which bandpasses to actually
+        calculate magnitudes for.  Other magnitudes will be listed as numpy.NaN.
+
+        @param [out] output_list is a 2-D numpy array containing the magnitudes
+        of each Sed (the rows) in each bandpass contained in this BandpassDict
+        (the columns)
+        """
+        templateFlux, normMag, inverse = self._templatePhotometry(sedNameList, magNormList,
+                                                                  fileDir=fileDir, specMap=specMap,
+                                                                  normalizingBandpass=normalizingBandpass,
+                                                                  indices=indices)
+        templateMag = -2.5*numpy.log10(templateFlux) - Sed().zp
+        dmag = numpy.asarray(magNormList) - normMag[inverse]
+        return templateMag[inverse] + dmag[:, None]
+
+
+    def _photometryInParallel(self, sedNameList, magNormList, workers, executor, chunkSize,
+                              indices, magnitudes, sedListKwargs):
+        """
+        This is a private method which does the work of magListForSedsInParallel
+        and fluxListForSedsInParallel (magnitudes selects between them).
+        """
+        n_sed = len(sedNameList)
+        if executor is None and ProcessPoolExecutor is None:
+            raise RuntimeError("Parallel photometry requires concurrent.futures "
+                               "(or an executor)")
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+
+        # chunks are whole numbers of the blocks into which
+        # _fluxArrayForSedList stacks Seds, so that every Sed is in a block
+        # of the same rows as it would be in serial and its photometry is
+        # calculated with exactly the same arithmetic
+        if chunkSize is None:
+            chunkSize = -(-n_sed//(4*workers))
+        chunkSize = max(1, -(-chunkSize//_flux_block_rows))*_flux_block_rows
+
+        sedListKwargs = dict(sedListKwargs)
+        sedListKwargs['wavelenMatch'] = self._wavelen_match
+        columns = {'sedNameList': sedNameList, 'magNormList': magNormList}
+        for column in _sed_list_columns[2:]:
+            values = sedListKwargs.pop(column, None)
+            if values is not None:
+                columns[column] = values
+
+        output = numpy.empty((n_sed, len(self._bandpassDict)), dtype=float)
+        if n_sed == 0:
+            return output
+
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = []
+            for i_start in range(0, n_sed, chunkSize):
+                chunk = dict([(column, values[i_start:i_start+chunkSize])
+                              for column, values in columns.items()])
+                futures.append((i_start, executor.submit(_sedListPhotometry, self, chunk,
+                                                         sedListKwargs, indices, magnitudes)))
+            for i_start, future in futures:
+                result = future.result()
+                output[i_start:i_start+len(result)] = result
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+        return output
+
+
+    def magListForSedsInParallel(self, sedNameList, magNormList, workers=None, executor=None,
+                                 chunkSize=None, indices=None, **kwargs):
+        """
+        Return a 2-D array of the magnitudes of the Seds that
+        SedList(sedNameList, magNormList, wavelenMatch=self.wavelenMatch, **kwargs)
+        would load (see magListForSedList), calculated in parallel by several processes.
+
+        The Seds are split into chunks of consecutive Seds, each of which is loaded into
+        its own SedList and photometered by one process; the results are reassembled in
+        order, and are identical to those of magListForSedList.
+
+        @param [in] sedNameList and magNormList are as in the SedList constructor
+
+        @param [in] workers is the number of processes to use (defaults to the number of CPUs)
+
+        @param [in] executor is an optional concurrent.futures executor to use instead of
+        a ProcessPoolExecutor of workers processes
+
+        @param [in] chunkSize is the number of Seds in each chunk.  It is rounded up to a
+        multiple of the block size used by magListForSedList, and defaults to a quarter of
+        the Seds per worker, so that the work is balanced among the workers.  It bounds
+        the memory used by each worker.
+
+        @param [in] indices is an optional list of indices indicating which bandpasses to actually
+        calculate magnitudes for.  Other magnitudes will be listed as numpy.NaN.
+
+        @param [in] kwargs are any other parameters of the SedList constructor (e.g. fileDir,
+        redshiftList, galacticAvList; wavelenMatch is always this BandpassDict's wavelenMatch)
+
+        @param [out] output_list is a 2-D numpy array containing the magnitudes
+        of each Sed (the rows) in each bandpass contained in this BandpassDict
+        (the columns)
+        """
+        return self._photometryInParallel(sedNameList, magNormList, workers, executor, chunkSize,
+                                          indices, True, kwargs)
+
+
+    def fluxListForSedsInParallel(self, sedNameList, magNormList, workers=None, executor=None,
+                                  chunkSize=None, indices=None, **kwargs):
+        """
+        Return a 2-D array of the fluxes of the Seds that
+        SedList(sedNameList, magNormList, wavelenMatch=self.wavelenMatch, **kwargs)
+        would load (see fluxListForSedList), calculated in parallel by several processes.
+        The parameters are those of magListForSedsInParallel.
+
+        @param [out] output_list is a 2-D numpy array containing the fluxes
+        of each Sed (the rows) in each bandpass contained in this BandpassDict
+        (the columns)
+        """
+        return self._photometryInParallel(sedNameList, magNormList, workers, executor, chunkSize,
+                                          indices, False, kwargs)
 
 
     @property
@@ -0,0 +1,299 @@
+"""
+This file defines ExtinctionResponseSurface, which fits the change in the
+magnitudes of a set of SED templates in the bandpasses of a BandpassDict
+due to CCM dust (Sed.setupCCM_ab and Sed.addDust) as a smooth function of
+A_V and R_V, so that the magnitudes of many extincted Seds can be
+calculated from the magnitudes of their unextincted templates without
+multiplying every spectrum by its dust curve.
+
+The flux of an extincted SED in a bandpass is the integral of
+phi*fnu*exp(-0.4*ln(10)*A_V*(a + b/R_V)) over wavelength, so that the
+change in magnitude is a smooth function which vanishes at A_V = 0 and
+is well approximated by a low-order polynomial in A_V whose coefficients
+are polynomials in 1/R_V.  Such a polynomial is fit, by least squares,
+to the exact change in magnitude on a grid of A_V and R_V for each
+template and bandpass.  The method validate reports the largest error
+of the fits against the exact calculation.
+"""
+
+from builtins import range
+from builtins import object
+import os
+import numpy
+from .Sed import Sed
+
+__all__ = ["ExtinctionResponseSurface"]
+
+
+class ExtinctionResponseSurface(object):
+    """
+    Polynomial fits to the change in the magnitudes of SED templates in the
+    bandpasses of a BandpassDict due to CCM dust with 0 <= A_V <= avMax and
+    rvMin <= R_V <= rvMax, applied (as by SedList) after the templates have
+    been redshifted and resampled onto the wavelenMatch of the BandpassDict.
+
+    Because the change in magnitude does not depend on normalization, the
+    magnitudes of a normalized, extincted template are the magnitudes of
+    the normalized, unextincted template plus deltaMagList.
+    """
+
+    def __init__(self, bandpassDict, sedNameList, fileDir='', specMap=None, redshift=0.0,
+                 avMax=3.0, rvMin=3.1, rvMax=3.1, degree=4, nAv=31, nRv=9):
+        """
+        @param [in] bandpassDict is the BandpassDict whose bandpasses are fit
+
+        @param [in] sedNameList is a list of SED template names (duplicates and
+        "None" are ignored)
+
+        @param [in] fileDir and specMap are as in the SedList constructor
+
+        @param [in] redshift is the redshift to which the templates are redshifted
+        before being extincted (the response of a template depends on its redshift,
+        so Seds at other redshifts need a different ExtinctionResponseSurface)
+
+        @param [in] avMax is the largest A_V fit
+
+        @param [in] rvMin and rvMax are the limits of R_V fit (if they are equal,
+        only that R_V is fit; SedList always uses R_V = 3.1)
+
+        @param [in] degree is the degree of the polynomials in A_V
+
+        @param [in] nAv and nRv are the number of values of A_V and R_V on the
+        grid to which the polynomials are fit
+        """
+        if avMax <= 0.0:
+            raise ValueError("ExtinctionResponseSurface needs a positive avMax; you gave %e" % avMax)
+        if rvMin <= 0.0 or rvMax < rvMin:
+            raise ValueError("ExtinctionResponseSurface needs 0 < rvMin <= rvMax; "
+                             "you gave %e, %e" % (rvMin, rvMax))
+        if degree < 1:
+            raise ValueError("ExtinctionResponseSurface needs degree >= 1; you gave %d" % degree)
+
+        self._bandpassDict = bandpassDict
+        self._redshift = redshift
+        self._av_max = avMax
+        self._rv_min = rvMin
+        self._rv_max = rvMax
+
+        # the polynomials are in x = A_V/avMax and in u, which is
+        # 1/R_V scaled onto [-1, 1]; the terms are x^k*u^j with
+        # 1 <= k <= degree and 0 <= j <= k (j = 0 if R_V is fixed)
+        self._inv_rv_mid = 0.5*(1.0/rvMin + 1.0/rvMax)
+        self._inv_rv_half_range = 0.5*(1.0/rvMin - 1.0/rvMax)
+        self._terms = []
+        for k in range(1, degree + 1):
+            for j in range(0, k + 1 if rvMax > rvMin else 1):
+                self._terms.append((k, j))
+
+        self._sed_names = sorted(set([name for name in sedNameList if name != "None"]))
+        self._sed_dex = dict([(name, ix) for ix, name in enumerate(self._sed_names)])
+
+        self._flambda = numpy.empty((len(self._sed_names), len(bandpassDict.wavelenMatch)),
+                                  dtype=float)
+        for ix, sedName in enumerate(self._sed_names):
+            if specMap is not None:
+                fileName = os.path.join(fileDir, specMap[sedName])
+            else:
+                fileName = os.path.join(fileDir, sedName)
+            sedObj = Sed()
+            sedObj.readSED_flambda(fileName)
+            if redshift != 0.0:
+                sedObj.redshiftSED(redshift)
+            sedObj.resampleSED(wavelen_match=bandpassDict.wavelenMatch)
+            self._flambda[ix] = sedObj.flambda
+
+        # this phiArray includes the conversion from flambda to fnu, so that
+        # its products with the rows of self._flambda are the integrands of
+        # the fluxes
+        self._phi = bandpassDict._phiArrayForFlambda()
+        self._a_x, self._b_x = Sed().setupCCM_ab(wavelen=bandpassDict.wavelenMatch)
+
+        avGrid = numpy.linspace(0.0, avMax, nAv)
+        if rvMax > rvMin:
+            rvGrid = 1.0/numpy.linspace(1.0/rvMax, 1.0/rvMin, nRv)
+        else:
+            rvGrid = numpy.array([rvMin])
+        avGrid, rvGrid = [arr.flatten() for arr in numpy.meshgrid(avGrid, rvGrid)]
+        if len(avGrid) < len(self._terms):
+            raise ValueError("ExtinctionResponseSurface needs at least as many grid points "
+                             "(%d) as polynomial terms (%d)" % (len(avGrid), len(self._terms)))
+
+        self._coeffs = self._fit(avGrid, rvGrid)
+
+    def _exactDeltaMags(self, avArray, rvArray):
+        """
+        Calculate the exact change in magnitude of every template in every
+        bandpass for every (A_V, R_V) pair in avArray, rvArray.
+
+        Returns
+        -------
+        A numpy array of shape (n_templates, len(avArray), n_bandpasses)
+        """
+        ln10_04 = 0.4*numpy.log(10.0)
+        dust = numpy.exp(-ln10_04*(numpy.outer(avArray, self._a_x) +
+                                   numpy.outer(avArray/rvArray, self._b_x)))
+        deltaMags = numpy.empty((len(self._sed_names), len(avArray), len(self._phi)), dtype=float)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            for ix in range(len(self._sed_names)):
+                integrand = self._flambda[ix]*self._phi
+                flux0 = integrand.sum(axis=1)
+                deltaMags[ix] = -2.5*numpy.log10(numpy.dot(dust, integrand.T)/flux0)
+        return deltaMags
+
+    def _design(self, avArray, rvArray):
+        """
+        Return the matrix of polynomial terms (see the constructor)
+        evaluated at each (A_V, R_V) pair; rows are pairs, columns are terms.
+        """
+        x = numpy.asarray(avArray, dtype=float)/self._av_max
+        if self._inv_rv_half_range > 0.0:
+            u = (1.0/numpy.asarray(rvArray, dtype=float) - self._inv_rv_mid)/self._inv_rv_half_range
+        else:
+            u = numpy.zeros(len(x))
+        design = numpy.empty((len(x), len(self._terms)), dtype=float)
+        for it, (k, j) in enumerate(self._terms):
+            design[:, it] = x**k*u**j
+        return design
+
+    def _fit(self, avArray, rvArray):
+        """
+        Fit the polynomials to the exact changes in magnitude on the grid of
+        (A_V, R_V) pairs avArray, rvArray.
+
+        Returns
+        -------
+        A numpy array of coefficients of shape (n_templates, n_terms, n_bandpasses);
+        those of templates with no flux in a bandpass are numpy.NaN
+        """
+        design = self._design(avArray, rvArray)
+        deltaMags = self._exactDeltaMags(avArray, rvArray)
+        n_sed, n_grid, n_bp = deltaMags.shape
+        rhs = deltaMags.transpose(1, 0, 2).reshape(n_grid, n_sed*n_bp)
+        coeffs = numpy.empty((len(self._terms), n_sed*n_bp), dtype=float)
+        coeffs[:] = numpy.NaN
+        finite = numpy.isfinite(rhs).all(axis=0)
+        if finite.any():
+            coeffs[:, finite] = numpy.linalg.lstsq(design, rhs[:, finite], rcond=None)[0]
+        return coeffs.reshape(len(self._terms), n_sed, n_bp).transpose(1, 0, 2)
+
+    @property
+    def sedNames(self):
+        """
+        The (sorted) names of the fit templates
+        """
+        return list(self._sed_names)
+
+    @property
+    def bandpassDict(self):
+        """
+        The BandpassDict whose bandpasses are fit
+        """
+        return self._bandpassDict
+
+    @property
+    def redshift(self):
+        """
+        The redshift of the fit templates
+        """
+        return self._redshift
+
+    def deltaMagList(self, sedNameList, avList, rvList=None, indices=None):
+        """
+        Evaluate the change in magnitude due to dust of each template in
+        sedNameList.
+
+        @param [in] sedNameList is a list of template names ("None" yields a
+        row of zeros)
+
+        @param [in] avList is a list of A_V (None yields a row of zeros)
+
+        @param [in] rvList is an optional list of R_V (defaults to 3.1)
+
+        @param [in] indices is an optional list of indices indicating which bandpasses to actually
+        calculate magnitude changes for.  Other magnitude changes will be listed as numpy.NaN.
+
+        @param [out] output_list is a 2-D numpy array containing the change in
+        magnitude of each template (the rows) in each bandpass contained in the
+        BandpassDict (the columns)
+        """
+        avArray = numpy.array([0.0 if av is None else av for av in avList], dtype=float)
+        if rvList is None:
+            rvArray = numpy.ones(len(avArray))*3.1
+        else:
+            rvArray = numpy.asarray(rvList, dtype=float)
+
+        if (avArray < 0.0).any() or (avArray > self._av_max*(1.0 + 1.0e-10)).any():
+            raise ValueError("ExtinctionResponseSurface covers A_V from 0 to %e; "
+                             "you asked for %e to %e" % (self._av_max, avArray.min(), avArray.max()))
+        dusty = avArray > 0.0
+        if dusty.any():
+            rvDusty = rvArray[dusty]
+            if (numpy.abs(rvDusty - numpy.clip(rvDusty, self._rv_min, self._rv_max)) >
+                1.0e-10*self._rv_max).any():
+                raise ValueError("ExtinctionResponseSurface covers R_V from %e to %e; "
+                                 "you asked for %e to %e" % (self._rv_min, self._rv_max,
+                                                             rvDusty.min(), rvDusty.max()))
+
+        sed_dex = numpy.array([self._sed_dex[name] if name != "None" else -1
+                               for name in sedNameList], dtype=int)
+        dusty = numpy.logical_and(dusty, sed_dex >= 0)
+
+        if indices is None:
+            coeffs = self._coeffs
+        else:
+            coeffs = self._coeffs[:, :, indices]
+
+        deltaMags = numpy.zeros((len(avArray), coeffs.shape[2]), dtype=float)
+        design = self._design(avArray[dusty], rvArray[dusty])
+        dusty_rows = numpy.where(dusty)[0]
+        dusty_dex = sed_dex[dusty]
+
+        # evaluate the polynomials one template at a time
+        order = numpy.argsort(dusty_dex, kind='mergesort')
+        boundaries = numpy.where(numpy.diff(dusty_dex[order]) != 0)[0] + 1
+        for group in numpy.split(order, boundaries):
+            if len(group) == 0:
+                continue
+            deltaMags[dusty_rows[group]] = numpy.dot(design[group], coeffs[dusty_dex[group[0]]])
+
+        if indices is None:
+            return deltaMags
+
+        output = numpy.empty((len(deltaMags), len(self._bandpassDict)), dtype=float)
+        output[:] = numpy.NaN
+        output[:, indices] = deltaMags
+        return output
+
+    def validate(self, avList=None, rvList=None):
+        """
+        Compare the fit changes in magnitude with the exact changes in
+        magnitude (calculated as by Sed.addDust and BandpassDict.magListForSed).
+
+        @param [in] avList and rvList are lists of the (A_V, R_V) pairs at which to
+        compare.  They default to a grid of 50 values of A_V and (if R_V was fit
+        over a range) 10 values of R_V spanning the fit, offset from the grid the
+        polynomials were fit to.
+
+        @param [out] maxError is a 2-D numpy array containing the largest absolute
+        error (in magnitudes) of each template (the rows) in each bandpass (the
+        columns)
+        """
+        if avList is None:
+            avGrid = (numpy.arange(50) + 0.5)*self._av_max/50.0
+            if self._rv_max > self._rv_min:
+                rvGrid = numpy.linspace(self._rv_min, self._rv_max, 10)
+            else:
+                rvGrid = numpy.array([self._rv_min])
+            avList, rvList = [arr.flatten() for arr in numpy.meshgrid(avGrid, rvGrid)]
+        avArray = numpy.asarray(avList, dtype=float)
+        if rvList is None:
+            rvArray = numpy.ones(len(avArray))*3.1
+        else:
+            rvArray = numpy.asarray(rvList, dtype=float)
+
+        exact = self._exactDeltaMags(avArray, rvArray)
+        maxError = numpy.empty((len(self._sed_names), len(self._bandpassDict)), dtype=float)
+        for ix, sedName in enumerate(self._sed_names):
+            fit = self.deltaMagList([sedName]*len(avArray), avArray, rvArray)
+            maxError[ix] = numpy.abs(fit - exact[ix]).max(axis=0)
+        return maxError
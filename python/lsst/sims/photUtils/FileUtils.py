@@ -0,0 +1,190 @@
+"""
+This file defines a fast reader for the ASCII (optionally gzipped) files
+in which SEDs and throughputs are stored, i.e. files of whitespace-separated
+columns of numbers, the first of which is the wavelength.
+
+The comment conventions accepted by the readers in Sed.py and Bandpass.py
+are all honored:
+
+    '#' starts a comment wherever it appears on a line
+    '$' and '!' comment out a line if they are its first non-whitespace character
+
+Lines with fewer than the requested number of columns (including blank lines)
+are skipped; any columns beyond those requested are ignored.
+
+Rather than parsing the file line by line, the whole file is read into
+memory, comments are blanked out and the columns are identified with
+vectorized numpy operations, so that all of the numbers in the file are
+parsed by a single call to numpy.fromstring.
+"""
+
+from builtins import range
+import gzip
+import os
+import warnings
+import numpy
+
+__all__ = ["read_ascii_columns"]
+
+
+# lookup tables indexed by the value of a byte
+_is_whitespace = numpy.zeros(256, dtype=bool)
+_is_whitespace[[ord(cc) for cc in ' \t\n\r\v\f']] = True
+_is_line_comment = numpy.zeros(256, dtype=bool)
+_is_line_comment[[ord('$'), ord('!')]] = True
+
+
+def _open_ascii_file(filename):
+    """
+    Open filename, assuming that it is gzipped if its name ends in '.gz'.
+    If filename does not exist, try the same name with the '.gz' suffix
+    added (or removed).  Any other error in reading a file (e.g. a file
+    which is not really gzipped, or cannot be read) is raised as it is.
+
+    Returns
+    -------
+    The contents of the file as bytes
+    """
+    if filename.endswith('.gz'):
+        candidates = [filename, filename[:-3]]
+    else:
+        candidates = [filename, filename + '.gz']
+
+    for name in candidates:
+        if not os.path.exists(name):
+            continue
+        if name.endswith('.gz'):
+            with gzip.open(name, 'rb') as file_handle:
+                return file_handle.read()
+        with open(name, 'rb') as file_handle:
+            return file_handle.read()
+
+    raise IOError("The file %s does not exist" % filename)
+
+
+def _parse_columns_slow(text, n_columns):
+    """
+    Parse the first n_columns columns of text line by line (used when
+    text contains entries that numpy.fromstring cannot parse, so that
+    the resulting error is the same one float() would raise).
+    """
+    columns = [[] for ix in range(n_columns)]
+    for line in text.splitlines():
+        line = line.split('#')[0]
+        values = line.split()
+        if len(values) < n_columns:
+            continue
+        if values[0][0] in ('$', '!'):
+            continue
+        for ix in range(n_columns):
+            columns[ix].append(float(values[ix]))
+    return tuple([numpy.array(cc, dtype=float) for cc in columns])
+
+
+def _parse_columns(raw, n_columns):
+    """
+    Parse the first n_columns columns of the bytes raw (the contents of
+    an ASCII file).
+
+    Returns
+    -------
+    A tuple of n_columns numpy arrays
+    """
+    buf = numpy.frombuffer(raw, dtype=numpy.uint8)
+    if len(buf) == 0:
+        return tuple([numpy.zeros(0, dtype=float) for ix in range(n_columns)])
+
+    newline_pos = numpy.flatnonzero(buf == ord('\n'))
+    line_end = numpy.append(newline_pos, len(buf))
+    line_start = numpy.append(0, newline_pos + 1)
+
+    # find the first character of every token and the line it is on
+    is_space = _is_whitespace[buf]
+    token_pos = numpy.flatnonzero(numpy.logical_and(~is_space[1:], is_space[:-1])) + 1
+    if not is_space[0]:
+        token_pos = numpy.append(0, token_pos)
+    token_line = numpy.searchsorted(newline_pos, token_pos)
+
+    # Find the spans of the file that are commented out: everything from
+    # the first '#' on a line and every line whose first token starts
+    # with '$' or '!'.  Files typically have only a few comment lines,
+    # so these spans are blanked out one at a time.
+    comment_start = []
+    comment_end = []
+    hash_pos = numpy.flatnonzero(buf == ord('#'))
+    if len(hash_pos) > 0:
+        hash_line = numpy.searchsorted(newline_pos, hash_pos)
+        first_hash = numpy.append(True, hash_line[1:] != hash_line[:-1])
+        comment_start.append(hash_pos[first_hash])
+        comment_end.append(line_end[hash_line[first_hash]])
+    if len(token_pos) > 0:
+        first_token = numpy.append(True, token_line[1:] != token_line[:-1])
+        commented = _is_line_comment[buf[token_pos[first_token]]]
+        if commented.any():
+            commented_lines = token_line[first_token][commented]
+            comment_start.append(line_start[commented_lines])
+            comment_end.append(line_end[commented_lines])
+
+    if len(comment_start) > 0:
+        comment_start = numpy.concatenate(comment_start)
+        comment_end = numpy.concatenate(comment_end)
+        # a '#' on a line commented out by '$' or '!' yields a span
+        # nested inside the span of the whole line; taking the running
+        # maximum of the span ends makes the nested span harmless
+        sorted_dex = numpy.argsort(comment_start, kind='mergesort')
+        comment_start = comment_start[sorted_dex]
+        comment_end = numpy.maximum.accumulate(comment_end[sorted_dex])
+        span_dex = numpy.searchsorted(comment_start, token_pos, side='right') - 1
+        in_comment = numpy.logical_and(span_dex >= 0,
+                                       token_pos < comment_end[numpy.maximum(span_dex, 0)])
+        token_pos = token_pos[~in_comment]
+        token_line = token_line[~in_comment]
+
+        text = bytearray(raw)
+        for start, end in zip(comment_start.tolist(), comment_end.tolist()):
+            text[start:end] = b' '*(end-start)
+        text = text.decode('latin-1')
+    else:
+        text = raw.decode('latin-1')
+
+    n_tokens = len(token_pos)
+    with warnings.catch_warnings():
+        # numpy warns when it cannot parse the whole string;
+        # that case is caught below
+        warnings.simplefilter('ignore')
+        # numpy.fromstring stops at the first token it cannot parse, but
+        # reads the number at the start of a malformed token (e.g. 4 from
+        # '4x') before stopping; the sentinel ' 0' after the last token
+        # makes sure a malformed last token is not mistaken for a number
+        values = numpy.fromstring(text + ' 0', dtype=float, sep=' ')
+    if len(values) != n_tokens + 1:
+        return _parse_columns_slow(text, n_columns)
+    values = values[:n_tokens]
+
+    tokens_per_line = numpy.bincount(token_line, minlength=len(line_start))
+    first_token_dex = numpy.cumsum(tokens_per_line) - tokens_per_line
+    column = numpy.arange(n_tokens) - first_token_dex[token_line]
+    valid = numpy.logical_and(column < n_columns,
+                              tokens_per_line[token_line] >= n_columns)
+    data = values[valid].reshape(-1, n_columns)
+    return tuple([numpy.ascontiguousarray(data[:, ix]) for ix in range(n_columns)])
+
+
+def read_ascii_columns(filename, n_columns=2):
+    """
+    Read the first n_columns columns of numbers from an ASCII file
+    (see the module docstring for the accepted format).
+
+    Parameters
+    ----------
+    filename is the name of the file.  It is assumed to be gzipped if
+    its name ends in '.gz'.  If it does not exist, the same name with
+    '.gz' added (or removed) is tried.
+
+    n_columns is the number of columns to read
+
+    Returns
+    -------
+    A tuple of n_columns numpy arrays of floats
+    """
+    return _parse_columns(_open_ascii_file(filename), n_columns)
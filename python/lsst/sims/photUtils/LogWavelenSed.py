@@ -0,0 +1,195 @@
+"""
+This file defines LogWavelenSed, a representation of an SED sampled on
+a wavelength grid that is uniform in log(wavelength).
+
+On such a grid, redshifting an SED (multiplying its wavelengths by 1+z)
+is a shift of its flambda array by ln(1+z)/dlnwavelen grid points, so
+that an SED can be redshifted and sampled onto any other wavelength grid
+with a single (linearly interpolated) gather from its flambda array,
+and many copies of the same SED can be redshifted at once.
+
+Note that sampling an SED onto a log-uniform grid is itself an
+interpolation: redshifted SEDs calculated this way agree with those
+calculated by Sed.redshiftSED followed by Sed.resampleSED to a precision
+set by the resolution of the log-uniform grid.
+"""
+
+from builtins import range
+from builtins import object
+import numpy
+from .Sed import Sed
+
+__all__ = ["LogWavelenSed"]
+
+
+# the number of redshifts processed at once by LogWavelenSed.redshiftOntoGrid
+_redshift_block_rows = 1024
+
+
+def _redshift_stretch(redshift):
+    """
+    Return the factor by which Sed.redshiftSED multiplies wavelengths
+    (1+z for redshifts, 1/(1-z) for blueshifts); redshift can be an array
+    """
+    redshift = numpy.asarray(redshift, dtype=float)
+    return numpy.where(redshift < 0, 1.0/(1.0-redshift), 1.0+redshift)
+
+
+class LogWavelenSed(object):
+    """
+    An SED sampled on a log-uniform wavelength grid, i.e.
+
+    wavelen[i] = wavelen_min*exp(i*dlnwavelen)
+
+    with dlnwavelen = ln(1 + 1/resolution).
+    """
+
+    def __init__(self, wavelen, flambda, resolution, wavelen_min=None, wavelen_max=None,
+                 name=None):
+        """
+        Parameters
+        ----------
+        wavelen and flambda are numpy arrays defining the SED (in nm and
+        ergs/cm^2/s/nm; e.g. the wavelen and flambda of an Sed)
+
+        resolution is wavelen/delta_wavelen of the log-uniform grid
+
+        wavelen_min and wavelen_max are the limits of the log-uniform grid
+        (in nm; they default to the limits of wavelen).  The last point of
+        the grid is the last one at or before wavelen_max.
+
+        name is an optional name for the SED
+        """
+        if wavelen_min is None:
+            wavelen_min = wavelen[0]
+        if wavelen_max is None:
+            wavelen_max = wavelen[-1]
+        if wavelen_min <= 0.0 or wavelen_max <= wavelen_min:
+            raise ValueError("LogWavelenSed needs 0 < wavelen_min < wavelen_max; "
+                             "you gave %e, %e" % (wavelen_min, wavelen_max))
+
+        self._dlnwavelen = numpy.log1p(1.0/resolution)
+        self._lnwavelen_min = numpy.log(wavelen_min)
+        n_wavelen = int(numpy.floor(numpy.log(wavelen_max/wavelen_min)/self._dlnwavelen)) + 1
+        self._wavelen = wavelen_min*numpy.exp(numpy.arange(n_wavelen)*self._dlnwavelen)
+        # guard against the last point rounding past wavelen_max
+        self._wavelen[-1] = min(self._wavelen[-1], wavelen_max)
+        self._flambda = numpy.interp(self._wavelen, wavelen, flambda,
+                                     left=numpy.NaN, right=numpy.NaN)
+        self.name = name
+
+    @classmethod
+    def fromSed(cls, sed, resolution, wavelen_min=None, wavelen_max=None):
+        """
+        Sample an Sed onto a log-uniform wavelength grid
+        (see the constructor for the parameters)
+        """
+        return cls(sed.wavelen, sed.flambda, resolution,
+                   wavelen_min=wavelen_min, wavelen_max=wavelen_max, name=sed.name)
+
+    @property
+    def wavelen(self):
+        """
+        The log-uniform wavelength grid (in nm)
+        """
+        return self._wavelen
+
+    @property
+    def flambda(self):
+        """
+        flambda sampled on the log-uniform grid (in ergs/cm^2/s/nm)
+        """
+        return self._flambda
+
+    @property
+    def dlnwavelen(self):
+        """
+        The spacing of the grid in ln(wavelength)
+        """
+        return self._dlnwavelen
+
+    def _gather(self, lnwavelen, out):
+        """
+        Linearly interpolate self._flambda at the points ln(wavelength) =
+        lnwavelen (an array of any shape), writing the results into out.
+        Points outside of the grid are set to numpy.NaN.
+        """
+        position = (lnwavelen - self._lnwavelen_min)/self._dlnwavelen
+        n_wavelen = len(self._flambda)
+        valid = numpy.logical_and(position >= 0.0, position <= n_wavelen - 1)
+        position = numpy.where(valid, position, 0.0)
+        dex = numpy.minimum(position.astype(int), n_wavelen - 2)
+        frac = position - dex
+        numpy.multiply(self._flambda[dex], 1.0 - frac, out=out)
+        out += self._flambda[dex + 1]*frac
+        out[~valid] = numpy.NaN
+        return out
+
+    def redshiftSED(self, redshift, dimming=False):
+        """
+        Redshift this SED (see Sed.redshiftSED) by shifting its flambda
+        along the log-uniform grid.
+
+        Returns
+        -------
+        A new LogWavelenSed on the same grid (points blueward of the
+        redshifted SED are numpy.NaN)
+        """
+        stretch = float(_redshift_stretch(redshift))
+        new_sed = LogWavelenSed.__new__(LogWavelenSed)
+        new_sed._dlnwavelen = self._dlnwavelen
+        new_sed._lnwavelen_min = self._lnwavelen_min
+        new_sed._wavelen = self._wavelen
+        new_sed._flambda = numpy.empty(len(self._flambda), dtype=float)
+        self._gather(numpy.log(self._wavelen) - numpy.log(stretch), new_sed._flambda)
+        if dimming:
+            new_sed._flambda /= stretch
+        new_sed.name = self.name
+        return new_sed
+
+    def redshiftOntoGrid(self, redshiftArray, wavelen_match, dimming=False):
+        """
+        Redshift this SED by every redshift in redshiftArray and sample the
+        results onto wavelen_match, i.e. do what Sed.redshiftSED followed by
+        Sed.resampleSED(wavelen_match=wavelen_match) would do to a copy of
+        this SED for each redshift, all at once.
+
+        Parameters
+        ----------
+        redshiftArray is a numpy array of redshifts
+
+        wavelen_match is the wavelength grid (in nm) onto which to sample
+        the redshifted SEDs
+
+        dimming is a boolean indicating whether to apply cosmological
+        dimming (see Sed.redshiftSED)
+
+        Returns
+        -------
+        A 2-D numpy array of flambda, one row for each redshift; points
+        not covered by the redshifted SED are numpy.NaN
+        """
+        redshiftArray = numpy.atleast_1d(redshiftArray)
+        stretch = _redshift_stretch(redshiftArray)
+        ln_stretch = numpy.log(stretch)
+        lnwavelen_match = numpy.log(wavelen_match)
+
+        output = numpy.empty((len(redshiftArray), len(wavelen_match)), dtype=float)
+        for i_start in range(0, len(redshiftArray), _redshift_block_rows):
+            i_end = min(i_start + _redshift_block_rows, len(redshiftArray))
+            lnwavelen = lnwavelen_match[None, :] - ln_stretch[i_start:i_end, None]
+            self._gather(lnwavelen, output[i_start:i_end])
+
+        if dimming:
+            output /= stretch[:, None]
+        return output
+
+    def toSed(self, wavelen_match=None):
+        """
+        Return this SED as an Sed (on the log-uniform grid, or resampled
+        onto wavelen_match if it is not None)
+        """
+        if wavelen_match is None:
+            return Sed(wavelen=self._wavelen, flambda=self._flambda, name=self.name)
+        flambda = self.redshiftOntoGrid(numpy.zeros(1), wavelen_match)[0]
+        return Sed(wavelen=wavelen_match, flambda=flambda, name=self.name)
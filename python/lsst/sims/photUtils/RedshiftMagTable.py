@@ -0,0 +1,338 @@
+"""
+This file defines RedshiftMagTable, which tabulates the observed-frame
+magnitudes of a set of SED templates in the bandpasses of a BandpassDict
+as a function of redshift, so that the photometry of a redshifted,
+normalized template can be interpolated from the table rather than
+calculated by redshifting, resampling and integrating the template.
+
+The redshift grid is shared by all of the templates and bandpasses.  It
+is built by bisecting the intervals of an initial uniform grid until,
+for every template and bandpass, the magnitude at the midpoint of every
+interval differs from its linear interpolation between the interval's
+ends by no more than half of a user-specified tolerance.  Because the
+midpoint error is only an estimate of the largest error in an interval,
+the margin keeps the interpolation error below the tolerance wherever
+the magnitudes vary smoothly with redshift.
+
+Tables are cached on disk (by default next to the cache of LSST SEDs;
+see Sed.cache_LSST_seds), keyed by a hash of everything that goes into
+them, so that they only need to be built once.
+"""
+
+from builtins import object
+import os
+import hashlib
+import warnings
+import numpy
+from lsst.utils import getPackageDir
+from .Sed import Sed
+from .SedUtils import _getNormalizingMag
+
+__all__ = ["RedshiftMagTable"]
+
+
+# incremented whenever the contents of the cached tables change meaning
+_redshift_mag_table_version = 1
+
+
+def _default_table_cache_dir():
+    """
+    Return the default directory in which to cache RedshiftMagTables
+    (a subdirectory of the default directory of the cache of LSST SEDs),
+    or None if sims_sed_library is not set up
+    """
+    try:
+        sed_cache_dir = os.path.join(getPackageDir('sims_sed_library'), 'lsst_sed_cache_dir')
+    except Exception:
+        return None
+    return os.path.join(sed_cache_dir, 'redshift_mag_tables')
+
+
+class RedshiftMagTable(object):
+    """
+    A table of the magnitudes of SED templates, redshifted (and optionally
+    cosmologically dimmed) exactly as by SedList, in the bandpasses of a
+    BandpassDict, over a grid of redshifts.
+
+    The magnitudes of a template normalized to magNorm (as by SedList) are
+    the tabulated magnitudes plus magNorm minus the magnitude of the
+    un-normalized template in the normalizing bandpass.
+    """
+
+    def __init__(self, bandpassDict, sedNameList, redshiftMin=0.0, redshiftMax=3.0,
+                 tolerance=0.001, fileDir='', specMap=None, normalizingBandpass=None,
+                 cosmologicalDimming=True, nInitial=33, minRedshiftStep=1.0e-5,
+                 cacheDir=None):
+        """
+        @param [in] bandpassDict is the BandpassDict whose bandpasses are tabulated
+
+        @param [in] sedNameList is a list of SED template names (duplicates are ignored)
+
+        @param [in] redshiftMin and redshiftMax are the limits of the redshift grid
+
+        @param [in] tolerance is the largest error in magnitude allowed in linear
+        interpolation between grid points (see the module docstring)
+
+        @param [in] fileDir, specMap, normalizingBandpass and cosmologicalDimming
+        are as in the SedList constructor
+
+        @param [in] nInitial is the number of points in the initial uniform grid
+
+        @param [in] minRedshiftStep is the narrowest interval that will be bisected
+        (so that refinement stops near features that cannot be interpolated, e.g.
+        a bandpass moving off the end of a template)
+
+        @param [in] cacheDir is the directory in which tables are cached.  It defaults
+        to the redshift_mag_tables subdirectory of the default directory of the cache
+        of LSST SEDs; if that cannot be found or written, the table is not cached.
+        """
+        if redshiftMax <= redshiftMin:
+            raise ValueError("RedshiftMagTable needs redshiftMin < redshiftMax; "
+                             "you gave %e, %e" % (redshiftMin, redshiftMax))
+        if tolerance <= 0.0:
+            raise ValueError("RedshiftMagTable needs a positive tolerance; you gave %e" % tolerance)
+
+        self._bandpassDict = bandpassDict
+        self._cosmological_dimming = cosmologicalDimming
+        self._tolerance = tolerance
+        self._min_redshift_step = minRedshiftStep
+
+        self._sed_names = sorted(set([name for name in sedNameList if name != "None"]))
+        self._sed_dex = dict([(name, ix) for ix, name in enumerate(self._sed_names)])
+
+        self._templates = []
+        for sedName in self._sed_names:
+            if specMap is not None:
+                fileName = os.path.join(fileDir, specMap[sedName])
+            else:
+                fileName = os.path.join(fileDir, sedName)
+            sedObj = Sed()
+            sedObj.readSED_flambda(fileName)
+            self._templates.append(sedObj)
+
+        self._key = self._tableKey(redshiftMin, redshiftMax, nInitial, normalizingBandpass)
+
+        if cacheDir is None:
+            cacheDir = _default_table_cache_dir()
+        self._cache_name = None
+        if cacheDir is not None:
+            self._cache_name = os.path.join(cacheDir, 'redshift_mag_table_%s.npz' % self._key)
+
+        if self._cache_name is not None and os.path.exists(self._cache_name):
+            self._readTable(self._cache_name)
+        else:
+            self._norm_mag = numpy.array([_getNormalizingMag(sedObj, normalizingBandpass)
+                                          for sedObj in self._templates])
+            self._buildTable(redshiftMin, redshiftMax, nInitial)
+            if self._cache_name is not None:
+                self._writeTable(self._cache_name)
+
+        # the templates are only needed to build the table
+        self._templates = None
+
+    def _tableKey(self, redshiftMin, redshiftMax, nInitial, normalizingBandpass):
+        """
+        Return a hash of everything that determines the contents of the table
+        """
+        hasher = hashlib.sha1()
+        hasher.update(('%d %.17g %.17g %.17g %.17g %d %d' %
+                       (_redshift_mag_table_version, redshiftMin, redshiftMax,
+                        self._tolerance, self._min_redshift_step, nInitial,
+                        self._cosmological_dimming)).encode('utf-8'))
+        hasher.update(' '.join(self._bandpassDict.keys()).encode('utf-8'))
+        hasher.update(numpy.ascontiguousarray(self._bandpassDict.phiArray).tobytes())
+        hasher.update(numpy.ascontiguousarray(self._bandpassDict.wavelenMatch).tobytes())
+        if normalizingBandpass is None:
+            hasher.update(b'imsim')
+        else:
+            hasher.update(numpy.ascontiguousarray(normalizingBandpass.wavelen).tobytes())
+            hasher.update(numpy.ascontiguousarray(normalizingBandpass.sb).tobytes())
+        for sedName, sedObj in zip(self._sed_names, self._templates):
+            hasher.update(sedName.encode('utf-8'))
+            hasher.update(numpy.ascontiguousarray(sedObj.wavelen).tobytes())
+            hasher.update(numpy.ascontiguousarray(sedObj.flambda).tobytes())
+        return hasher.hexdigest()
+
+    def _calcMags(self, redshiftArray):
+        """
+        Calculate the magnitudes of every template at every redshift in
+        redshiftArray.
+
+        Returns
+        -------
+        A numpy array of shape (n_templates, len(redshiftArray), n_bandpasses)
+        """
+        mags = numpy.empty((len(self._templates), len(redshiftArray), len(self._bandpassDict)),
+                           dtype=float)
+        for ix, template in enumerate(self._templates):
+            for iz, redshift in enumerate(redshiftArray):
+                sedObj = Sed(wavelen=template.wavelen, flambda=template.flambda)
+                sedObj.redshiftSED(redshift, dimming=self._cosmological_dimming)
+                mags[ix][iz] = self._bandpassDict.magListForSed(sedObj)
+        return mags
+
+    def _buildTable(self, redshiftMin, redshiftMax, nInitial):
+        """
+        Build the redshift grid and the table of magnitudes on it
+        (see the module docstring)
+        """
+        grid = numpy.linspace(redshiftMin, redshiftMax, nInitial)
+        mags = self._calcMags(grid)
+
+        # intervals (indexed by their left end) still to be checked
+        unchecked = numpy.arange(len(grid) - 1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            while len(unchecked) > 0:
+                mid_grid = 0.5*(grid[unchecked] + grid[unchecked + 1])
+                mid_mags = self._calcMags(mid_grid)
+                interp_mags = 0.5*(mags[:, unchecked] + mags[:, unchecked + 1])
+                error = numpy.abs(mid_mags - interp_mags)
+                error = numpy.where(numpy.isfinite(error), error, 0.0)
+                bisect = numpy.logical_and(error.max(axis=(0, 2)) > 0.5*self._tolerance,
+                                           grid[unchecked + 1] - grid[unchecked] >
+                                           2.0*self._min_redshift_step)
+                if not bisect.any():
+                    break
+
+                # insert the midpoints of the intervals to be bisected
+                insert_at = unchecked[bisect] + 1
+                grid = numpy.insert(grid, insert_at, mid_grid[bisect])
+                mags = numpy.insert(mags, insert_at, mid_mags[:, bisect], axis=1)
+
+                # both halves of each bisected interval need to be checked;
+                # after the insertion, the left half of the interval that
+                # started at unchecked[i] starts at unchecked[i] + (number of
+                # insertions before it)
+                n_before = numpy.cumsum(bisect) - bisect
+                left = unchecked[bisect] + n_before[bisect]
+                unchecked = numpy.sort(numpy.concatenate([left, left + 1]))
+
+        self._redshift_grid = grid
+        self._mags = mags
+
+    def _writeTable(self, file_name):
+        """
+        Write the table to file_name (a .npz file); if that fails,
+        emit a warning and carry on
+        """
+        try:
+            if not os.path.exists(os.path.dirname(file_name)):
+                os.makedirs(os.path.dirname(file_name))
+            # write to a temporary file first, so that other processes
+            # never see a partially written table
+            temp_name = file_name[:-len('.npz')] + '_%d_tmp.npz' % os.getpid()
+            numpy.savez(temp_name, redshift_grid=self._redshift_grid, mags=self._mags,
+                        norm_mag=self._norm_mag, sed_names=numpy.array(self._sed_names),
+                        bandpass_names=numpy.array(list(self._bandpassDict.keys())))
+            os.rename(temp_name, file_name)
+        except (IOError, OSError) as err:
+            warnings.warn("Could not cache RedshiftMagTable in %s: %s" % (file_name, str(err)))
+
+    def _readTable(self, file_name):
+        """
+        Read the table from file_name (see _writeTable)
+        """
+        with numpy.load(file_name, allow_pickle=False) as data:
+            if list(data['sed_names']) != self._sed_names:
+                raise RuntimeError("The RedshiftMagTable cached in %s does not contain "
+                                   "the requested SEDs" % file_name)
+            self._redshift_grid = data['redshift_grid']
+            self._mags = data['mags']
+            self._norm_mag = data['norm_mag']
+
+    @property
+    def redshiftGrid(self):
+        """
+        The grid of redshifts on which magnitudes are tabulated
+        """
+        return self._redshift_grid
+
+    @property
+    def sedNames(self):
+        """
+        The (sorted) names of the tabulated templates
+        """
+        return list(self._sed_names)
+
+    @property
+    def tolerance(self):
+        """
+        The interpolation tolerance (in magnitudes) to which the table was built
+        """
+        return self._tolerance
+
+    @property
+    def cacheName(self):
+        """
+        The file in which this table is cached (None if it is not cached)
+        """
+        return self._cache_name
+
+    def magListForSeds(self, sedNameList, redshiftList, magNormList, indices=None):
+        """
+        Interpolate the magnitudes of templates normalized to magNormList (in the
+        normalizing bandpass) and redshifted to redshiftList, i.e. of the Seds a
+        SedList with no extinction would load, from the table.
+
+        @param [in] sedNameList is a list of template names ("None" yields a row
+        of numpy.NaN)
+
+        @param [in] redshiftList is a list of redshifts (they must be within the
+        limits of the redshift grid)
+
+        @param [in] magNormList is a list of magnitude normalizations
+
+        @param [in] indices is an optional list of indices indicating which bandpasses to actually
+        calculate magnitudes for.  Other magnitudes will be listed as numpy.NaN.
+
+        @param [out] output_list is a 2-D numpy array containing the magnitudes
+        of each Sed (the rows) in each bandpass contained in the BandpassDict
+        (the columns)
+        """
+        redshiftArray = numpy.asarray(redshiftList, dtype=float)
+        magNormArray = numpy.asarray(magNormList, dtype=float)
+        if (redshiftArray < self._redshift_grid[0]).any() or \
+           (redshiftArray > self._redshift_grid[-1]).any():
+            raise ValueError("RedshiftMagTable covers redshifts %e to %e; you asked for %e to %e"
+                             % (self._redshift_grid[0], self._redshift_grid[-1],
+                                redshiftArray.min(), redshiftArray.max()))
+
+        is_none = numpy.array([name == "None" for name in sedNameList], dtype=bool)
+        sed_dex = numpy.array([self._sed_dex[name] if name != "None" else 0
+                               for name in sedNameList], dtype=int)
+
+        z_dex = numpy.searchsorted(self._redshift_grid, redshiftArray, side='right') - 1
+        z_dex = numpy.clip(z_dex, 0, len(self._redshift_grid) - 2)
+        z_lo = self._redshift_grid[z_dex]
+        frac = (redshiftArray - z_lo)/(self._redshift_grid[z_dex + 1] - z_lo)
+
+        if indices is None:
+            table = self._mags
+        else:
+            table = self._mags[:, :, indices]
+
+        mags = table[sed_dex, z_dex]*(1.0 - frac)[:, None] + table[sed_dex, z_dex + 1]*frac[:, None]
+        mags += (magNormArray - self._norm_mag[sed_dex])[:, None]
+        mags[is_none] = numpy.NaN
+
+        if indices is None:
+            return mags
+
+        output = numpy.empty((len(mags), len(self._bandpassDict)), dtype=float)
+        output[:] = numpy.NaN
+        output[:, indices] = mags
+        return output
+
+    def fluxListForSeds(self, sedNameList, redshiftList, magNormList, indices=None):
+        """
+        Interpolate the fluxes of templates normalized to magNormList and redshifted
+        to redshiftList from the table (see magListForSeds, which takes the same
+        parameters; the fluxes are calculated from the interpolated magnitudes).
+
+        @param [out] output_list is a 2-D numpy array containing the fluxes
+        of each Sed (the rows) in each bandpass contained in the BandpassDict
+        (the columns)
+        """
+        mags = self.magListForSeds(sedNameList, redshiftList, magNormList, indices=indices)
+        return numpy.power(10.0, -0.4*(mags + Sed().zp))
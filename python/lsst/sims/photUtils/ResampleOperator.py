@@ -0,0 +1,248 @@
+"""
+This file defines ResampleOperator, the linear interpolation of spectra
+from one wavelength grid onto another (as done by Sed.resampleSED)
+with everything that depends only on the two grids -- which points of
+the source grid bracket each point of the target grid, and the
+distances between them -- computed once, so that it can be applied to
+any number of spectra (one at a time or stacked into a 2-D array)
+without searching the source grid again.
+
+Operators are cached for each pair of grids (see get_resample_operator),
+so that SEDs which share a native wavelength grid (e.g. all of the
+Kurucz models) are resampled onto a given grid with the same operator.
+Building an operator costs more than interpolating a single spectrum, so
+resample_flux (which Sed.resampleSED uses) only builds one for a pair of
+grids the second time it sees them; spectra on grids that are only used
+once (e.g. redshifted spectra) are interpolated directly.
+"""
+
+from builtins import object
+from collections import OrderedDict
+import numpy
+
+__all__ = ["ResampleOperator", "get_resample_operator", "resample_flux",
+           "clear_resample_operators"]
+
+
+# the largest number of ResampleOperators kept by get_resample_operator
+_max_resample_operators = 256
+
+# the cache of ResampleOperators, keyed on the lengths and ends of
+# their grids (see get_resample_operator); each value is a list of
+# the operators with that key
+_resample_operators = OrderedDict()
+_n_resample_operators = 0
+
+# the smallest source grid for which resample_flux (and SedList) use a
+# ResampleOperator; numpy.interp is as fast as an operator for smaller ones
+_min_operator_points = 4096
+
+# the keys of the pairs of grids resample_flux has seen, but not built
+# an operator for (the most recently seen _max_resample_operators of them)
+_seen_grid_keys = OrderedDict()
+
+
+class ResampleOperator(object):
+    """
+    Linear interpolation of spectra from the wavelength grid wavelen onto
+    the wavelength grid wavelen_match.  Points of wavelen_match outside of
+    wavelen are set to numpy.NaN.
+
+    The results are identical to numpy.interp(wavelen_match, wavelen, flux)
+    (with numpy.NaN outside of wavelen), which is what Sed.resampleSED used
+    to calculate directly.
+    """
+
+    def __init__(self, wavelen, wavelen_match):
+        """
+        Parameters
+        ----------
+        wavelen is the (increasing) wavelength grid of the spectra to be resampled
+
+        wavelen_match is the wavelength grid onto which to resample them
+        """
+        self._wavelen = numpy.array(wavelen, dtype=float)
+        self._wavelen_match = numpy.array(wavelen_match, dtype=float)
+        self._wavelen.flags.writeable = False
+        self._wavelen_match.flags.writeable = False
+
+        n_wavelen = len(self._wavelen)
+        if n_wavelen < 2:
+            raise ValueError("ResampleOperator needs at least two points in wavelen")
+
+        # this is the search done by numpy.interp: each point x of
+        # wavelen_match falls in the interval wavelen[lo] <= x < wavelen[lo+1]
+        lo = numpy.searchsorted(self._wavelen, self._wavelen_match, side='right') - 1
+        self._outside = numpy.where(numpy.logical_or(lo < 0, self._wavelen_match > self._wavelen[-1]))[0]
+        self._last = numpy.where(self._wavelen_match == self._wavelen[-1])[0]
+        self._lo = numpy.clip(lo, 0, n_wavelen - 2)
+        self._hi = self._lo + 1
+        self._offset = self._wavelen_match - self._wavelen[self._lo]
+        self._dx = self._wavelen[self._hi] - self._wavelen[self._lo]
+
+    @property
+    def wavelen(self):
+        """
+        The (read-only) wavelength grid from which this operator resamples
+        """
+        return self._wavelen
+
+    @property
+    def wavelen_match(self):
+        """
+        The (read-only) wavelength grid onto which this operator resamples
+        """
+        return self._wavelen_match
+
+    def matches(self, wavelen, wavelen_match):
+        """
+        Return True if this operator resamples from wavelen onto wavelen_match
+        """
+        return (len(wavelen) == len(self._wavelen) and
+                len(wavelen_match) == len(self._wavelen_match) and
+                numpy.array_equal(wavelen, self._wavelen) and
+                numpy.array_equal(wavelen_match, self._wavelen_match))
+
+    def apply(self, flux):
+        """
+        Resample flux.
+
+        Parameters
+        ----------
+        flux is a numpy array of a spectrum sampled on wavelen, or a 2-D numpy
+        array whose rows are spectra sampled on wavelen
+
+        Returns
+        -------
+        A numpy array of the spectrum (or a 2-D numpy array of the spectra)
+        resampled onto wavelen_match
+        """
+        flux = numpy.asarray(flux, dtype=float)
+        if flux.shape[-1] != len(self._wavelen):
+            raise ValueError("flux is sampled on %d points; ResampleOperator expects %d"
+                             % (flux.shape[-1], len(self._wavelen)))
+
+        # this is the arithmetic done by numpy.interp
+        flux_lo = flux.take(self._lo, axis=-1)
+        flux_hi = flux.take(self._hi, axis=-1)
+        result = numpy.subtract(flux_hi, flux_lo)
+        numpy.divide(result, self._dx, out=result)
+        numpy.multiply(result, self._offset, out=result)
+        numpy.add(result, flux_lo, out=result)
+
+        # (the sum is only NaN if some point is NaN or infinite)
+        if numpy.isnan(result.sum()):
+            bad = numpy.isnan(result)
+            # where that is NaN (e.g. because the slope is infinite),
+            # numpy.interp interpolates from the other end of the interval
+            # (and, failing that, uses the value at both ends if they agree)
+            with numpy.errstate(invalid='ignore'):
+                retry = ((flux_hi - flux_lo)/self._dx*(self._wavelen_match - self._wavelen[self._hi]) +
+                         flux_hi)
+            retry = numpy.where(numpy.logical_and(numpy.isnan(retry), flux_lo == flux_hi),
+                                flux_lo, retry)
+            result[bad] = retry[bad]
+
+        if len(self._last) > 0:
+            result[..., self._last] = flux[..., -1:]
+        if len(self._outside) > 0:
+            result[..., self._outside] = numpy.NaN
+        return result
+
+
+def _grid_key(wavelen, wavelen_match):
+    """
+    Return the key under which ResampleOperators from wavelen onto
+    wavelen_match are cached (the lengths and ends of the grids)
+    """
+    return (len(wavelen), float(wavelen[0]), float(wavelen[-1]),
+            len(wavelen_match), float(wavelen_match[0]), float(wavelen_match[-1]))
+
+
+def _cached_operator(key, wavelen, wavelen_match, build):
+    """
+    Return the cached ResampleOperator from wavelen onto wavelen_match
+    (whose key is key), building and caching one if there is none and build
+    is True (and returning None if there is none and build is False)
+    """
+    global _n_resample_operators
+
+    candidates = _resample_operators.get(key)
+    if candidates is None:
+        if not build:
+            return None
+        candidates = []
+    operator = None
+    for ix, candidate in enumerate(candidates):
+        if candidate.matches(wavelen, wavelen_match):
+            operator = candidates.pop(ix)
+            break
+    else:
+        if not build:
+            return None
+        operator = ResampleOperator(wavelen, wavelen_match)
+        _n_resample_operators += 1
+
+    # keep the key's operators in most recently used order
+    # (and the key at the most recently used end of the cache)
+    candidates.insert(0, operator)
+    _resample_operators.pop(key, None)
+    _resample_operators[key] = candidates
+
+    while _n_resample_operators > _max_resample_operators:
+        oldest_key = next(iter(_resample_operators))
+        oldest = _resample_operators[oldest_key]
+        oldest.pop()
+        _n_resample_operators -= 1
+        if len(oldest) == 0:
+            del _resample_operators[oldest_key]
+
+    return operator
+
+
+def get_resample_operator(wavelen, wavelen_match):
+    """
+    Return a ResampleOperator from wavelen onto wavelen_match, reusing a
+    cached one if one exists for these grids.  The most recently used
+    _max_resample_operators operators are cached.
+    """
+    return _cached_operator(_grid_key(wavelen, wavelen_match), wavelen, wavelen_match, True)
+
+
+def resample_flux(wavelen, flux, wavelen_match):
+    """
+    Linearly interpolate flux from wavelen onto wavelen_match, setting points
+    outside of wavelen to numpy.NaN (see ResampleOperator).  For source grids of
+    at least _min_operator_points points, a cached operator is used if there is
+    one, and one is built (and cached) if these grids have been seen before.
+    """
+    operator = None
+    if len(wavelen) >= _min_operator_points:
+        key = _grid_key(wavelen, wavelen_match)
+        operator = _cached_operator(key, wavelen, wavelen_match, False)
+        if operator is None:
+            if key in _seen_grid_keys:
+                del _seen_grid_keys[key]
+                operator = _cached_operator(key, wavelen, wavelen_match, True)
+            else:
+                _seen_grid_keys[key] = True
+                if len(_seen_grid_keys) > _max_resample_operators:
+                    _seen_grid_keys.popitem(last=False)
+
+    if operator is not None:
+        return operator.apply(flux)
+
+    flux_grid = numpy.interp(wavelen_match, wavelen, flux)
+    if wavelen[0] > wavelen_match[0] or wavelen[-1] < wavelen_match[-1]:
+        flux_grid[numpy.logical_or(wavelen_match < wavelen[0], wavelen_match > wavelen[-1])] = numpy.NaN
+    return flux_grid
+
+
+def clear_resample_operators():
+    """
+    Empty the cache of ResampleOperators (see get_resample_operator)
+    """
+    global _n_resample_operators
+    _resample_operators.clear()
+    _seen_grid_keys.clear()
+    _n_resample_operators = 0
@@ -51,8 +51,16 @@ Methods:
   self.fnu will be set to None. This is because many operations are typically chained together
   which alter flambda -- so it is more efficient to wait and recalculate fnu at the end, plus it
   avoids possible de-synchronization errors (flambda reflecting the addition of dust while fnu does
-  not, for example). If arrays are passed into a method, they will not be altered and the arrays
+  not, for example). Conversely, flambdaTofnu() does not recalculate an fnu that it calculated
+  from the current wavelen/flambda (setting self.wavelen, flambda or fnu marks fnu as stale), so that
+  calling it before every magnitude calculation is cheap.
+  If arrays are passed into a method, they will not be altered and the arrays
   which are returned will be allocated new memory.
+ The methods which transform an SED (flambdaTofnu / fnuToflambda, multiplyFluxNorm, addDust and
+  redshiftSED) each allocate the arrays they return and nothing else.  They can also be told to reuse
+  arrays instead: flambdaTofnu / fnuToflambda write their result into an array passed as out, and with
+  in_place=True multiplyFluxNorm, addDust and redshiftSED overwrite the arrays they were given (or
+  self's arrays, unless those are read-only) rather than allocating new ones.  SedList loads SEDs this way.
  Another general philosophy for Sed.py is use separate methods for items which only need to be generated once
   for several objects (such as the dust A_x, b_x arrays). This allows the user to optimize their code for
   faster operation, depending on what their requirements are (see example_SedBandpass_star.py and
@@ -91,12 +99,27 @@ from builtins import object
 import warnings
 import numpy
 import sys
+from collections import OrderedDict
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
 import time
-import scipy.interpolate as interpolate
-import gzip
 import pickle
 import os
+import shutil
+import multiprocessing
 from .PhysicalParameters import PhysicalParameters
+from .FileUtils import read_ascii_columns
+from .ResampleOperator import resample_flux
+from .WavelenGrid import _find_wavelen_grid, _wavelen_grids_match, _wavelen_grid_matches_limits
+from .SedCache import ColumnarSedCache, write_columnar_sed_cache
+from .SedCache import SharedSedCache, LazySedCache, BoundedSedCache
+from .SedCache import ResampledSedCache, _wavelen_grid_key
+from .SedCache import _sed_shard_list, _sed_shard_is_complete
+from .SedCache import _generate_sed_shard, _read_sed_shard
+from .SedCache import _build_sed_manifest, _write_sed_manifest
+from .SedCache import _read_sed_manifest, _diff_sed_manifests, _hash_sed_file
 import warnings
 try:
     from lsst.utils import getPackageDir
@@ -108,19 +131,54 @@ except:
 warnings.filterwarnings("default", category=DeprecationWarning, module='lsst.sims.photUtils.Sed')
 
 
-__all__ = ["Sed", "cache_LSST_seds", "read_close_Kurucz"]
+__all__ = ["Sed", "cache_LSST_seds", "read_close_Kurucz",
+           "configure_misc_sed_cache", "misc_sed_cache_info", "clear_misc_sed_cache",
+           "clear_resampled_sed_caches", "publish_LSST_sed_cache",
+           "attach_LSST_sed_cache", "release_LSST_sed_cache", "prefetch_seds"]
 
 
 _global_lsst_sed_cache = None
 
 # a cache for ASCII files read-in by the user
+# (a BoundedSedCache; see configure_misc_sed_cache)
 _global_misc_sed_cache = None
 
+# caches of SEDs resampled onto specific wavelength grids
+# (ResampledSedCaches keyed on the hash of their grids, limited like
+# _global_misc_sed_cache; only the _max_resampled_sed_caches most
+# recently used grids are kept)
+_global_resampled_sed_caches = OrderedDict()
+_max_resampled_sed_caches = 8
+
+# the (immutable) physical constants shared by all Seds
+_sed_physical_parameters = PhysicalParameters()
+
 
 class SedCacheError(Exception):
     pass
 
 
+def _read_only_view(arr):
+    """
+    Return a read-only view of the numpy array arr
+    """
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+def _reusable_array(arr, like):
+    """
+    Return arr if it is a writeable float array with the shape of the
+    array like (so that a result calculated from like can be stored in it),
+    otherwise None
+    """
+    if (isinstance(arr, numpy.ndarray) and arr.flags.writeable and
+        arr.dtype == float and arr.shape == numpy.shape(like)):
+        return arr
+    return None
+
+
 class sed_unpickler(pickle.Unpickler):
 
     _allowed_obj = (("numpy", "ndarray"),
@@ -169,9 +227,10 @@ def _validate_sed_cache():
     global _global_lsst_sed_cache
     if _global_lsst_sed_cache is None:
         raise SedCacheError("_global_lsst_sed_cache does not exist")
-    if not isinstance(_global_lsst_sed_cache, dict):
-        raise SedCacheError("_global_lsst_sed_cache is a %s; not a dict"
-                            % str(type(_global_lsst_sed_cache)))
+    if not isinstance(_global_lsst_sed_cache,
+                      (dict, ColumnarSedCache, SharedSedCache, LazySedCache)):
+        raise SedCacheError("_global_lsst_sed_cache is a %s; not a dict, ColumnarSedCache, "
+                            "SharedSedCache or LazySedCache" % str(type(_global_lsst_sed_cache)))
     sed_dir = getPackageDir('sims_sed_library')
     sub_dir_list = ['galaxySED', 'starSED']
     file_ct = 0
@@ -193,6 +252,56 @@ def _validate_sed_cache():
     return
 
 
+def _validate_sed_cache_against_manifest(cache_dir, cache_name, sed_root, manifest_hash):
+    """
+    Verify that _global_lsst_sed_cache contains exactly the SEDs listed
+    in the manifest stored with the cache, without touching
+    sims_sed_library itself.  Raises a SedCacheError if not.
+
+    Parameters
+    ----------
+    cache_dir is the directory containing the cache
+    cache_name is the name of the cache
+    sed_root is the root directory of sims_sed_library
+    manifest_hash is the checksum of the manifest recorded in
+    cache_version_N.txt when the cache was written
+    """
+    global _global_lsst_sed_cache
+    if _global_lsst_sed_cache is None:
+        raise SedCacheError("_global_lsst_sed_cache does not exist")
+
+    manifest_name = _sed_manifest_name(cache_dir, cache_name)
+    if not os.path.exists(manifest_name):
+        raise SedCacheError("The manifest %s does not exist" % manifest_name)
+    if _hash_sed_file(manifest_name) != manifest_hash:
+        raise SedCacheError("The manifest %s does not match the checksum in "
+                            "cache_version_%d.txt" % (manifest_name, sys.version_info.major))
+
+    manifest_root, manifest = _read_sed_manifest(manifest_name)
+    if manifest is None:
+        raise SedCacheError("Could not read the manifest %s" % manifest_name)
+    if manifest_root != sed_root:
+        raise SedCacheError("The manifest %s describes %s, not %s"
+                            % (manifest_name, manifest_root, sed_root))
+    if len(manifest) == 0:
+        raise SedCacheError("There were not files in _global_lsst_sed_cache")
+
+    for name in _global_lsst_sed_cache:
+        if os.path.relpath(name, sed_root) not in manifest:
+            raise SedCacheError("%s is in _global_lsst_sed_cache but not in %s"
+                                % (name, manifest_name))
+
+    # as in _validate_sed_cache, every star and galaxy SED must be cached
+    for rel_name in manifest:
+        if rel_name.split(os.sep)[0] in ('galaxySED', 'starSED'):
+            full_name = os.path.join(sed_root, rel_name)
+            if full_name not in _global_lsst_sed_cache:
+                raise SedCacheError("%s is not in _global_lsst_sed_cache"
+                                    % full_name)
+
+    return
+
+
 def _compare_cached_versus_uncached():
     """
     Verify that loading an SED from the pickled cache give identical
@@ -223,88 +332,327 @@ def _compare_cached_versus_uncached():
             raise SedCacheError(msg)
 
 
-def _generate_sed_cache(cache_dir, cache_name):
+def _list_sed_library(sed_root):
+    """
+    Return a list of the full paths to all of the SED files in
+    sims_sed_library that go into the SED cache.
+    """
+    sub_dir_list = ['agnSED', 'flatSED', 'ssmSED', 'starSED', 'galaxySED']
+
+    file_list = []
+    for sub_dir in sub_dir_list:
+        dir_tree = os.walk(os.path.join(sed_root, sub_dir))
+        for sub_tree in dir_tree:
+            file_list += [os.path.join(sub_tree[0], name)
+                          for name in sub_tree[2] if name.endswith('.gz')]
+    return file_list
+
+
+def _sed_manifest_name(cache_dir, cache_name):
+    """
+    Return the name of the file containing the manifest of the SED cache
+    cache_dir/cache_name (see SedCache.py)
+    """
+    return os.path.join(cache_dir, cache_name + '_manifest.txt')
+
+
+def _read_sed_for_cache(file_name):
+    """
+    Read the (wavelen, flambda) arrays of an SED file in the format
+    used by the SED cache.  This is a module-level function so that it
+    can be handed to the worker processes in _generate_sed_cache.
+    """
+    return read_ascii_columns(file_name)
+
+
+def _generate_sed_cache(cache_dir, cache_name, cache_format='pickle',
+                        n_processes=1, shard_size=100):
     """
     Read all of the SEDs from sims_sed_library into a dict.
     Pickle the dict and store it in
     sims_photUtils/cacheDir/lsst_sed_cache.p
+    (or write it in the columnar format defined in SedCache.py)
+
+    The SED files are parsed in shards of shard_size files, which are
+    written to cache_dir/cache_name_shards/ as they are completed.  If
+    generation is interrupted, calling this method again will only
+    parse the shards that do not already exist.  The shards are deleted
+    once the cache has been written.
 
     Parameters
     ----------
     cache_dir is the directory where the cache will be created
     cache_name is the name of the cache to be created
+    cache_format is either 'pickle' or 'columnar'
+    n_processes is the number of processes across which to parse the
+    SED files (None means one per CPU)
+    shard_size is the number of SED files in each shard
 
     Returns
     -------
-    The dict of SEDs (keyed to their full file name)
+    The dict of SEDs (keyed to their full file name), or a
+    ColumnarSedCache if cache_format == 'columnar'
     """
     sed_root = getPackageDir('sims_sed_library')
-    dtype = numpy.dtype([('wavelen', float), ('flambda', float)])
 
-    sub_dir_list = ['agnSED', 'flatSED', 'ssmSED', 'starSED', 'galaxySED']
+    file_list = _list_sed_library(sed_root)
 
-    cache = {}
+    shard_dir = os.path.join(cache_dir, cache_name + '_shards')
+    if not os.path.exists(shard_dir):
+        os.makedirs(shard_dir)
 
-    total_files = 0
-    for sub_dir in sub_dir_list:
-        dir_tree = os.walk(os.path.join(sed_root, sub_dir))
-        for sub_tree in dir_tree:
-            total_files += len([name for name in sub_tree[2] if name.endswith('.gz')])
+    shard_list = _sed_shard_list(file_list, shard_dir, shard_size)
+    todo_list = [(shard_path, shard_files, _read_sed_for_cache)
+                 for shard_path, shard_files in shard_list
+                 if not _sed_shard_is_complete(shard_path, shard_files)]
+
+    total_files = len(file_list)
+    done_files = total_files - sum([len(shard[1]) for shard in todo_list])
+
+    if n_processes is None:
+        n_processes = multiprocessing.cpu_count()
 
     t_start = time.time()
-    print("This could take about 15 minutes.")
+    if done_files > 0:
+        print("Resuming from %d of %d files already parsed." % (done_files, total_files))
+    print("This could take about 15 minutes on a single process.")
     print("Note: not all SED files are the same size. ")
     print("Do not expect the loading rate to be uniform.\n")
 
-    for sub_dir in sub_dir_list:
-        dir_tree = os.walk(os.path.join(sed_root, sub_dir))
-        for sub_tree in dir_tree:
-            dir_name = sub_tree[0]
-            file_list = sub_tree[2]
-
-            for file_name in file_list:
-                if file_name.endswith('.gz'):
-                    try:
-                        full_name = os.path.join(dir_name, file_name)
-                        data = numpy.genfromtxt(full_name, dtype=dtype)
-                        cache[full_name] = (data['wavelen'], data['flambda'])
-                        if len(cache) % (total_files//20) == 0:
-                            if len(cache) > total_files//20:
-                                sys.stdout.write('\r')
-                            sys.stdout.write('loaded %d of %d files in about %.2f seconds'
-                                             % (len(cache), total_files, time.time()-t_start))
-                            sys.stdout.flush()
-                    except:
-                        pass
+    if n_processes > 1 and len(todo_list) > 1:
+        pool = multiprocessing.Pool(processes=n_processes)
+        try:
+            shard_iterator = pool.imap_unordered(_generate_sed_shard, todo_list)
+            for n_files in shard_iterator:
+                done_files += n_files
+                sys.stdout.write('\rloaded %d of %d files in about %.2f seconds'
+                                 % (done_files, total_files, time.time()-t_start))
+                sys.stdout.flush()
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for shard in todo_list:
+            done_files += _generate_sed_shard(shard)
+            sys.stdout.write('\rloaded %d of %d files in about %.2f seconds'
+                             % (done_files, total_files, time.time()-t_start))
+            sys.stdout.flush()
 
     print('\n')
 
-    with open(os.path.join(cache_dir, cache_name), "wb") as file_handle:
-        pickle.dump(cache, file_handle)
+    cache = {}
+    for shard_path, shard_files in shard_list:
+        cache.update(_read_sed_shard(shard_path))
+
+    if cache_format == 'columnar':
+        cache = write_columnar_sed_cache(cache, os.path.join(cache_dir, cache_name))
+    else:
+        with open(os.path.join(cache_dir, cache_name), "wb") as file_handle:
+            pickle.dump(cache, file_handle)
+
+    shutil.rmtree(shard_dir)
+
+    _write_sed_manifest(_build_sed_manifest(sed_root, file_list), sed_root,
+                        _sed_manifest_name(cache_dir, cache_name))
 
     print('LSST SED cache saved to:\n')
     print('%s' % os.path.join(cache_dir, cache_name))
 
     # record the specific sims_sed_library directory being cached so that
     # a new cache will be generated if sims_sed_library gets updated
-    with open(os.path.join(cache_dir, "cache_version_%d.txt" % sys.version_info.major), "w") as file_handle:
-        file_handle.write("%s %s" % (sed_root, cache_name))
+    _write_sed_cache_version(cache_dir, sed_root, cache_name)
 
     return cache
 
 
-def cache_LSST_seds(wavelen_min=None, wavelen_max=None, cache_dir=None):
+def _update_sed_cache(cache, cache_dir, cache_name, n_processes=1):
     """
-    Read all of the SEDs in sims_sed_library into a dict.  Pickle the dict
-    and store it in sims_photUtils/cacheDir/lsst_sed_cache.p for future use.
+    Bring an existing SED cache up to date with sims_sed_library.
 
-    After the file has initially been created, the next time you run this script,
-    it will just use pickle to load the dict.
+    The manifest stored with the cache is compared against the files
+    currently in sims_sed_library.  Only the files that have been added,
+    or whose contents have changed, are parsed; files that have been
+    removed are dropped from the cache.  If sims_sed_library has moved,
+    the SEDs in the cache are renamed to reflect its new location.  The
+    cache and its manifest are then updated on disk.
 
-    Once the dict is loaded, Sed.readSED_flambda() will be able to read any
+    Caches generated before manifests existed are assumed to be consistent
+    with every file they contain; a manifest is generated for them.
+
+    Parameters
+    ----------
+    cache is the SED cache (a dict or a ColumnarSedCache)
+    cache_dir is the directory containing the cache
+    cache_name is the name of the cache
+    n_processes is the number of processes across which to parse the
+    changed SED files (None means one per CPU)
+
+    Returns
+    -------
+    The updated cache
+    """
+    sed_root = getPackageDir('sims_sed_library')
+    manifest_name = _sed_manifest_name(cache_dir, cache_name)
+    file_list = _list_sed_library(sed_root)
+
+    old_root, old_manifest = _read_sed_manifest(manifest_name)
+    if old_manifest is None:
+        old_root = sed_root
+        old_manifest = _build_sed_manifest(sed_root, [name for name in cache
+                                                      if name.startswith(os.path.join(sed_root, ''))
+                                                      and os.path.exists(name)])
+        new_manifest = _build_sed_manifest(sed_root, file_list, old_manifest=old_manifest)
+        # keep track of cached files that have since been deleted
+        for name in cache:
+            rel_name = os.path.relpath(name, sed_root)
+            if rel_name not in old_manifest:
+                old_manifest[rel_name] = (0, 0.0, '')
+    else:
+        new_manifest = _build_sed_manifest(sed_root, file_list, old_manifest=old_manifest)
+
+    added, changed, removed = _diff_sed_manifests(old_manifest, new_manifest)
+
+    modified_dict = False
+    if old_root != sed_root:
+        print("Moving cache of LSST SEDs from %s to %s" % (old_root, sed_root))
+        modified_dict = True
+        if isinstance(cache, ColumnarSedCache):
+            cache.relocate(old_root, sed_root)
+        else:
+            cache = dict([(os.path.join(sed_root, os.path.relpath(name, old_root)), value)
+                          for name, value in cache.items()])
+
+    if len(added) > 0 or len(changed) > 0 or len(removed) > 0:
+        print("Updating cache of LSST SEDs: %d files added, %d changed, %d removed"
+              % (len(added), len(changed), len(removed)))
+
+        to_parse = [os.path.join(sed_root, rel_name) for rel_name in added + changed]
+        if n_processes is None:
+            n_processes = multiprocessing.cpu_count()
+        if n_processes > 1 and len(to_parse) > 1:
+            pool = multiprocessing.Pool(processes=n_processes)
+            try:
+                parsed = pool.map(_read_sed_for_cache, to_parse)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            parsed = [_read_sed_for_cache(name) for name in to_parse]
+
+        new_seds = dict(zip(to_parse, parsed))
+        removed_names = [os.path.join(sed_root, rel_name) for rel_name in removed]
+
+        if isinstance(cache, ColumnarSedCache):
+            cache.patch(new_seds, removed_names)
+        else:
+            modified_dict = True
+            for name in removed_names:
+                cache.pop(name, None)
+            cache.update(new_seds)
+
+    if modified_dict and not isinstance(cache, ColumnarSedCache):
+        with open(os.path.join(cache_dir, cache_name), "wb") as file_handle:
+            pickle.dump(cache, file_handle)
+
+    _write_sed_manifest(new_manifest, sed_root, manifest_name)
+    _write_sed_cache_version(cache_dir, sed_root, cache_name)
+
+    return cache
+
+
+def _convert_pickled_sed_cache(cache_dir, pickle_name, columnar_name):
+    """
+    Convert an existing pickled SED cache into the columnar format
+    (so that users who already have a pickled cache do not have to
+    wait for the whole cache to be regenerated from ASCII).
+
+    Parameters
+    ----------
+    cache_dir is the directory containing both caches
+    pickle_name is the name of the pickled cache
+    columnar_name is the name of the columnar cache to be created
+
+    Returns
+    -------
+    A ColumnarSedCache opened on the new cache
+    """
+    print("\nConverting pickled cache of LSST SEDs in:\n%s" % os.path.join(cache_dir, pickle_name))
+    with open(os.path.join(cache_dir, pickle_name), 'rb') as input_file:
+        cache = sed_unpickler(input_file).load()
+    return write_columnar_sed_cache(cache, os.path.join(cache_dir, columnar_name))
+
+
+def _write_sed_cache_version(cache_dir, sed_root, cache_name):
+    """
+    Write the cache_version_N.txt file in cache_dir, recording the
+    sims_sed_library directory that was cached, the name of the cache
+    and the checksum of the cache's manifest (the manifest must already
+    have been written).
+    """
+    manifest_hash = _hash_sed_file(_sed_manifest_name(cache_dir, cache_name))
+    with open(os.path.join(cache_dir, "cache_version_%d.txt" % sys.version_info.major), "w") as file_handle:
+        file_handle.write("%s %s %s" % (sed_root, cache_name, manifest_hash))
+
+
+def _read_sed_cache_version(cache_dir):
+    """
+    Read the cache_version_N.txt file in cache_dir.
+
+    Returns
+    -------
+    A tuple containing the sims_sed_library directory, the name of the
+    cache and the checksum of the cache's manifest recorded in the file
+    (None, None, None if the file does not exist or is malformed;
+    the checksum is None if the file predates manifests)
+    """
+    version_name = os.path.join(cache_dir, "cache_version_%d.txt" % sys.version_info.major)
+    if not os.path.exists(version_name):
+        return None, None, None
+    with open(version_name, "r") as input_file:
+        lines = input_file.readlines()
+    if len(lines) != 1:
+        return None, None, None
+    info = lines[0].split()
+    if len(info) == 2:
+        return info[0], info[1], None
+    if len(info) != 3:
+        return None, None, None
+    return info[0], info[1], info[2]
+
+
+def cache_LSST_seds(wavelen_min=None, wavelen_max=None, cache_dir=None,
+                    cache_format='columnar', n_processes=1, validation='manifest',
+                    lazy=False):
+    """
+    Read all of the SEDs in sims_sed_library into a cache stored on disk
+    in sims_photUtils/cacheDir/ for future use.
+
+    After the cache has initially been created, the next time you run this script,
+    it will just open the existing cache.
+
+    Every cache is stored with a manifest recording the size, modification
+    time and hash of each SED file it contains.  By default, an existing
+    cache is only checked against its manifest (whose checksum is recorded
+    in cache_version_N.txt); sims_sed_library itself is not read.  If
+    validation='full', sims_sed_library is walked, only the SED files that
+    have been added, changed or removed since the cache was written are
+    re-parsed, the cache is patched in place, and a sample of cached SEDs
+    is compared against the ASCII files.  A full validation is also run
+    whenever the manifest check is not possible (e.g. the cache predates
+    manifests or sims_sed_library has moved) or fails.
+
+    Once the cache is loaded, Sed.readSED_flambda() will be able to read any
     LSST-shipped SED directly from memory, rather than using I/O to read it
     from an ASCII file stored on disk.
 
+    The default cache format is 'columnar': all of the SEDs are stored in two
+    flat arrays of floats that are opened with numpy.memmap (see SedCache.py).
+    Opening this cache is nearly instantaneous, and the memory it occupies
+    is shared between every process on a node that opens it.  If a pickled
+    cache already exists, it will be converted into the columnar format
+    rather than regenerated from ASCII.
+
+    The legacy 'pickle' format stores the cache as a pickled dict.
     Note: the dict of cached SEDs will take up about 5GB on disk.  Once loaded,
     the cache will take up about 1.5GB of memory.  The cache takes about 14 minutes
     to generate and about 51 seconds to load on a 2014 Mac Book Pro.
@@ -323,12 +671,42 @@ def cache_LSST_seds(wavelen_min=None, wavelen_max=None, cache_dir=None):
     the cache.  If set to None, the cache will be in
     $SIMS_SED_LIBRARY_DIR/lsst_sed_cache_dir/, which may be write-protected on
     shared installations of the LSST stack.  Defaults to None.
+
+    cache_format is either 'columnar' (the default) or 'pickle'
+
+    n_processes is the number of processes across which to parse the SED
+    files if the cache has to be generated (None means one per CPU).
+    Generation writes its progress to disk as it goes; if it is interrupted,
+    the next call to cache_LSST_seds() will resume where it left off.
+
+    validation is either 'manifest' (the default) or 'full' (see above)
+
+    lazy is a boolean.  If True and there is no up-to-date columnar cache
+    to open, no cache is generated (or loaded, or converted).  Instead, the
+    SED files in sims_sed_library are indexed and each SED is read from its
+    ASCII file the first time it is accessed, so that memory only grows with
+    the SEDs that are actually used.  (The columnar cache is already read
+    lazily, since it is memory-mapped.)  Defaults to False.
     """
 
     global _global_lsst_sed_cache
 
+    if cache_format not in ('columnar', 'pickle'):
+        raise ValueError("cache_format must be 'columnar' or 'pickle'; you gave %s" % cache_format)
+
+    if validation not in ('manifest', 'full'):
+        raise ValueError("validation must be 'manifest' or 'full'; you gave %s" % validation)
+
+    # SEDs resampled from the old cache may be out of date
+    clear_resampled_sed_caches()
+
     try:
-        sed_cache_name = os.path.join('lsst_sed_cache_%d.p' % sys.version_info.major)
+        pickle_cache_name = 'lsst_sed_cache_%d.p' % sys.version_info.major
+        columnar_cache_name = 'lsst_sed_cache_%d_columnar' % sys.version_info.major
+        if cache_format == 'columnar':
+            sed_cache_name = columnar_cache_name
+        else:
+            sed_cache_name = pickle_cache_name
         sed_dir = getPackageDir('sims_sed_library')
         if cache_dir is None:
             cache_dir = os.path.join(getPackageDir('sims_sed_library'), 'lsst_sed_cache_dir')
@@ -344,68 +722,387 @@ def cache_LSST_seds(wavelen_min=None, wavelen_max=None, cache_dir=None):
     if not os.path.exists(cache_dir):
         os.mkdir(cache_dir)
 
-    must_generate = False
-    if not os.path.exists(os.path.join(cache_dir, sed_cache_name)):
-        must_generate = True
-    if not os.path.exists(os.path.join(cache_dir, "cache_version_%d.txt" % sys.version_info.major)):
-        must_generate = True
+    version_dir, version_name, manifest_hash = _read_sed_cache_version(cache_dir)
+
+    # An existing cache can be brought up to date (rather than regenerated)
+    # if we know which sims_sed_library it was generated from: either the
+    # same directory as the current sims_sed_library, or a library whose
+    # contents are recorded in the cache's manifest.
+    can_update = False
+    if (version_name == sed_cache_name and
+        os.path.exists(os.path.join(cache_dir, sed_cache_name))):
+
+        if (version_dir == sed_dir or
+            os.path.exists(_sed_manifest_name(cache_dir, sed_cache_name))):
+
+            can_update = True
+
+    must_convert = False
+    if (not can_update and cache_format == 'columnar' and
+        version_name == pickle_cache_name and
+        os.path.exists(os.path.join(cache_dir, pickle_cache_name))):
+
+        if (version_dir == sed_dir or
+            os.path.exists(_sed_manifest_name(cache_dir, pickle_cache_name))):
+
+            must_convert = True
+
+    # Anything other than opening a columnar cache requires reading
+    # every SED, which a lazy cache avoids.
+    if lazy and not (can_update and cache_format == 'columnar'):
+        can_update = False
+        must_convert = False
+
+    if can_update:
+        print("\nOpening cache of LSST SEDs in:\n%s" % os.path.join(cache_dir, sed_cache_name))
+        if cache_format == 'columnar':
+            cache = ColumnarSedCache(os.path.join(cache_dir, sed_cache_name))
+        else:
+            with open(os.path.join(cache_dir, sed_cache_name), 'rb') as input_file:
+                cache = sed_unpickler(input_file).load()
+
+    # If possible, just check the cache against its manifest.
+    validated = False
+    if (can_update and validation == 'manifest' and version_dir == sed_dir and
+        manifest_hash is not None):
+
+        _global_lsst_sed_cache = cache
+        try:
+            _validate_sed_cache_against_manifest(cache_dir, sed_cache_name, sed_dir,
+                                                 manifest_hash)
+            validated = True
+        except SedCacheError as ee:
+            print(ee)
+            print("Running full validation of the cache of LSST SEDs")
+
+    if validated:
+        pass
+    elif can_update:
+        _global_lsst_sed_cache = _update_sed_cache(cache, cache_dir, sed_cache_name,
+                                                   n_processes=n_processes)
+    elif must_convert:
+        cache = _convert_pickled_sed_cache(cache_dir, pickle_cache_name, columnar_cache_name)
+        if os.path.exists(_sed_manifest_name(cache_dir, pickle_cache_name)):
+            shutil.copyfile(_sed_manifest_name(cache_dir, pickle_cache_name),
+                            _sed_manifest_name(cache_dir, columnar_cache_name))
+        _global_lsst_sed_cache = _update_sed_cache(cache, cache_dir, columnar_cache_name,
+                                                   n_processes=n_processes)
+    elif lazy:
+        print("\nIndexing LSST SEDs in:\n%s" % sed_dir)
+        _global_lsst_sed_cache = LazySedCache(_list_sed_library(sed_dir), _read_sed_for_cache)
     else:
-        with open(os.path.join(cache_dir, "cache_version_%d.txt" % sys.version_info.major), "r") as input_file:
-            lines = input_file.readlines()
-            if len(lines) != 1:
-                must_generate = True
-            else:
-                info = lines[0].split()
-                if len(info) != 2:
-                    must_generate = True
-                elif info[0] != sed_dir:
-                    must_generate = True
-                elif info[1] != sed_cache_name:
-                    must_generate = True
-
-    if must_generate:
         print("\nCreating cache of LSST SEDs in:\n%s" % os.path.join(cache_dir, sed_cache_name))
-        cache = _generate_sed_cache(cache_dir, sed_cache_name)
+        cache = _generate_sed_cache(cache_dir, sed_cache_name, cache_format=cache_format,
+                                    n_processes=n_processes)
         _global_lsst_sed_cache = cache
-    else:
-        print("\nOpening cache of LSST SEDs in:\n%s" % os.path.join(cache_dir, sed_cache_name))
-        with open(os.path.join(cache_dir, sed_cache_name), 'rb') as input_file:
-            _global_lsst_sed_cache = sed_unpickler(input_file).load()
 
     # Now that we have generated/loaded the cache, we must run tests
     # to make sure that the cache is correctly constructed.  If these
     # fail, _global_lsst_sed_cache will be set to 'None' and the code will
     # continue running.
     try:
-        _validate_sed_cache()
-        _compare_cached_versus_uncached()
+        if not validated:
+            _validate_sed_cache()
+            # a LazySedCache reads its SEDs straight from the ASCII files,
+            # so there is nothing to compare it to
+            if not isinstance(_global_lsst_sed_cache, LazySedCache):
+                _compare_cached_versus_uncached()
     except SedCacheError as ee:
-        print(ee.message)
+        print(ee)
         print("Cannot use cache of LSST SEDs")
         _global_lsst_sed_cache = None
         pass
 
-    if wavelen_min is not None or wavelen_max is not None:
+    if _global_lsst_sed_cache is not None and (wavelen_min is not None or wavelen_max is not None):
         if wavelen_min is None:
             wavelen_min = 0.0
         if wavelen_max is None:
             wavelen_max = numpy.inf
 
-        new_cache = {}
-        list_of_sed_names = list(_global_lsst_sed_cache.keys())
-        for file_name in list_of_sed_names:
-            wav, fl = _global_lsst_sed_cache.pop(file_name)
-            valid_dexes = numpy.where(numpy.logical_and(wav >= wavelen_min,
-                                                        wav <= wavelen_max))
-            new_cache[file_name] = (wav[valid_dexes], fl[valid_dexes])
+        if isinstance(_global_lsst_sed_cache, (ColumnarSedCache, LazySedCache)):
+            # these caches truncate SEDs as they are read, so that
+            # we do not have to pull the whole cache into memory here
+            _global_lsst_sed_cache.set_wavelen_limits(wavelen_min, wavelen_max)
+        else:
+            new_cache = {}
+            list_of_sed_names = list(_global_lsst_sed_cache.keys())
+            for file_name in list_of_sed_names:
+                wav, fl = _global_lsst_sed_cache.pop(file_name)
+                valid_dexes = numpy.where(numpy.logical_and(wav >= wavelen_min,
+                                                            wav <= wavelen_max))
+                new_cache[file_name] = (wav[valid_dexes], fl[valid_dexes])
 
-        _global_lsst_sed_cache = new_cache
+            _global_lsst_sed_cache = new_cache
 
     return
 
 
+def publish_LSST_sed_cache():
+    """
+    Copy the cache of LSST SEDs loaded by cache_LSST_seds() into a shared
+    memory segment (see SedCache.SharedSedCache), so that other processes
+    can read it without loading their own copy.  The cache in this process
+    is replaced by the shared copy.
+
+    Processes forked after this call (e.g. by a multiprocessing.Pool using
+    the 'fork' start method) inherit the shared cache automatically.
+    Other processes must call attach_LSST_sed_cache() with the returned
+    handle, e.g.
+
+        handle = publish_LSST_sed_cache()
+        pool = multiprocessing.Pool(initializer=attach_LSST_sed_cache,
+                                    initargs=(handle,))
+
+    Note: a columnar cache (the default) is memory-mapped, and is therefore
+    already shared between all of the processes on a node that open it.
+    Publishing is useful for pickled, lazy or wavelength-truncated caches.
+    Publishing a lazy cache reads every SED in it.
+
+    Returns
+    -------
+    The handle of the shared cache
+    """
+    global _global_lsst_sed_cache
+    if _global_lsst_sed_cache is None:
+        raise RuntimeError("There is no cache of LSST SEDs to publish; "
+                           "call cache_LSST_seds() first")
+    if not isinstance(_global_lsst_sed_cache, SharedSedCache):
+        _global_lsst_sed_cache = SharedSedCache.publish(_global_lsst_sed_cache)
+    return _global_lsst_sed_cache.handle
+
+
+def attach_LSST_sed_cache(handle):
+    """
+    Use the cache of LSST SEDs published by another process
+    (see publish_LSST_sed_cache) as this process's cache of LSST SEDs.
+
+    Parameters
+    ----------
+    handle is the handle returned by publish_LSST_sed_cache()
+    """
+    global _global_lsst_sed_cache
+    if (isinstance(_global_lsst_sed_cache, SharedSedCache) and
+        _global_lsst_sed_cache.handle == tuple(handle)):
+        return
+    _global_lsst_sed_cache = SharedSedCache(handle)
+    clear_resampled_sed_caches()
+
+
+def release_LSST_sed_cache():
+    """
+    Detach this process from a shared cache of LSST SEDs (destroying the
+    shared memory segment if this process published it) and unset the
+    cache of LSST SEDs.  The publishing process should only call this
+    after the processes that attached to the cache are done with it.
+    """
+    global _global_lsst_sed_cache
+    if not isinstance(_global_lsst_sed_cache, SharedSedCache):
+        return
+    cache = _global_lsst_sed_cache
+    _global_lsst_sed_cache = None
+    cache.close()
+    if cache.owner:
+        cache.unlink()
+
+
+def configure_misc_sed_cache(max_entries=None, max_bytes=None, policy='lru'):
+    """
+    Limit the in-memory cache of SEDs read in by Sed.readSED_flambda()
+    that are not part of the cache of LSST SEDs (see cache_LSST_seds).
+    By default, this cache grows without bound.
+
+    Parameters
+    ----------
+    max_entries is the maximum number of SEDs to keep in the cache
+    (None means no limit)
+
+    max_bytes is the maximum size (in bytes) of the wavelen and flambda
+    arrays kept in the cache (None means no limit)
+
+    policy determines which SEDs are evicted once a limit is exceeded:
+    'lru' (the default) evicts the least recently used SED; 'fifo'
+    evicts the oldest SED.
+
+    SEDs already in the cache are kept, subject to the new limits.
+
+    The same limits apply to each of the caches of SEDs resampled onto
+    a specific wavelength grid (see Sed.readSED_flambda).
+    """
+    global _global_misc_sed_cache
+    if _global_misc_sed_cache is None:
+        _global_misc_sed_cache = BoundedSedCache(max_entries=max_entries,
+                                                 max_bytes=max_bytes,
+                                                 policy=policy)
+    else:
+        _global_misc_sed_cache.set_limits(max_entries=max_entries,
+                                          max_bytes=max_bytes,
+                                          policy=policy)
+    for resampled_cache in _global_resampled_sed_caches.values():
+        resampled_cache.set_limits(max_entries=max_entries,
+                                   max_bytes=max_bytes,
+                                   policy=policy)
+
+
+def misc_sed_cache_info():
+    """
+    Return a dict describing the in-memory cache of SEDs read in by
+    Sed.readSED_flambda() (see configure_misc_sed_cache) with the keys
+
+    'policy', 'max_entries', 'max_bytes' -- the limits on the cache
+    'entries', 'bytes' -- the number of SEDs and bytes currently cached
+    'hits', 'misses' -- the number of reads served (or not) by the cache
+    'evictions' -- the number of SEDs evicted to satisfy the limits
+    """
+    global _global_misc_sed_cache
+    if _global_misc_sed_cache is None:
+        return BoundedSedCache().info()
+    return _global_misc_sed_cache.info()
+
+
+def clear_misc_sed_cache(reset_stats=True):
+    """
+    Empty the in-memory cache of SEDs read in by Sed.readSED_flambda()
+    (keeping its limits).  If reset_stats is True, the hit, miss and
+    eviction counters are also set to zero.
+
+    The caches of resampled SEDs (see clear_resampled_sed_caches)
+    are emptied as well.
+    """
+    global _global_misc_sed_cache
+    clear_resampled_sed_caches()
+    if _global_misc_sed_cache is None:
+        return
+    _global_misc_sed_cache.clear()
+    if reset_stats:
+        _global_misc_sed_cache.reset_stats()
+
+
+def prefetch_seds(file_names, n_workers=4, executor=None):
+    """
+    Read SED files into the in-memory cache of SEDs read in by
+    Sed.readSED_flambda() (see configure_misc_sed_cache) concurrently, so
+    that the time spent waiting on disk reads and gzip decompression
+    overlaps, rather than adding up as it does when Sed.readSED_flambda()
+    reads the files one at a time.
+
+    Parameters
+    ----------
+    file_names is a list of the names of the SED files to read (as they
+    would be passed to Sed.readSED_flambda()).  Files which are already in
+    the cache of LSST SEDs or in the in-memory cache are not read again;
+    files which cannot be read are skipped (Sed.readSED_flambda() will
+    raise the error when it tries to read them).
+
+    n_workers is the number of threads used to read the files
+
+    executor is an optional concurrent.futures executor to use instead of a
+    pool of n_workers threads (e.g. a ProcessPoolExecutor, for files whose
+    parsing, rather than reading, is the bottleneck)
+
+    Returns
+    -------
+    The number of files read
+
+    Note that, if the in-memory cache is bounded, prefetching more files
+    than it can hold evicts some of them before they are used.
+    """
+    global _global_lsst_sed_cache
+    global _global_misc_sed_cache
+
+    to_read = []
+    for file_name in sorted(set(file_names)):
+        if file_name.endswith('.gz'):
+            gzipped_name = file_name
+            unzipped_name = file_name[:-3]
+        else:
+            gzipped_name = file_name + '.gz'
+            unzipped_name = file_name
+        if _global_lsst_sed_cache is not None and \
+           (gzipped_name in _global_lsst_sed_cache or unzipped_name in _global_lsst_sed_cache):
+            continue
+        if _global_misc_sed_cache is not None and \
+           (gzipped_name in _global_misc_sed_cache or unzipped_name in _global_misc_sed_cache):
+            continue
+        to_read.append((file_name, gzipped_name))
+
+    if len(to_read) == 0:
+        return 0
+
+    own_executor = executor is None
+    if own_executor:
+        if ThreadPoolExecutor is None:
+            raise RuntimeError("prefetch_seds requires concurrent.futures (or an executor)")
+        executor = ThreadPoolExecutor(max_workers=n_workers)
+
+    n_read = 0
+    try:
+        futures = [(file_name, executor.submit(_read_sed_for_cache, gzipped_name))
+                   for file_name, gzipped_name in to_read]
+        if _global_misc_sed_cache is None:
+            _global_misc_sed_cache = BoundedSedCache()
+        for file_name, future in futures:
+            try:
+                _global_misc_sed_cache[file_name] = future.result()
+            except (IOError, OSError, ValueError):
+                continue
+            n_read += 1
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return n_read
+
+
+def _get_resampled_sed_cache(wavelen_match):
+    """
+    Return the ResampledSedCache for the wavelength grid wavelen_match
+    (creating it, with the limits of the cache of SEDs read in by the
+    user, if necessary).  Only the caches of the _max_resampled_sed_caches
+    most recently used grids are kept.
+    """
+    global _global_resampled_sed_caches
+    grid = _find_wavelen_grid(wavelen_match)
+    key = grid.key if grid is not None else _wavelen_grid_key(wavelen_match)
+    resampled_cache = _global_resampled_sed_caches.pop(key, None)
+    if resampled_cache is None:
+        if _global_misc_sed_cache is not None:
+            limits = _global_misc_sed_cache.info()
+            resampled_cache = ResampledSedCache(wavelen_match,
+                                                max_entries=limits['max_entries'],
+                                                max_bytes=limits['max_bytes'],
+                                                policy=limits['policy'])
+        else:
+            resampled_cache = ResampledSedCache(wavelen_match)
+    _global_resampled_sed_caches[key] = resampled_cache
+    while len(_global_resampled_sed_caches) > _max_resampled_sed_caches:
+        _global_resampled_sed_caches.popitem(last=False)
+    return resampled_cache
+
+
+def clear_resampled_sed_caches():
+    """
+    Empty the caches of SEDs resampled onto specific wavelength grids
+    (see Sed.readSED_flambda).  This is done whenever the cache of LSST
+    SEDs is (re)loaded and whenever clear_misc_sed_cache is called,
+    so that resampled copies of stale SEDs are not served.
+    """
+    global _global_resampled_sed_caches
+    _global_resampled_sed_caches = OrderedDict()
+
+
 class Sed(object):
     """Class for holding and utilizing spectral energy distributions (SEDs)"""
+
+    # Seds are slotted (and share one PhysicalParameters), so that a SedList of
+    # millions of them costs little more than their arrays.  '__dict__' keeps
+    # other attributes settable on Seds (and subclasses); the dict is only
+    # created when one is set.
+    __slots__ = ('_wavelen', '_flambda', '_fnu', '_fnu_current', 'zp', 'name', 'badval',
+                 '__dict__', '__weakref__')
+
+    _physParams = _sed_physical_parameters
+    _ln10_04 = 0.4*numpy.log(10.0)
+
     def __init__(self, wavelen=None, flambda=None, fnu=None, badval=numpy.NaN, name=None):
         """
         Initialize sed object by giving filename or lambda/flambda array.
@@ -420,8 +1117,6 @@ class Sed(object):
         self.name = name
         self.badval = badval
 
-        self._physParams = PhysicalParameters()
-
         # If init was given data to initialize class, use it.
         if (wavelen is not None) and ((flambda is not None) or (fnu is not None)):
             if name is None:
@@ -429,6 +1124,38 @@ class Sed(object):
             self.setSED(wavelen, flambda=flambda, fnu=fnu, name=name)
         return
 
+    # wavelen, flambda and fnu are properties so that setting any of them
+    # marks fnu as no longer calculated from the current wavelen/flambda
+    # (see flambdaTofnu).  Note that changing the elements of these arrays
+    # in place is not noticed: replace the arrays (or set fnu to None).
+
+    @property
+    def wavelen(self):
+        return self._wavelen
+
+    @wavelen.setter
+    def wavelen(self, value):
+        self._wavelen = value
+        self._fnu_current = False
+
+    @property
+    def flambda(self):
+        return self._flambda
+
+    @flambda.setter
+    def flambda(self, value):
+        self._flambda = value
+        self._fnu_current = False
+
+    @property
+    def fnu(self):
+        return self._fnu
+
+    @fnu.setter
+    def fnu(self, value):
+        self._fnu = value
+        self._fnu_current = False
+
     def __eq__(self, other):
         if self.name != other.name:
             return False
@@ -530,11 +1257,30 @@ class Sed(object):
         self.name = name
         return
 
-    def readSED_flambda(self, filename, name=None, cache_sed=True):
+    def readSED_flambda(self, filename, name=None, cache_sed=True, cache_view=False,
+                        wavelen_match=None):
         """
         Read a file containing [lambda Flambda] (lambda in nm) (Flambda erg/cm^2/s/nm).
 
-        Does not resample wavelen/flambda onto grid; leave fnu=None.
+        Does not resample wavelen/flambda onto grid; leave fnu=None
+        (unless wavelen_match is specified).
+
+        If cache_sed is True, the SED is added to the cache of SEDs read in
+        by the user (see configure_misc_sed_cache).
+
+        If cache_view is True and the SED is (or is put) in a cache,
+        self.wavelen and self.flambda are read-only views of the cached
+        arrays instead of copies.  The methods of Sed copy the arrays before
+        modifying them in place, but any other attempt to modify them in
+        place will raise a ValueError.
+
+        If wavelen_match (a numpy array) is specified, the SED is resampled
+        onto wavelen_match and fnu is calculated, exactly as if
+        resampleSED(wavelen_match=wavelen_match) and flambdaTofnu() had been
+        called after reading it.  The resampled SED is cached (separately for
+        each wavelength grid, within the limits set by configure_misc_sed_cache;
+        see clear_resampled_sed_caches) if cache_sed is True or the SED came
+        from the cache of LSST SEDs, so that it only needs to be resampled once.
         """
         global _global_lsst_sed_cache
         global _global_misc_sed_cache
@@ -548,6 +1294,29 @@ class Sed(object):
             gzipped_filename = filename + '.gz'
             unzipped_filename = filename
 
+        if name is None:
+            name = filename
+
+        resampled_cache = None
+        if wavelen_match is not None:
+            resampled_cache = _get_resampled_sed_cache(wavelen_match)
+            resampled_sed = resampled_cache.get(gzipped_filename)
+            if resampled_sed is not None:
+                resampled_flambda, resampled_fnu = resampled_sed
+                if cache_view:
+                    self.wavelen = resampled_cache.wavelen
+                    self.flambda = resampled_flambda
+                    self.fnu = resampled_fnu
+                else:
+                    self.wavelen = numpy.copy(resampled_cache.wavelen)
+                    self.flambda = numpy.copy(resampled_flambda)
+                    self.fnu = numpy.copy(resampled_fnu)
+                # the cached fnu was calculated from the cached flambda
+                # (see flambdaTofnu), as it is when the cache is missed
+                self._fnu_current = True
+                self.name = name
+                return
+
         cached_source = None
         if _global_lsst_sed_cache is not None:
             if gzipped_filename in _global_lsst_sed_cache:
@@ -556,52 +1325,56 @@ class Sed(object):
                 cached_source = _global_lsst_sed_cache[unzipped_filename]
 
         if cached_source is None and _global_misc_sed_cache is not None:
-            if gzipped_filename in _global_misc_sed_cache:
-                cached_source = _global_misc_sed_cache[gzipped_filename]
-            if unzipped_filename in _global_misc_sed_cache:
-                cached_source = _global_misc_sed_cache[unzipped_filename]
+            cached_source = _global_misc_sed_cache.get(unzipped_filename, gzipped_filename)
 
         if cached_source is not None:
-            sourcewavelen = numpy.copy(cached_source[0])
-            sourceflambda = numpy.copy(cached_source[1])
+            if cache_view:
+                sourcewavelen = _read_only_view(cached_source[0])
+                sourceflambda = _read_only_view(cached_source[1])
+            else:
+                sourcewavelen = numpy.copy(cached_source[0])
+                sourceflambda = numpy.copy(cached_source[1])
 
         if cached_source is None:
             # Read source SED from file - lambda, flambda should be first two columns in the file.
             # lambda should be in nm and flambda should be in ergs/cm2/s/nm
-            dtype = numpy.dtype([('wavelen', float), ('flambda', float)])
             try:
-                data = numpy.genfromtxt(gzipped_filename, dtype=dtype)
-            except IOError:
-                try:
-                    data = numpy.genfromtxt(unzipped_filename, dtype=dtype)
-                except Exception as err:
-                    # see
-                    # http://stackoverflow.com/questions/
-                    # 9157210/how-do-i-raise-the-same-exception-with-a-custom-message-in-python
-                    new_args = [err.args[0] + \
-                                "\n\nError reading sed file %s; " % filename \
-                                + "it may not exist."]
-                    for aa in err.args[1:]:
-                        new_args.append(aa)
-                    err.args = tuple(new_args)
-                    raise
-
-            sourcewavelen = data['wavelen']
-            sourceflambda = data['flambda']
+                sourcewavelen, sourceflambda = read_ascii_columns(gzipped_filename)
+            except IOError as err:
+                # see
+                # http://stackoverflow.com/questions/
+                # 9157210/how-do-i-raise-the-same-exception-with-a-custom-message-in-python
+                new_args = [err.args[0] + \
+                            "\n\nError reading sed file %s; " % filename \
+                            + "it may not exist."]
+                for aa in err.args[1:]:
+                    new_args.append(aa)
+                err.args = tuple(new_args)
+                raise
 
             if cache_sed:
                 if _global_misc_sed_cache is None:
-                    _global_misc_sed_cache = {}
-                _global_misc_sed_cache[filename] = (numpy.copy(sourcewavelen),
-                                                    numpy.copy(sourceflambda))
+                    _global_misc_sed_cache = BoundedSedCache()
+                if cache_view:
+                    # nobody else has these arrays, so there is no need
+                    # to copy them into the cache
+                    _global_misc_sed_cache[filename] = (sourcewavelen, sourceflambda)
+                    sourcewavelen = _read_only_view(sourcewavelen)
+                    sourceflambda = _read_only_view(sourceflambda)
+                else:
+                    _global_misc_sed_cache[filename] = (numpy.copy(sourcewavelen),
+                                                        numpy.copy(sourceflambda))
 
         self.wavelen = sourcewavelen
         self.flambda = sourceflambda
         self.fnu = None
-        if name is None:
-            self.name = filename
-        else:
-            self.name = name
+        self.name = name
+
+        if resampled_cache is not None:
+            self.resampleSED(wavelen_match=wavelen_match)
+            self.flambdaTofnu()
+            if cache_sed or cached_source is not None:
+                resampled_cache[gzipped_filename] = (self.flambda, self.fnu)
         return
 
     def readSED_fnu(self, filename, name=None):
@@ -610,35 +1383,13 @@ class Sed(object):
 
         Does not resample wavelen/fnu/flambda onto a grid; leaves fnu set.
         """
-        # Try to open the data file.
-        try:
-            if filename.endswith('.gz'):
-                f = gzip.open(filename, 'rt')
-            else:
-                f = open(filename, 'r')
-        # if the above fails, look for the file with and without the gz
-        except IOError:
-            try:
-                if filename.endswith(".gz"):
-                    f = open(filename[:-3], 'r')
-                else:
-                    f = gzip.open(filename+".gz", 'rt')
-            except IOError:
-                raise IOError("The throughput file %s does not exist" % (filename))
         # Read source SED from file - lambda, fnu should be first two columns in the file.
         # lambda should be in nm and fnu should be in Jansky.
-        sourcewavelen = []
-        sourcefnu = []
-        for line in f:
-            if line.startswith("#"):
-                continue
-            values = line.split()
-            sourcewavelen.append(float(values[0]))
-            sourcefnu.append(float(values[1]))
-        f.close()
-        # Convert to numpy arrays.
-        sourcewavelen = numpy.array(sourcewavelen)
-        sourcefnu = numpy.array(sourcefnu)
+        # (if the file does not exist, the file with and without the gz is tried)
+        try:
+            sourcewavelen, sourcefnu = read_ascii_columns(filename)
+        except IOError:
+            raise IOError("The throughput file %s does not exist" % (filename))
         # Convert fnu to flambda
         self.fnuToflambda(sourcewavelen, sourcefnu)
         if name is None:
@@ -731,12 +1482,9 @@ class Sed(object):
         if wavelen is None:
             wavelen = self.wavelen
         # Check if wavelength arrays are equal, if wavelen_match passed.
+        # (This is an identity or hash comparison for the arrays of WavelenGrids.)
         if wavelen_match is not None:
-            if numpy.shape(wavelen_match) != numpy.shape(wavelen):
-                need_regrid = True
-            else:
-                # check the elements to see if any vary
-                need_regrid = numpy.any(abs(wavelen_match-wavelen) > 1e-10)
+            need_regrid = not _wavelen_grids_match(wavelen, wavelen_match)
         else:
             need_regrid = True
             # Check if wavelen_min/max/step are set - if ==None, then return (no regridding).
@@ -745,14 +1493,8 @@ class Sed(object):
                 need_regrid = False
             else:
                 # Okay, now look at comparison of wavelen to the grid.
-                wavelen_max_in = wavelen[len(wavelen)-1]
-                wavelen_min_in = wavelen[0]
-                # First check match to minimum/maximum :
-                if ((wavelen_min_in == wavelen_min) and (wavelen_max_in == wavelen_max)):
-                    # Then check on step size in wavelength array.
-                    stepsize = numpy.unique(numpy.diff(wavelen))
-                    if (len(stepsize) == 1) and (stepsize[0] == wavelen_step):
-                        need_regrid = False
+                need_regrid = not _wavelen_grid_matches_limits(wavelen, wavelen_min, wavelen_max,
+                                                               wavelen_step)
         # At this point, need_grid=True unless it's proven to be False, so return value.
         return need_regrid
 
@@ -791,11 +1533,9 @@ class Sed(object):
                               + ' (%.2f to %.2f)' % (wavelen_grid.min(), wavelen_grid.max())
                               + 'and sed %s (%.2f to %.2f)' % (self.name, wavelen.min(), wavelen.max()))
             # Do the interpolation of wavelen/flux onto grid. (type/len failures will die here).
-            if wavelen[0] > wavelen_grid[0] or wavelen[-1] < wavelen_grid[-1]:
-                f = interpolate.interp1d(wavelen, flux, bounds_error=False, fill_value=numpy.NaN)
-                flux_grid = f(wavelen_grid)
-            else:
-                flux_grid = numpy.interp(wavelen_grid, wavelen, flux)
+            # Points of the grid outside of wavelen are set to NaN.  The interpolation
+            # is cached for pairs of grids that are used repeatedly (see ResampleOperator).
+            flux_grid = resample_flux(wavelen, flux, wavelen_grid)
 
             # Update self values if necessary.
             if update_self:
@@ -809,41 +1549,75 @@ class Sed(object):
                 return
             return wavelen, flux
 
-    def flambdaTofnu(self, wavelen=None, flambda=None):
+    def flambdaTofnu(self, wavelen=None, flambda=None, out=None):
         """
         Convert flambda into fnu.
 
         This routine assumes that flambda is in ergs/cm^s/s/nm and produces fnu in Jansky.
         Can act on self or user can provide wavelen/flambda and get back wavelen/fnu.
+        If acting on self, and self.fnu was calculated by this method from the current
+        self.wavelen/flambda (none of them having been set since), it is not recalculated.
+
+        If out (a float array of the same length as wavelen) is specified, fnu is
+        written into it rather than into a new array.  out may be the passed flambda,
+        but not wavelen (nor, if acting on self, self.wavelen or self.flambda).
+        If acting on self, self.fnu is kept in an array of its own and copied into out,
+        so out may be reused afterwards without changing self.fnu.
         """
         # Change Flamda to Fnu by multiplying Flambda * lambda^2 = Fv
         # Fv dv = Fl dl .. Fv = Fl dl / dv = Fl dl / (dl*c/l/l) = Fl*l*l/c
         # Check - Is the method acting on self.wavelen/flambda/fnu or passed wavelen/flambda arrays?
         update_self = self._checkUseSelf(wavelen, flambda)
         if update_self:
+            if out is not None and numpy.may_share_memory(out, self.flambda):
+                raise ValueError("flambdaTofnu cannot write self.fnu into self.flambda")
+            if out is not None and numpy.may_share_memory(out, self.wavelen):
+                raise ValueError("flambdaTofnu cannot write fnu into wavelen")
+            if self._fnu_current:
+                # out still receives fnu
+                if out is not None and out is not self.fnu:
+                    numpy.copyto(out, self.fnu)
+                return
             wavelen = self.wavelen
             flambda = self.flambda
             self.fnu = None
+            # self.fnu must not be the caller's array, which may be reused
+            # (e.g. for another Sed); it is copied into out below
+            self_out = out
+            out = None
+        elif out is not None and numpy.may_share_memory(out, wavelen):
+            raise ValueError("flambdaTofnu cannot write fnu into wavelen")
         # Now on with the calculation.
-        # Calculate fnu.
-        fnu = flambda * wavelen * wavelen * self._physParams.nm2m / self._physParams.lightspeed
-        fnu = fnu * self._physParams.ergsetc2jansky
+        # Calculate fnu (in one array, in the order
+        # flambda * wavelen * wavelen * nm2m / lightspeed * ergsetc2jansky).
+        fnu = numpy.multiply(flambda, wavelen, out=out)
+        fnu *= wavelen
+        fnu *= self._physParams.nm2m
+        fnu /= self._physParams.lightspeed
+        fnu *= self._physParams.ergsetc2jansky
         # If are using/updating self, then *all* wavelen/flambda/fnu will be gridded.
         # This is so wavelen/fnu AND wavelen/flambda can be kept in sync.
         if update_self:
             self.wavelen = wavelen
             self.flambda = flambda
             self.fnu = fnu
+            self._fnu_current = True
+            if self_out is not None:
+                numpy.copyto(self_out, fnu)
             return
         # Return wavelen, fnu, unless updating self (then does not return).
         return wavelen, fnu
 
-    def fnuToflambda(self, wavelen=None, fnu=None):
+    def fnuToflambda(self, wavelen=None, fnu=None, out=None):
         """
         Convert fnu into flambda.
 
         Assumes fnu in units of Jansky and flambda in ergs/cm^s/s/nm.
         Can act on self or user can give wavelen/fnu and get wavelen/flambda returned.
+
+        If out (a float array of the same length as wavelen) is specified, flambda is
+        written into it rather than into a new array.  out may be the passed fnu,
+        but not wavelen (nor, if acting on self, self.wavelen or self.fnu).
         """
         # Fv dv = Fl dl .. Fv = Fl dl / dv = Fl dl / (dl*c/l/l) = Fl*l*l/c
         # Is method acting on self or passed arrays?
@@ -851,10 +1625,18 @@ class Sed(object):
         if update_self:
             wavelen = self.wavelen
             fnu = self.fnu
+            if out is not None and numpy.may_share_memory(out, fnu):
+                raise ValueError("fnuToflambda cannot write self.flambda into self.fnu")
+        if out is not None and numpy.may_share_memory(out, wavelen):
+            raise ValueError("fnuToflambda cannot write flambda into wavelen")
         # On with the calculation.
-        # Calculate flambda.
-        flambda = fnu / wavelen / wavelen * self._physParams.lightspeed / self._physParams.nm2m
-        flambda = flambda / self._physParams.ergsetc2jansky
+        # Calculate flambda (in one array, in the order
+        # fnu / wavelen / wavelen * lightspeed / nm2m / ergsetc2jansky).
+        flambda = numpy.divide(fnu, wavelen, out=out)
+        flambda /= wavelen
+        flambda *= self._physParams.lightspeed
+        flambda /= self._physParams.nm2m
+        flambda /= self._physParams.ergsetc2jansky
         # If updating self, then *all of wavelen/fnu/flambda will be updated.
         # This is so wavelen/fnu AND wavelen/flambda can be kept in sync.
         if update_self:
@@ -867,11 +1649,15 @@ class Sed(object):
 
     # methods to alter the sed
 
-    def redshiftSED(self, redshift, dimming=False, wavelen=None, flambda=None):
+    def redshiftSED(self, redshift, dimming=False, wavelen=None, flambda=None, in_place=False):
         """
         Redshift an SED, optionally adding cosmological dimming.
 
         Pass wavelen/flambda or redshift/update self.wavelen/flambda (unsets fnu).
+
+        If in_place is True, the passed wavelen/flambda (or self.wavelen/flambda,
+        unless they are read-only) are overwritten with the redshifted SED
+        instead of new arrays being allocated for it.
         """
         # Updating self or passed arrays?
         update_self = self._checkUseSelf(wavelen, flambda)
@@ -879,23 +1665,33 @@ class Sed(object):
             wavelen = self.wavelen
             flambda = self.flambda
             self.fnu = None
-        else:
-            # Make a copy of input data, because will change its values.
-            wavelen = numpy.copy(wavelen)
-            flambda = numpy.copy(flambda)
+        # The arrays the redshifted wavelen/flambda are written into
+        # (None: new arrays)
+        wavelen_out = None
+        flambda_out = None
+        if in_place:
+            if update_self:
+                wavelen_out = _reusable_array(wavelen, wavelen)
+                flambda_out = _reusable_array(flambda, flambda)
+            else:
+                wavelen_out = wavelen
+                flambda_out = flambda
         # Okay, move onto redshifting the wavelen/flambda pair.
         # Or blueshift, as the case may be.
         if redshift < 0:
-            wavelen = wavelen / (1.0-redshift)
+            wavelen = numpy.divide(wavelen, 1.0-redshift, out=wavelen_out)
         else:
-            wavelen = wavelen * (1.0+redshift)
+            wavelen = numpy.multiply(wavelen, 1.0+redshift, out=wavelen_out)
         # Flambda now just has different wavelength for each value.
         # Add cosmological dimming if required.
         if dimming:
             if redshift < 0:
-                flambda = flambda * (1.0-redshift)
+                flambda = numpy.multiply(flambda, 1.0-redshift, out=flambda_out)
             else:
-                flambda = flambda / (1.0+redshift)
+                flambda = numpy.divide(flambda, 1.0+redshift, out=flambda_out)
+        elif not update_self and flambda_out is None:
+            # the returned arrays are always new
+            flambda = numpy.copy(flambda)
         # Update self, if required - but just flambda (still no grid required).
         if update_self:
             self.wavelen = wavelen
@@ -1050,17 +1846,19 @@ class Sed(object):
         return self.addDust(a_x, b_x, A_v=A_v, ebv=ebv,
                             R_v=R_v, wavelen=wavelen, flambda=flambda)
 
-    def addDust(self, a_x, b_x, A_v=None, ebv=None, R_v=3.1, wavelen=None, flambda=None):
+    def addDust(self, a_x, b_x, A_v=None, ebv=None, R_v=3.1, wavelen=None, flambda=None,
+                in_place=False):
         """
         Add dust model extinction to the SED, modifying flambda and fnu.
 
         Get a_x and b_x either from setupCCMab or setupODonnell_ab
 
         Specify any two of A_V, E(B-V) or R_V (=3.1 default).
-        """
-        if not hasattr(self, '_ln10_04'):
-            self._ln10_04 = 0.4*numpy.log(10.0)
 
+        self.flambda is always extincted in place (unless it is read-only).
+        If in_place is True, so is the passed flambda (and the passed wavelen
+        is returned as it is) instead of copies of them.
+        """
         # The extinction law taken from Cardelli, Clayton and Mathis ApJ 1989.
         # The general form is A_l / A(V) = a(x) + b(x)/R_V  (where x=1/lambda in microns).
         # Then, different values for a(x) and b(x) depending on wavelength regime.
@@ -1073,7 +1871,11 @@ class Sed(object):
             wavelen = self.wavelen
             flambda = self.flambda
             self.fnu = None
-        else:
+            # flambda may be a read-only view of a cached SED
+            # (see readSED_flambda); copy it before modifying it
+            if not flambda.flags.writeable:
+                flambda = numpy.copy(flambda)
+        elif not in_place:
             wavelen = numpy.copy(wavelen)
             flambda = numpy.copy(flambda)
         # Input parameters for reddening can include any of 3 parameters; only 2 are independent.
@@ -1094,9 +1896,14 @@ class Sed(object):
                 A_v = R_v * ebv
         # R_v and A_v values are specified or calculated.
 
-        A_lambda = (a_x + b_x / R_v) * A_v
+        # A_lambda = (a_x + b_x / R_v) * A_v
         # dmag_red(dust) = -2.5 log10 (f_red / f_nored) : (f_red / f_nored) = 10**-0.4*dmag_red
-        dust = numpy.exp(-A_lambda*self._ln10_04)
+        # dust = exp(-A_lambda*0.4*ln(10)), calculated in a single array
+        dust = numpy.divide(b_x, R_v)
+        dust += a_x
+        dust *= A_v
+        dust *= -self._ln10_04
+        numpy.exp(dust, out=dust)
         flambda *= dust
         # Update self if required.
         if update_self:
@@ -1324,12 +2131,18 @@ class Sed(object):
         fluxnorm = numpy.power(10, (-0.4*dmag))
         return fluxnorm
 
-    def multiplyFluxNorm(self, fluxNorm, wavelen=None, fnu=None):
+    def multiplyFluxNorm(self, fluxNorm, wavelen=None, fnu=None, in_place=False):
         """
         Multiply wavelen/fnu (or self.wavelen/fnu) by fluxnorm.
 
         Returns wavelen/fnu arrays (or updates self).
         Note that multiplyFluxNorm does not regrid self.wavelen/flambda/fnu at all.
+
+        If in_place is True, the passed fnu is multiplied in place (and returned
+        with the passed wavelen) instead of a copy of it.  If acting on self,
+        self.fnu is multiplied in place and the new self.flambda is written into
+        the old one (unless they are read-only), so that no arrays are allocated
+        beyond the one for fnu, if self.fnu was not yet calculated.
         """
         # Note that fluxNorm is intended to be applied to f_nu,
         # so that fluxnorm*fnu*phi = mag (expected magnitude).
@@ -1340,18 +2153,24 @@ class Sed(object):
                 self.flambdaTofnu()
             wavelen = self.wavelen
             fnu = self.fnu
-        else:
-            # Require new copy of the data for multiply.
+        elif not in_place:
+            # Require new copy of the data (fnu is copied by the multiply).
             wavelen = numpy.copy(wavelen)
-            fnu = numpy.copy(fnu)
         # Apply fluxnorm.
-        fnu = fnu * fluxNorm
+        if in_place and (not update_self or _reusable_array(fnu, fnu) is not None):
+            fnu *= fluxNorm
+        else:
+            fnu = fnu * fluxNorm
         # Update self.
         if update_self:
+            flambda_out = None
+            if (in_place and not numpy.may_share_memory(self.flambda, fnu) and
+                not numpy.may_share_memory(self.flambda, wavelen)):
+                flambda_out = _reusable_array(self.flambda, fnu)
             self.wavelen = wavelen
             self.fnu = fnu
             # Update flambda as well.
-            self.fnuToflambda()
+            self.fnuToflambda(out=flambda_out)
             return
         # Else return new wavelen/fnu pairs.
         return wavelen, fnu
@@ -1623,9 +2442,10 @@ def read_close_Kurucz(teff, feH, logg):
     """
     global _global_lsst_sed_cache
 
-    # Load the cache if it hasn't been done
+    # Load the cache if it hasn't been done (lazily, since we only need
+    # the names of the Kurucz models and one SED)
     if _global_lsst_sed_cache is None:
-        cache_LSST_seds()
+        cache_LSST_seds(lazy=True)
     # Build an array with all the files in the cache
     if not hasattr(read_close_Kurucz, 'param_combos'):
         kurucz_files = [filename for filename
@@ -1659,9 +2479,9 @@ def read_close_Kurucz(teff, feH, logg):
     logg_diff = numpy.abs(read_close_Kurucz.param_combos['logg'][g1][g2] - logg)
     g3 = numpy.where(logg_diff == logg_diff.min())[0]
     fileMatch = read_close_Kurucz.param_combos['filename'][g1][g2][g3]
-    if numpy.size(fileMatch > 1):
+    if numpy.size(fileMatch) > 1:
         warnings.warn('Multiple close files')
-        fileMatch = fileMatch[0]
+    fileMatch = fileMatch[0]
 
     # Record what paramters were actually loaded
     teff = read_close_Kurucz.param_combos['teff'][g1][g2][g3][0]
@@ -0,0 +1,937 @@
+"""
+This file defines the on-disk formats used to cache the SEDs shipped with
+sims_sed_library (see Sed.cache_LSST_seds()).
+
+The columnar format stores every SED in the cache as a contiguous slice of
+two flat float arrays (one for wavelength, one for flambda), together with
+an index mapping the name of each SED file onto the (offset, length) of its
+slice.  The flat arrays are opened with numpy.memmap, so that opening the
+cache only requires reading the index.  The pages of the flat arrays are
+only read from disk as individual SEDs are accessed and are shared (through
+the operating system's page cache) between all of the processes on a node
+that open the same cache.
+
+A columnar cache is a directory containing the files
+
+    wavelen.bin -- the flat array of wavelengths (in nm; little-endian float64)
+    flambda.bin -- the flat array of flambda (in ergs/cm^2/s/nm; little-endian float64)
+    index.npy -- a structured array with columns 'name', 'offset', 'length'
+
+The flat arrays are only ever appended to.  Patching the cache (adding,
+replacing or removing SEDs) appends any new data to the flat arrays and
+atomically replaces the index, so processes that already have the cache
+open continue to see a consistent (if stale) set of SEDs.
+
+While a cache is being generated, the SED files are parsed in shards
+(fixed, sorted subsets of the library).  Each shard is written to disk
+as soon as it is complete, so that shards can be parsed in parallel and
+an interrupted generation can resume from the shards that already exist.
+
+Each cache is accompanied by a manifest recording the size, modification
+time and SHA-1 hash of every SED file (relative to the root of
+sims_sed_library) that went into it.  Comparing the manifest against the
+library tells cache_LSST_seds() which files have been added, changed or
+removed, so that only those files need to be re-parsed.
+
+A SharedSedCache holds a copy of the cache in a shared memory segment, so
+that worker processes can attach to SEDs loaded once by their parent
+(whatever the format of the cache the parent loaded).
+
+A LazySedCache knows the names of all of the SEDs in sims_sed_library,
+but only reads each SED from its ASCII file the first time it is accessed.
+
+A ResampledSedCache holds SEDs that have already been resampled onto a
+particular wavelength grid (with fnu precomputed), so that SEDs which are
+always resampled onto the same grid (e.g. BandpassDict.wavelenMatch) only
+need to be resampled once.  It is a BoundedSedCache, and is limited like
+the cache of SEDs that are not part of sims_sed_library (below).
+
+SEDs that are not part of sims_sed_library are cached in memory by a
+BoundedSedCache, which can be limited to a maximum number of entries
+and/or bytes (see Sed.configure_misc_sed_cache()).
+"""
+
+from builtins import zip
+from builtins import range
+from builtins import object
+import os
+import shutil
+import hashlib
+import numpy
+from collections import OrderedDict
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+__all__ = ["ColumnarSedCache", "write_columnar_sed_cache", "SharedSedCache",
+           "LazySedCache", "ResampledSedCache", "BoundedSedCache"]
+
+
+_columnar_wavelen_name = 'wavelen.bin'
+_columnar_flambda_name = 'flambda.bin'
+_columnar_index_name = 'index.npy'
+_columnar_dtype = numpy.dtype('<f8')
+
+
+def _truncate_sed(wavelen, flambda, wavelen_min, wavelen_max):
+    """
+    Return the (wavelen, flambda) tuple truncated to the range
+    wavelen_min <= wavelen <= wavelen_max (either limit may be None)
+    """
+    if wavelen_min is None and wavelen_max is None:
+        return wavelen, flambda
+    if wavelen_min is None:
+        wavelen_min = 0.0
+    if wavelen_max is None:
+        wavelen_max = numpy.inf
+    valid_dexes = numpy.where(numpy.logical_and(wavelen >= wavelen_min,
+                                                wavelen <= wavelen_max))
+    return wavelen[valid_dexes], flambda[valid_dexes]
+
+
+def _write_columnar_index(index_dict, cache_path):
+    """
+    Atomically replace the index of a columnar cache.
+
+    Parameters
+    ----------
+    index_dict is a dict mapping SED names onto (offset, length) tuples
+    cache_path is the directory containing the cache
+    """
+    name_list = sorted(index_dict.keys())
+    name_len = max([1] + [len(name) for name in name_list])
+    index = numpy.zeros(len(name_list), dtype=[('name', 'U%d' % name_len),
+                                               ('offset', numpy.int64),
+                                               ('length', numpy.int64)])
+    index['name'] = name_list
+    index['offset'] = [index_dict[name][0] for name in name_list]
+    index['length'] = [index_dict[name][1] for name in name_list]
+
+    scratch_name = os.path.join(cache_path, 'index_tmp.npy')
+    numpy.save(scratch_name, index)
+    os.rename(scratch_name, os.path.join(cache_path, _columnar_index_name))
+
+
+def write_columnar_sed_cache(sed_dict, cache_path):
+    """
+    Write a dict of SEDs to disk in the columnar cache format.
+
+    Parameters
+    ----------
+    sed_dict is a dict keyed on SED file names whose values are
+    (wavelen, flambda) tuples of numpy arrays
+
+    cache_path is the directory in which to write the cache.  If it
+    already exists, it will be replaced.
+
+    Returns
+    -------
+    A ColumnarSedCache opened on the newly written cache
+    """
+    # write into a scratch directory and move it into place at the end
+    # so that a crash part way through does not leave a corrupted cache
+    # where cache_LSST_seds() will find it
+    scratch_path = cache_path + '.tmp'
+    if os.path.exists(scratch_path):
+        shutil.rmtree(scratch_path)
+    os.makedirs(scratch_path)
+
+    # write the flat arrays one SED at a time so that we never hold
+    # a second copy of the whole cache in memory
+    index_dict = {}
+    offset = 0
+    with open(os.path.join(scratch_path, _columnar_wavelen_name), 'wb') as wavelen_file:
+        with open(os.path.join(scratch_path, _columnar_flambda_name), 'wb') as flambda_file:
+            for name in sorted(sed_dict.keys()):
+                wavelen, flambda = sed_dict[name]
+                wavelen_file.write(numpy.asarray(wavelen, dtype=_columnar_dtype).tobytes())
+                flambda_file.write(numpy.asarray(flambda, dtype=_columnar_dtype).tobytes())
+                index_dict[name] = (offset, len(wavelen))
+                offset += len(wavelen)
+
+    _write_columnar_index(index_dict, scratch_path)
+
+    if os.path.exists(cache_path):
+        shutil.rmtree(cache_path)
+    os.rename(scratch_path, cache_path)
+
+    return ColumnarSedCache(cache_path)
+
+
+class _FlatSedCache(object):
+    """
+    Base class for SED caches that store every SED as a slice of two flat
+    arrays (self._wavelen and self._flambda), with self._index mapping the
+    name of each SED onto the (offset, length) of its slice.
+    """
+
+    def set_wavelen_limits(self, wavelen_min=None, wavelen_max=None):
+        """
+        Truncate every SED returned by this cache to the range
+        wavelen_min <= wavelen <= wavelen_max (in nm).  Setting both
+        limits to None removes the truncation.
+        """
+        self._wavelen_min = wavelen_min
+        self._wavelen_max = wavelen_max
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        for name in self._index:
+            yield name
+
+    def keys(self):
+        return list(self._index.keys())
+
+    def _raw_item(self, name):
+        offset, length = self._index[name]
+        return self._wavelen[offset:offset+length], self._flambda[offset:offset+length]
+
+    def __getitem__(self, name):
+        wav, fl = self._raw_item(name)
+        return _truncate_sed(wav, fl, self._wavelen_min, self._wavelen_max)
+
+
+class ColumnarSedCache(_FlatSedCache):
+    """
+    A dict-like interface to an SED cache stored in the columnar format
+    (see write_columnar_sed_cache).
+
+    Indexing the cache with the name of an SED file returns a
+    (wavelen, flambda) tuple, exactly as indexing the dict stored in
+    the pickled cache would.  The returned arrays are read-only
+    views into the memory-mapped flat arrays; callers who wish to
+    modify them must copy them first (as Sed.readSED_flambda() does).
+    The contents of the cache can only be changed through patch() and
+    relocate().
+    """
+
+    def __init__(self, cache_path, wavelen_min=None, wavelen_max=None):
+        """
+        Parameters
+        ----------
+        cache_path is the directory containing the cache
+
+        wavelen_min and wavelen_max (optional; in nm) truncate every SED
+        returned by the cache to the range wavelen_min <= wavelen <= wavelen_max
+        """
+        self._cache_path = cache_path
+        self._wavelen_min = wavelen_min
+        self._wavelen_max = wavelen_max
+        self._open()
+
+    def _open_flat_array(self, file_name):
+        full_name = os.path.join(self._cache_path, file_name)
+        # numpy.memmap cannot map an empty file
+        if os.path.getsize(full_name) == 0:
+            return numpy.zeros(0, dtype=_columnar_dtype)
+        return numpy.memmap(full_name, dtype=_columnar_dtype, mode='r')
+
+    def _open(self):
+        """
+        (Re)read the index and (re)map the flat arrays
+        """
+        index = numpy.load(os.path.join(self._cache_path, _columnar_index_name))
+        self._index = dict(zip(index['name'].tolist(),
+                               zip(index['offset'].tolist(), index['length'].tolist())))
+        self._wavelen = self._open_flat_array(_columnar_wavelen_name)
+        self._flambda = self._open_flat_array(_columnar_flambda_name)
+
+    @property
+    def cache_path(self):
+        """
+        The directory containing this cache
+        """
+        return self._cache_path
+
+    def patch(self, new_seds, removed_names=()):
+        """
+        Update the cache on disk in place.
+
+        Parameters
+        ----------
+        new_seds is a dict keyed on SED file names whose values are
+        (wavelen, flambda) tuples.  SEDs that are already in the cache
+        are replaced.
+
+        removed_names is a list of SED file names to remove from the cache
+
+        The data in new_seds is appended to the flat arrays.  If more than
+        half of the flat arrays is then taken up by SEDs that have been
+        replaced or removed, the cache is rewritten from scratch to reclaim
+        the space.
+        """
+        index_dict = dict(self._index)
+        for name in removed_names:
+            index_dict.pop(name, None)
+
+        offset = len(self._wavelen)
+        with open(os.path.join(self._cache_path, _columnar_wavelen_name), 'ab') as wavelen_file:
+            with open(os.path.join(self._cache_path, _columnar_flambda_name), 'ab') as flambda_file:
+                for name in sorted(new_seds.keys()):
+                    wavelen, flambda = new_seds[name]
+                    wavelen_file.write(numpy.asarray(wavelen, dtype=_columnar_dtype).tobytes())
+                    flambda_file.write(numpy.asarray(flambda, dtype=_columnar_dtype).tobytes())
+                    index_dict[name] = (offset, len(wavelen))
+                    offset += len(wavelen)
+
+        _write_columnar_index(index_dict, self._cache_path)
+        self._open()
+
+        n_live = sum([length for offset, length in self._index.values()])
+        if 2*n_live < len(self._wavelen):
+            self.compact()
+
+    def relocate(self, old_root, new_root):
+        """
+        Rename every SED in the cache whose name begins with the directory
+        old_root so that it begins with new_root instead (e.g. because
+        sims_sed_library has been installed in a new location).
+        """
+        old_root = os.path.join(old_root, '')
+        new_root = os.path.join(new_root, '')
+        index_dict = {}
+        for name, location in self._index.items():
+            if name.startswith(old_root):
+                name = new_root + name[len(old_root):]
+            index_dict[name] = location
+        _write_columnar_index(index_dict, self._cache_path)
+        self._open()
+
+    def compact(self):
+        """
+        Rewrite the cache so that the flat arrays only contain SEDs that
+        are still in the index.
+        """
+        sed_dict = dict([(name, self._raw_item(name)) for name in self._index])
+        write_columnar_sed_cache(sed_dict, self._cache_path + '.compact')
+        # release our maps on the old files before they are replaced
+        self._wavelen = None
+        self._flambda = None
+        shutil.rmtree(self._cache_path)
+        os.rename(self._cache_path + '.compact', self._cache_path)
+        self._open()
+
+
+class SharedSedCache(_FlatSedCache):
+    """
+    A dict-like SED cache held in a single multiprocessing.shared_memory
+    segment, so that many processes on a node can read the same SEDs
+    without each holding its own copy.
+
+    The process that publishes the cache creates it with
+    SharedSedCache.publish() and hands SharedSedCache.handle to other
+    processes (e.g. through the initializer of a multiprocessing.Pool),
+    which attach to it with SharedSedCache(handle).  As with
+    ColumnarSedCache, the arrays returned by the cache are read-only views
+    into the shared flat arrays.
+
+    The segment lives until the publishing process calls unlink() (every
+    process should call close() once it is done with the cache).
+    """
+
+    def __init__(self, handle, _segment=None):
+        """
+        Parameters
+        ----------
+        handle is the handle property of a published SharedSedCache
+        """
+        if shared_memory is None:
+            raise RuntimeError("SharedSedCache requires multiprocessing.shared_memory "
+                               "(python 3.8 or later)")
+        segment_name, n_seds, n_values, name_size = handle
+        if _segment is None:
+            try:
+                # do not let this process's resource tracker
+                # unlink a segment it did not create
+                _segment = shared_memory.SharedMemory(name=segment_name, track=False)
+            except TypeError:
+                _segment = shared_memory.SharedMemory(name=segment_name)
+        self._owner = False
+        self._segment = _segment
+        self._handle = tuple(handle)
+        self._wavelen_min = None
+        self._wavelen_max = None
+
+        arrays = self._layout(self._segment.buf, n_seds, n_values, name_size)
+        for arr in arrays:
+            arr.flags.writeable = False
+        self._wavelen, self._flambda, offsets, lengths, names = arrays
+        self._index = dict(zip([nn.decode('utf-8') for nn in names.tolist()],
+                               zip(offsets.tolist(), lengths.tolist())))
+
+    @staticmethod
+    def _layout(buf, n_seds, n_values, name_size):
+        """
+        Return the wavelen, flambda, offset, length and name arrays
+        stored in the shared memory buffer buf
+        """
+        arrays = []
+        start = 0
+        for dtype, count in ((_columnar_dtype, n_values), (_columnar_dtype, n_values),
+                             (numpy.dtype('<i8'), n_seds), (numpy.dtype('<i8'), n_seds),
+                             (numpy.dtype('S%d' % name_size), n_seds)):
+            arrays.append(numpy.ndarray((count,), dtype=dtype, buffer=buf, offset=start))
+            start += count*dtype.itemsize
+        return arrays
+
+    @classmethod
+    def publish(cls, sed_dict):
+        """
+        Copy the SEDs in sed_dict (any dict-like SED cache, keyed on SED
+        file names, whose values are (wavelen, flambda) tuples) into a new
+        shared memory segment.
+
+        Returns
+        -------
+        The SharedSedCache
+        """
+        if shared_memory is None:
+            raise RuntimeError("SharedSedCache requires multiprocessing.shared_memory "
+                               "(python 3.8 or later)")
+        name_list = sorted(sed_dict.keys())
+        encoded_names = [name.encode('utf-8') for name in name_list]
+        sed_list = [sed_dict[name] for name in name_list]
+        lengths = numpy.array([len(sed[0]) for sed in sed_list], dtype='<i8')
+        n_values = int(lengths.sum())
+        name_size = max([1] + [len(name) for name in encoded_names])
+        n_bytes = (2*n_values*_columnar_dtype.itemsize + 2*len(name_list)*8 +
+                   len(name_list)*name_size)
+
+        segment = shared_memory.SharedMemory(create=True, size=max(n_bytes, 1))
+        handle = (segment.name, len(name_list), n_values, name_size)
+        wavelen, flambda, offsets, lengths_out, names = cls._layout(segment.buf, *handle[1:])
+        offset = 0
+        for ix, (wav, fl) in enumerate(sed_list):
+            wavelen[offset:offset+lengths[ix]] = wav
+            flambda[offset:offset+lengths[ix]] = fl
+            offsets[ix] = offset
+            offset += lengths[ix]
+        lengths_out[:] = lengths
+        names[:] = encoded_names
+        # release our writeable views before the read-only ones are made
+        del wavelen, flambda, offsets, lengths_out, names
+        cache = cls(handle, _segment=segment)
+        cache._owner = True
+        return cache
+
+    @property
+    def handle(self):
+        """
+        A small picklable object identifying this cache to other processes
+        """
+        return self._handle
+
+    @property
+    def owner(self):
+        """
+        True if this process published the cache
+        """
+        return self._owner
+
+    def close(self):
+        """
+        Detach this process from the cache.  Any arrays this process
+        still holds that view the cache must be deleted first.
+        """
+        self._wavelen = None
+        self._flambda = None
+        self._index = {}
+        self._segment.close()
+
+    def unlink(self):
+        """
+        Destroy the shared memory segment (should only be called by the
+        process that published the cache, after every process has closed it)
+        """
+        self._segment.unlink()
+
+
+class LazySedCache(object):
+    """
+    A dict-like SED cache that is given the names of all of the SEDs
+    it can hold, but only reads each SED the first time it is accessed
+    (and keeps it in memory thereafter).
+
+    Indexing the cache with the name of an SED file returns a
+    (wavelen, flambda) tuple, exactly as indexing the dict stored in
+    the pickled cache would.  As with ColumnarSedCache, callers who wish
+    to modify the returned arrays must copy them first.
+    """
+
+    def __init__(self, name_list, reader, wavelen_min=None, wavelen_max=None):
+        """
+        Parameters
+        ----------
+        name_list is a list of the names of the SED files in the cache
+
+        reader is a function that takes the name of an SED file and
+        returns its (wavelen, flambda) arrays
+
+        wavelen_min and wavelen_max (optional; in nm) truncate every SED
+        returned by the cache to the range wavelen_min <= wavelen <= wavelen_max
+        """
+        self._names = set(name_list)
+        self._reader = reader
+        self._loaded = {}
+        self._wavelen_min = wavelen_min
+        self._wavelen_max = wavelen_max
+
+    def set_wavelen_limits(self, wavelen_min=None, wavelen_max=None):
+        """
+        Truncate every SED returned by this cache to the range
+        wavelen_min <= wavelen <= wavelen_max (in nm).  Setting both
+        limits to None removes the truncation.
+        """
+        self._wavelen_min = wavelen_min
+        self._wavelen_max = wavelen_max
+
+    def loaded_keys(self):
+        """
+        Return a list of the names of the SEDs that have been read so far
+        """
+        return list(self._loaded.keys())
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    def __iter__(self):
+        for name in self._names:
+            yield name
+
+    def keys(self):
+        return list(self._names)
+
+    def __getitem__(self, name):
+        if name not in self._loaded:
+            if name not in self._names:
+                raise KeyError(name)
+            self._loaded[name] = self._reader(name)
+        wav, fl = self._loaded[name]
+        return _truncate_sed(wav, fl, self._wavelen_min, self._wavelen_max)
+
+
+def _wavelen_grid_key(wavelen):
+    """
+    Return a string uniquely identifying the wavelength grid wavelen
+    (the SHA-1 hash of its values)
+    """
+    return hashlib.sha1(numpy.ascontiguousarray(wavelen, dtype=_columnar_dtype).tobytes()).hexdigest()
+
+
+class BoundedSedCache(object):
+    """
+    An in-memory SED cache with an optional limit on the number of SEDs
+    and/or the number of bytes it holds.
+
+    Like the dict stored in the pickled cache, the cache is keyed on SED
+    file names and its values are (wavelen, flambda) tuples.  Once either
+    limit is exceeded, SEDs are evicted from the cache according to
+    the eviction policy:
+
+    'lru' -- evict the least recently read (or stored) SED
+    'fifo' -- evict the SED that was stored first
+
+    The cache counts the number of hits (successful calls to get()),
+    misses (unsuccessful calls to get()) and evictions.
+    """
+
+    _policies = ('lru', 'fifo')
+
+    def __init__(self, max_entries=None, max_bytes=None, policy='lru'):
+        """
+        Parameters
+        ----------
+        max_entries is the maximum number of SEDs to keep (None means
+        no limit)
+
+        max_bytes is the maximum number of bytes of wavelen and flambda
+        data to keep (None means no limit)
+
+        policy is the eviction policy ('lru' or 'fifo')
+        """
+        self._data = OrderedDict()
+        self._n_bytes = 0
+        self.reset_stats()
+        self.set_limits(max_entries=max_entries, max_bytes=max_bytes, policy=policy)
+
+    def set_limits(self, max_entries=None, max_bytes=None, policy='lru'):
+        """
+        Change the limits and eviction policy of the cache (see __init__),
+        evicting SEDs as necessary to satisfy the new limits.
+        """
+        if policy not in self._policies:
+            raise ValueError("policy must be one of %s; you gave %s"
+                             % (str(self._policies), policy))
+        if max_entries is not None and max_entries < 0:
+            raise ValueError("max_entries cannot be negative; you gave %d" % max_entries)
+        if max_bytes is not None and max_bytes < 0:
+            raise ValueError("max_bytes cannot be negative; you gave %d" % max_bytes)
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._policy = policy
+        self._evict()
+
+    @staticmethod
+    def _sed_bytes(value):
+        return value[0].nbytes + value[1].nbytes
+
+    def _over_limit(self):
+        if self._max_entries is not None and len(self._data) > self._max_entries:
+            return True
+        if self._max_bytes is not None and self._n_bytes > self._max_bytes:
+            return True
+        return False
+
+    def _evict(self):
+        while len(self._data) > 0 and self._over_limit():
+            name, value = self._data.popitem(last=False)
+            self._n_bytes -= self._sed_bytes(value)
+            self._evictions += 1
+
+    def reset_stats(self):
+        """
+        Reset the hit, miss and eviction counters to zero
+        """
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def info(self):
+        """
+        Return a dict describing the current state of the cache
+        (its limits, the number of SEDs and bytes it holds and the
+        number of hits, misses and evictions so far)
+        """
+        return {'policy': self._policy,
+                'max_entries': self._max_entries,
+                'max_bytes': self._max_bytes,
+                'entries': len(self._data),
+                'bytes': self._n_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions}
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        for name in list(self._data.keys()):
+            yield name
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def __getitem__(self, name):
+        value = self._data[name]
+        if self._policy == 'lru':
+            # move name to the most recently used end of the queue
+            del self._data[name]
+            self._data[name] = value
+        return value
+
+    def get(self, *names):
+        """
+        Return the (wavelen, flambda) tuple stored under the first of
+        names that is in the cache, or None if none of them are
+        (counting a single hit or miss either way).
+        """
+        for name in names:
+            if name in self._data:
+                self._hits += 1
+                return self[name]
+        self._misses += 1
+        return None
+
+    def __setitem__(self, name, value):
+        if name in self._data:
+            self._n_bytes -= self._sed_bytes(self._data.pop(name))
+        n_bytes = self._sed_bytes(value)
+        if self._max_bytes is not None and n_bytes > self._max_bytes:
+            # this SED could never fit; do not evict everything else for it
+            return
+        self._data[name] = value
+        self._n_bytes += n_bytes
+        self._evict()
+
+    def __delitem__(self, name):
+        self._n_bytes -= self._sed_bytes(self._data.pop(name))
+
+    def clear(self):
+        """
+        Remove every SED from the cache (the counters are not reset)
+        """
+        self._data.clear()
+        self._n_bytes = 0
+
+
+class ResampledSedCache(BoundedSedCache):
+    """
+    An in-memory cache of SEDs that have been resampled onto a single
+    wavelength grid, with fnu precomputed.  The cache is keyed on the
+    names of the SED files; its values are (flambda, fnu) tuples of
+    read-only arrays defined on the wavelength grid self.wavelen.
+
+    Like a BoundedSedCache, it can be limited to a maximum number of
+    SEDs and/or bytes (of flambda and fnu data).
+    """
+
+    def __init__(self, wavelen, max_entries=None, max_bytes=None, policy='lru'):
+        """
+        Parameters
+        ----------
+        wavelen is the wavelength grid (in nm) onto which the SEDs
+        in this cache have been resampled
+
+        max_entries, max_bytes and policy are the limits on the cache
+        and its eviction policy (see BoundedSedCache)
+        """
+        self._wavelen = numpy.array(wavelen, dtype=float)
+        self._wavelen.flags.writeable = False
+        self._key = _wavelen_grid_key(self._wavelen)
+        BoundedSedCache.__init__(self, max_entries=max_entries, max_bytes=max_bytes,
+                                 policy=policy)
+
+    @property
+    def wavelen(self):
+        """
+        The (read-only) wavelength grid of this cache
+        """
+        return self._wavelen
+
+    @property
+    def key(self):
+        """
+        The hash of self.wavelen identifying this cache
+        """
+        return self._key
+
+    def __setitem__(self, name, value):
+        flambda = numpy.array(value[0], dtype=float)
+        fnu = numpy.array(value[1], dtype=float)
+        if flambda.shape != self._wavelen.shape or fnu.shape != self._wavelen.shape:
+            raise ValueError("SEDs in a ResampledSedCache must be defined on its wavelength grid")
+        flambda.flags.writeable = False
+        fnu.flags.writeable = False
+        BoundedSedCache.__setitem__(self, name, (flambda, fnu))
+
+
+def _hash_sed_file(file_name):
+    """
+    Return the SHA-1 hex digest of the contents of a file
+    """
+    hasher = hashlib.sha1()
+    with open(file_name, 'rb') as file_handle:
+        for chunk in iter(lambda: file_handle.read(1 << 20), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _build_sed_manifest(sed_root, file_list, old_manifest=None):
+    """
+    Build the manifest of a set of SED files.
+
+    Parameters
+    ----------
+    sed_root is the root directory of sims_sed_library
+
+    file_list is the list of (full paths to) the SED files
+
+    old_manifest is an optional manifest from which to reuse hashes;
+    a file is only re-hashed if it is not in old_manifest or its size
+    or modification time have changed.
+
+    Returns
+    -------
+    A dict mapping the path of each file relative to sed_root onto a
+    (size, mtime, sha1) tuple
+    """
+    manifest = {}
+    for full_name in file_list:
+        rel_name = os.path.relpath(full_name, sed_root)
+        stat = os.stat(full_name)
+        if old_manifest is not None and rel_name in old_manifest:
+            old_size, old_mtime, old_hash = old_manifest[rel_name]
+            if old_size == stat.st_size and old_mtime == stat.st_mtime:
+                manifest[rel_name] = (old_size, old_mtime, old_hash)
+                continue
+        manifest[rel_name] = (stat.st_size, stat.st_mtime, _hash_sed_file(full_name))
+    return manifest
+
+
+def _write_sed_manifest(manifest, sed_root, manifest_name):
+    """
+    Write a manifest (as returned by _build_sed_manifest) to disk.
+
+    Parameters
+    ----------
+    manifest is the manifest
+    sed_root is the root directory relative to which the manifest is defined
+    manifest_name is the name of the file to write
+    """
+    with open(manifest_name + '.tmp', 'w') as file_handle:
+        file_handle.write('# root %s\n' % sed_root)
+        for rel_name in sorted(manifest.keys()):
+            size, mtime, sha1 = manifest[rel_name]
+            file_handle.write('%s %d %s %s\n' % (rel_name, size, repr(mtime), sha1))
+    os.rename(manifest_name + '.tmp', manifest_name)
+
+
+def _read_sed_manifest(manifest_name):
+    """
+    Read a manifest written by _write_sed_manifest
+
+    Returns
+    -------
+    The root directory relative to which the manifest is defined and the
+    manifest itself (None, None if manifest_name does not exist or cannot
+    be parsed)
+    """
+    if not os.path.exists(manifest_name):
+        return None, None
+    manifest = {}
+    sed_root = None
+    with open(manifest_name, 'r') as file_handle:
+        for line in file_handle:
+            if line.startswith('# root '):
+                sed_root = line[len('# root '):].rstrip('\n')
+                continue
+            try:
+                rel_name, size, mtime, sha1 = line.rstrip('\n').rsplit(' ', 3)
+                manifest[rel_name] = (int(size), float(mtime), sha1)
+            except ValueError:
+                return None, None
+    return sed_root, manifest
+
+
+def _diff_sed_manifests(old_manifest, new_manifest):
+    """
+    Compare two manifests.
+
+    Returns
+    -------
+    Sorted lists of the (relative) names of the files that were added,
+    changed (i.e. whose contents hash differently) and removed in going
+    from old_manifest to new_manifest
+    """
+    added = sorted([name for name in new_manifest if name not in old_manifest])
+    removed = sorted([name for name in old_manifest if name not in new_manifest])
+    changed = sorted([name for name in new_manifest
+                      if name in old_manifest and new_manifest[name][2] != old_manifest[name][2]])
+    return added, changed, removed
+
+
+def _sed_shard_list(file_list, shard_dir, shard_size):
+    """
+    Divide a list of SED files into shards.
+
+    Parameters
+    ----------
+    file_list is the list of SED files to be cached
+    shard_dir is the directory in which the shards will be written
+    shard_size is the maximum number of files in a shard
+
+    Returns
+    -------
+    A list of (shard_path, list_of_files) tuples.  Because file_list is
+    sorted first, the same library always produces the same shards.
+    """
+    file_list = sorted(file_list)
+    return [(os.path.join(shard_dir, 'shard_%06d.npz' % (i_start//shard_size)),
+             file_list[i_start:i_start+shard_size])
+            for i_start in range(0, len(file_list), shard_size)]
+
+
+def _sed_shard_is_complete(shard_path, file_list):
+    """
+    Return True if the shard at shard_path exists and was generated
+    from exactly the files in file_list.
+    """
+    if not os.path.exists(shard_path):
+        return False
+    try:
+        with numpy.load(shard_path) as shard:
+            return shard['requested'].tolist() == list(file_list)
+    except Exception:
+        return False
+
+
+def _generate_sed_shard(args):
+    """
+    Parse a list of SED files and write them to disk as a single shard.
+
+    Parameters
+    ----------
+    args is a (shard_path, file_list, reader) tuple; reader is a function
+    that takes a file name and returns its (wavelen, flambda) arrays.
+    Files that cannot be parsed are omitted from the shard.
+
+    Returns
+    -------
+    The number of files in the shard
+    """
+    shard_path, file_list, reader = args
+    name_list = []
+    wavelen_list = []
+    flambda_list = []
+    for file_name in file_list:
+        try:
+            wavelen, flambda = reader(file_name)
+        except:
+            continue
+        name_list.append(file_name)
+        wavelen_list.append(wavelen)
+        flambda_list.append(flambda)
+
+    if len(name_list) > 0:
+        wavelen = numpy.concatenate(wavelen_list)
+        flambda = numpy.concatenate(flambda_list)
+    else:
+        wavelen = numpy.zeros(0, dtype=float)
+        flambda = numpy.zeros(0, dtype=float)
+
+    # write to a scratch file and then rename it, so that a crash never
+    # leaves a partially written shard where it could be mistaken for
+    # a complete one
+    scratch_path = shard_path + '.tmp'
+    with open(scratch_path, 'wb') as file_handle:
+        numpy.savez(file_handle,
+                    requested=numpy.array(list(file_list), dtype=str),
+                    names=numpy.array(name_list, dtype=str),
+                    lengths=numpy.array([len(ww) for ww in wavelen_list], dtype=numpy.int64),
+                    wavelen=wavelen, flambda=flambda)
+    os.rename(scratch_path, shard_path)
+    return len(file_list)
+
+
+def _read_sed_shard(shard_path):
+    """
+    Read a shard written by _generate_sed_shard.
+
+    Returns
+    -------
+    A dict keyed on SED file name whose values are (wavelen, flambda) tuples
+    """
+    with numpy.load(shard_path) as shard:
+        name_list = shard['names'].tolist()
+        length_arr = shard['lengths']
+        wavelen = shard['wavelen']
+        flambda = shard['flambda']
+
+    output = {}
+    offset = 0
+    for name, length in zip(name_list, length_arr):
+        output[name] = (wavelen[offset:offset+length], flambda[offset:offset+length])
+        offset += length
+    return output
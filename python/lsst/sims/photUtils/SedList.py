@@ -1,13 +1,67 @@
 from builtins import zip
+from builtins import range
 from builtins import object
 import os
 import copy
+import warnings
 import numpy
 from .Bandpass import Bandpass
-from .Sed import Sed
-from lsst.sims.photUtils import getImsimFluxNorm
+from .Sed import Sed, prefetch_seds
+from .LogWavelenSed import LogWavelenSed
+from .ResampleOperator import get_resample_operator, _min_operator_points
+from .WavelenGrid import get_wavelen_grid
+from .SedUtils import _getNormalizingMag
+
+__all__ = ["SedList", "sedChunksFromRows"]
+
+# the number of Seds extincted at once by SedList.applyAv
+_av_block_rows = 1024
+
+# the columns of the catalog rows read by sedChunksFromRows,
+# named for the parameters of SedList.loadSedsFromList
+_sed_row_columns = ('sedNameList', 'magNormList', 'redshiftList',
+                    'internalAvList', 'galacticAvList')
+
+
+def sedChunksFromRows(rowIterator, chunkSize=10000):
+    """
+    Group catalog rows into chunks of the columns that SedList.loadSedsFromList
+    takes (e.g. for BandpassDict.magListForSedStream), reading only one chunk
+    of rows from rowIterator at a time.
+
+    @param [in] rowIterator is an iterable of rows, each of which is a tuple
+    (sedName, magNorm, redshift, internalAv, galacticAv).  redshift,
+    internalAv and galacticAv may be None or left off the end of the tuple.
+
+    @param [in] chunkSize is the largest number of rows in a chunk
+
+    @param [out] yields a dict for each chunk, mapping 'sedNameList',
+    'magNormList', 'redshiftList', 'internalAvList' and 'galacticAvList' to
+    lists of the values in the chunk (the last three map to None if none of
+    the rows in the chunk has a value for them)
+    """
+    if chunkSize < 1:
+        raise ValueError("sedChunksFromRows needs chunkSize >= 1; you gave %d" % chunkSize)
+
+    def make_chunk(rows):
+        chunk = {}
+        for ix, column in enumerate(_sed_row_columns):
+            values = [row[ix] if len(row) > ix else None for row in rows]
+            if ix < 2 or any(value is not None for value in values):
+                chunk[column] = values
+            else:
+                chunk[column] = None
+        return chunk
+
+    rows = []
+    for row in rowIterator:
+        rows.append(row)
+        if len(rows) == chunkSize:
+            yield make_chunk(rows)
+            rows = []
+    if len(rows) > 0:
+        yield make_chunk(rows)
 
-__all__ = ["SedList"]
 
 class SedList(object):
     """
@@ -23,6 +77,12 @@ class SedList(object):
 
     The method loadSedsFromList allows the user to add Seds to the list
     after the constructor has been called.
+
+    If the SedList has a wavelenMatch, the Seds in it all share one read-only
+    wavelen array (that of wavelenMatch), so modifying sed.wavelen in place
+    (e.g. sedList[0].wavelen *= 1.0+z) raises a ValueError.  Assign a new
+    array instead (e.g. sed.wavelen = sed.wavelen*(1.0+z)), or use the Sed
+    methods, which do not modify wavelen in place.
     """
 
     def __init__(self, sedNameList, magNormList,
@@ -33,7 +93,14 @@ class SedList(object):
                  redshiftList = None,
                  galacticAvList = None,
                  internalAvList = None,
-                 cosmologicalDimming = True):
+                 cosmologicalDimming = True,
+                 cacheView = False,
+                 useResampledCache = False,
+                 logWavelenResolution = None,
+                 galacticDustResponse = None,
+                 prefetchWorkers = None,
+                 prefetchExecutor = None,
+                 fluxDtype = None):
 
         """
         @param [in] sedNameList is a list of SED file names.
@@ -55,7 +122,8 @@ class SedList(object):
         sims_sed_library is defined in sims_utils)
 
         @param [in] wavelenMatch is an optional numpy array representing
-        the wavelength grid to which all Seds will be re-mapped.
+        the wavelength grid to which all Seds will be re-mapped.  The Seds
+        share a read-only copy of it as their wavelen (see above).
 
         @param [in] redshiftList is an optional list of redshifts for the Sed
 
@@ -69,6 +137,69 @@ class SedList(object):
         dimming (the extray (1+z)^-1 factor in flux) should be applied to spectra
         when they are redshifted (defaults to True)
 
+        @param [in] cacheView is a boolean indicating whether Seds should be
+        read in as read-only views of the SED caches rather than copies (see
+        Sed.readSED_flambda; defaults to False).  This avoids copying each
+        Sed as it is read in, since Seds are normalized into new memory anyway.
+
+        @param [in] useResampledCache is a boolean.  If True (and wavelenMatch
+        is set), Seds that are neither redshifted nor internally extincted are
+        read directly from a cache of Seds already resampled onto wavelenMatch
+        (see Sed.readSED_flambda), so that each Sed file only needs to be
+        resampled once.  Because the Seds are then normalized after being
+        resampled, rather than before, the results agree with
+        useResampledCache=False to within floating point rounding rather
+        than exactly.  Defaults to False.
+
+        @param [in] logWavelenResolution is an optional resolution
+        (wavelength/delta wavelength).  If it is set (and wavelenMatch is
+        set), each Sed file that is redshifted but not internally extincted
+        is sampled once onto a log-uniform wavelength grid of this
+        resolution (see LogWavelenSed), and all of the Seds redshifted from
+        it in a call to loadSedsFromList are redshifted and sampled onto
+        wavelenMatch at once, rather than being redshifted and resampled
+        one at a time.  This introduces interpolation errors set by the
+        resolution (for a resolution of 10^5, typically 1e-10 relative, but
+        up to 1e-3 near sharp features of the Seds).  Defaults to None.
+
+        @param [in] galacticDustResponse is an optional ExtinctionResponseSurface
+        containing every Sed in sedNameList.  If it is set, galactic dust is not
+        applied to the Seds themselves (which are left unextincted); instead,
+        BandpassDict.magListForSedList and BandpassDict.fluxListForSedList (and
+        the methods built on them) add the change in magnitude due to
+        galacticAvList evaluated from galacticDustResponse to the magnitudes of
+        the unextincted Seds.  This is an approximation: it is accurate to the
+        errors reported by ExtinctionResponseSurface.validate for Seds at the
+        redshift of galacticDustResponse without internal dust.  Seds at any
+        other redshift (a redshift of None counts as 0) or with a non-zero
+        internal A(V) are not described by galacticDustResponse, so their
+        galactic dust is applied to them exactly, as it would be without
+        galacticDustResponse.  The BandpassDict must be the one
+        galacticDustResponse was built from.  Defaults to None.
+
+        @param [in] prefetchWorkers is an optional number of threads.  If it is
+        set, the unique Sed files named in each call to loadSedsFromList that are
+        not already cached are read concurrently by that many threads (see
+        prefetch_seds) before the Seds are loaded, so that the time spent
+        waiting on disk reads overlaps.  Defaults to None (files are read one
+        at a time as the Seds are loaded).
+
+        @param [in] prefetchExecutor is an optional concurrent.futures executor
+        (e.g. a ProcessPoolExecutor) with which to prefetch Sed files instead of
+        a pool of prefetchWorkers threads.  Defaults to None.
+
+        @param [in] fluxDtype is an optional numpy dtype (e.g. numpy.float32) in
+        which to store the flambda of the Seds once they have been loaded
+        (they are read, normalized, extincted, redshifted and resampled in
+        float64 regardless).  Defaults to None (float64).  float32 halves the
+        memory taken by the Seds at the cost of rounding each element of flambda
+        to a relative precision of 2^-24 (6.0e-8).  Because the fluxes calculated
+        by BandpassDict are sums of flambda with non-negative weights, they change
+        by at most that fraction, i.e. magnitudes change by at most 6.5e-8 mag,
+        provided flambda is above the smallest normal float32 (1.2e-38
+        ergs/cm^2/s/nm; smaller values lose precision and values below 1.4e-45
+        become zero).
+
         Note: once wavelenMatch and cosmologicalDimming have been set in
         the constructor, they cannot be un-set.
 
@@ -80,9 +211,32 @@ class SedList(object):
 
         self._initialized = False
         self._spec_map = specMap
-        self._wavelen_match = copy.deepcopy(wavelenMatch)
+        # the Seds in this list share the (read-only) array of self._wavelen_grid
+        self._wavelen_grid = None
+        self._wavelen_match = None
+        if wavelenMatch is not None:
+            self._wavelen_grid = get_wavelen_grid(wavelenMatch)
+            self._wavelen_match = self._wavelen_grid.wavelen
         self._file_dir = fileDir
         self._cosmological_dimming = cosmologicalDimming
+        self._cache_view = cacheView
+        self._use_resampled_cache = useResampledCache
+        self._log_wavelen_resolution = logWavelenResolution
+        self._galactic_dust_response = galacticDustResponse
+        self._prefetch_workers = prefetchWorkers
+        self._prefetch_executor = prefetchExecutor
+        self._flux_dtype = None if fluxDtype is None else numpy.dtype(fluxDtype)
+
+        # the Sed names of the Seds whose galactic dust is evaluated
+        # from self._galactic_dust_response
+        self._dust_sed_name_list = []
+
+        # the LogWavelenSeds made from each Sed file (see logWavelenResolution)
+        self._log_wavelen_seds = {}
+
+        # the magnitudes of the Sed files in the normalizing
+        # bandpass (see _getNormMag)
+        self._norm_mag_cache = {}
 
         self._normalizing_bandpass = normalizingBandpass
 
@@ -109,9 +263,18 @@ class SedList(object):
         return len(self._sed_list)
 
     def __getitem__(self, index):
+        """
+        Return the Sed (or list of Seds) at index.  These are the Seds
+        stored in the SedList, not copies; if the SedList has a wavelenMatch,
+        their wavelen is read-only (see the class docstring).
+        """
         return self._sed_list[index]
 
     def __iter__(self):
+        """
+        Iterate over the Seds stored in the SedList (not copies; if the
+        SedList has a wavelenMatch, their wavelen is read-only).
+        """
         for val in self._sed_list:
             yield val
 
@@ -184,22 +347,56 @@ class SedList(object):
                 else:
                     self._redshift_list += list(redshiftList)
 
+        if self._prefetch_workers is not None or self._prefetch_executor is not None:
+            prefetch_seds([self._fileName(sedName) for sedName in set(sedNameList)
+                           if sedName != "None"],
+                          n_workers=self._prefetch_workers or 1,
+                          executor=self._prefetch_executor)
+
+        useLogWavelen = (self._log_wavelen_resolution is not None and
+                         self._wavelen_match is not None and redshiftList is not None)
+
+        # the Seds to be redshifted with LogWavelenSeds, keyed on file name;
+        # each value is a list of (Sed, fNorm, redshift) tuples
+        logWavelenDict = {}
+
         temp_sed_list = []
-        for sedName, magNorm in zip(sedNameList, magNormList):
+        for ix, (sedName, magNorm) in enumerate(zip(sedNameList, magNormList)):
             sed = Sed()
 
             if sedName != "None":
-                if self._spec_map is not None:
-                    sed.readSED_flambda(os.path.join(self._file_dir, self._spec_map[sedName]))
+                fileName = self._fileName(sedName)
+
+                # Seds that are neither internally extincted nor redshifted
+                # go straight onto wavelenMatch
+                restFrame = (self._use_resampled_cache and self._wavelen_match is not None and
+                             (internalAvList is None or not internalAvList[ix]) and
+                             (redshiftList is None or not redshiftList[ix]))
+
+                if (useLogWavelen and redshiftList[ix] and
+                    (internalAvList is None or not internalAvList[ix])):
+                    # these Seds are filled in after the others are redshifted
+                    # (they are left empty, so that nothing else touches them)
+                    fNorm = numpy.power(10, (-0.4*(magNorm - self._getNormMag(fileName))))
+                    if fileName not in logWavelenDict:
+                        logWavelenDict[fileName] = []
+                    logWavelenDict[fileName].append((sed, fNorm, redshiftList[ix]))
+                    temp_sed_list.append(sed)
+                    continue
+
+                if restFrame:
+                    sed.readSED_flambda(fileName, cache_view=self._cache_view,
+                                        wavelen_match=self._wavelen_match)
                 else:
-                    sed.readSED_flambda(os.path.join(self._file_dir, sedName))
+                    sed.readSED_flambda(fileName, cache_view=self._cache_view)
 
-                if self._normalizing_bandpass is not None:
-                    fNorm = sed.calcFluxNorm(magNorm, self._normalizing_bandpass)
-                else:
-                    fNorm = getImsimFluxNorm(sed, magNorm)
-
-                sed.multiplyFluxNorm(fNorm)
+                # this is what Sed.calcFluxNorm (or getImsimFluxNorm) would
+                # return, but the magnitude of each Sed file in the
+                # normalizing bandpass is only calculated once
+                fNorm = numpy.power(10, (-0.4*(magNorm - self._getNormMag(fileName))))
+                # sed owns its arrays (unless they are read-only cache views),
+                # so they can be normalized in place
+                sed.multiplyFluxNorm(fNorm, in_place=True)
 
             temp_sed_list.append(sed)
 
@@ -211,25 +408,118 @@ class SedList(object):
                                        self._av_int_wavelen, self._a_int, self._b_int)
 
         if redshiftList is not None:
-            self.applyRedshift(temp_sed_list, redshiftList)
+            self.applyRedshift(temp_sed_list, redshiftList, inPlace=True)
 
         if self._wavelen_match is not None:
-            for sedObj in temp_sed_list:
-                if sedObj.wavelen is not None:
-                    sedObj.resampleSED(wavelen_match=self._wavelen_match)
+            self.resampleToWavelenMatch(temp_sed_list)
+
+        for fileName in logWavelenDict:
+            self._redshiftFromLogWavelen(fileName, logWavelenDict[fileName])
 
-        if galacticAvList is not None:
+        if self._galactic_dust_response is not None:
+            if self._galactic_av_list is not None:
+                self._applyGalacticDustResponse(temp_sed_list, sedNameList, internalAvList,
+                                                galacticAvList, redshiftList)
+        elif galacticAvList is not None:
             self._av_gal_wavelen, \
             self._a_gal, \
             self._b_gal = self.applyAv(temp_sed_list, galacticAvList,
                                        self._av_gal_wavelen, self._a_gal, self._b_gal)
 
+        if self._flux_dtype is not None:
+            for sedObj in temp_sed_list:
+                if sedObj.flambda is not None and sedObj.flambda.dtype != self._flux_dtype:
+                    sedObj.flambda = sedObj.flambda.astype(self._flux_dtype)
+                    sedObj.fnu = None
+
         self._sed_list += temp_sed_list
 
         self._initialized = True
 
 
 
+    def _applyGalacticDustResponse(self, sedList, sedNameList, internalAvList,
+                                   galacticAvList, redshiftList):
+        """
+        Record which of the Seds in sedList (just loaded from sedNameList)
+        have their galactic dust evaluated from self.galacticDustResponse.
+        Those are the Seds at the redshift of the response without internal
+        dust; galactic dust is applied exactly (with applyAv) to the others,
+        which the response does not describe.
+        """
+        dustRedshift = self._galactic_dust_response.redshift
+        exactSedList = []
+        exactAvList = []
+        for ix, (sedObj, sedName) in enumerate(zip(sedList, sedNameList)):
+            redshift = 0.0
+            if redshiftList is not None and redshiftList[ix] is not None:
+                redshift = redshiftList[ix]
+            if (galacticAvList is not None and galacticAvList[ix] is not None and
+                (redshift != dustRedshift or
+                 (internalAvList is not None and internalAvList[ix]))):
+                exactSedList.append(sedObj)
+                exactAvList.append(galacticAvList[ix])
+                # (a Sed named "None" gets no change from the response)
+                self._dust_sed_name_list.append("None")
+            else:
+                self._dust_sed_name_list.append(sedName)
+
+        if len(exactSedList) > 0:
+            self._av_gal_wavelen, \
+            self._a_gal, \
+            self._b_gal = self.applyAv(exactSedList, exactAvList,
+                                       self._av_gal_wavelen, self._a_gal, self._b_gal)
+
+
+    def _fileName(self, sedName):
+        """
+        Return the name of the file containing the Sed named sedName
+        (see specMap and fileDir in the constructor)
+        """
+        if self._spec_map is not None:
+            return os.path.join(self._file_dir, self._spec_map[sedName])
+        return os.path.join(self._file_dir, sedName)
+
+
+    def _redshiftFromLogWavelen(self, fileName, sedTupleList):
+        """
+        Fill in the Seds in sedTupleList, a list of (Sed, fNorm, redshift)
+        tuples, with the Sed in fileName multiplied by fNorm and redshifted,
+        sampled onto wavelenMatch, using the LogWavelenSed made from fileName
+        (see logWavelenResolution in the constructor).
+        """
+        if fileName not in self._log_wavelen_seds:
+            sed = Sed()
+            sed.readSED_flambda(fileName, cache_view=True)
+            self._log_wavelen_seds[fileName] = LogWavelenSed.fromSed(sed, self._log_wavelen_resolution)
+        logSed = self._log_wavelen_seds[fileName]
+
+        fNormArray = numpy.array([sedTuple[1] for sedTuple in sedTupleList])
+        redshiftArray = numpy.array([sedTuple[2] for sedTuple in sedTupleList])
+        flambda = logSed.redshiftOntoGrid(redshiftArray, self._wavelen_match,
+                                          dimming=self._cosmological_dimming)
+        flambda *= fNormArray[:, None]
+
+        for (sed, fNorm, redshift), row in zip(sedTupleList, flambda):
+            sed.wavelen = self._wavelen_match
+            sed.flambda = row
+            sed.fnu = None
+            sed.name = fileName + '_Z' + '%.2f' %(redshift)
+
+    def _getNormMag(self, fileName):
+        """
+        Return the magnitude of the (un-resampled) Sed in fileName in the
+        normalizing bandpass, so that Seds sharing a file are all normalized
+        using a single calculation of its magnitude (and Seds read in already
+        resampled are normalized exactly as they would have been before
+        resampling).
+        """
+        if fileName not in self._norm_mag_cache:
+            sed = Sed()
+            sed.readSED_flambda(fileName, cache_view=True)
+            self._norm_mag_cache[fileName] = _getNormalizingMag(sed, self._normalizing_bandpass)
+        return self._norm_mag_cache[fileName]
+
     def applyAv(self, sedList, avList, dustWavelen, aCoeffs, bCoeffs):
         """
         Take the array of Sed objects sedList and apply extinction due to dust.
@@ -259,27 +549,136 @@ class SedList(object):
         @param [out] bCoeffs as generated/used by this method
 
         aCoeffs and bCoeffs are re-generated as needed
+
+        Seds sampled on the same wavelength grid are extincted together:
+        their flambda are stacked into a single 2-D array, which is
+        multiplied by exp(-0.4*ln(10)*(a + b/R_v)*A_v) for all of them
+        at once.  Their flambda become rows of that array.  Seds which
+        share a wavelength array (as Seds resampled onto the wavelenMatch
+        of a SedList do) are recognized as being on the same grid by
+        identity; other Seds are compared to the grids already found.
         """
 
+        # group the Seds to be extincted by wavelength grid;
+        # grid_dex maps id(wavelen) to the index of the group
+        grid_list = []
+        sed_groups = []
+        av_groups = []
+        grid_dex = {}
         for sedobj, av in zip(sedList, avList):
-            if sedobj.wavelen is not None and av is not None:
-                #setupCCM_ab only depends on the wavelen array
-                #because this is supposed to be the same for every
-                #SED object in sedList, it is only called once for
-                #each invocation of applyAv
-
-                if dustWavelen is None or len(sedobj.wavelen)!=len(dustWavelen) \
-                or (sedobj.wavelen!=dustWavelen).any():
-                    aCoeffs, bCoeffs = sedobj.setupCCM_ab()
-                    dustWavelen = sedobj.wavelen
-
-                sedobj.addDust(aCoeffs, bCoeffs, A_v=av)
-
+            if sedobj.wavelen is None or av is None:
+                continue
+
+            wavelen = sedobj.wavelen
+            ix = grid_dex.get(id(wavelen))
+            if ix is None:
+                for iy, grid in enumerate(grid_list):
+                    if len(grid) == len(wavelen) and (grid == wavelen).all():
+                        ix = iy
+                        break
+                else:
+                    ix = len(grid_list)
+                    grid_list.append(wavelen)
+                    sed_groups.append([])
+                    av_groups.append([])
+                grid_dex[id(wavelen)] = ix
+
+            sed_groups[ix].append(sedobj)
+            av_groups[ix].append(av)
+
+        ln10_04 = 0.4*numpy.log(10.0)
+        for wavelen, sed_group, av_group in zip(grid_list, sed_groups, av_groups):
+
+            #setupCCM_ab only depends on the wavelen array,
+            #so it is only called once for each grid
+            if dustWavelen is None or \
+               (wavelen is not dustWavelen and
+                (len(wavelen) != len(dustWavelen) or (wavelen != dustWavelen).any())):
+                aCoeffs, bCoeffs = sed_group[0].setupCCM_ab()
+                dustWavelen = wavelen
+
+            if len(sed_group) == 1:
+                sed_group[0].addDust(aCoeffs, bCoeffs, A_v=av_group[0])
+                continue
+
+            # this is Sed.addDust (with R_v = 3.1) applied to every row,
+            # a block of rows at a time (so that the dust array is reused)
+            a_over_av = aCoeffs + bCoeffs/3.1
+            block_rows = min(len(sed_group), _av_block_rows)
+            dust = numpy.empty((block_rows, len(wavelen)), dtype=float)
+            for i_start in range(0, len(sed_group), block_rows):
+                sub_group = sed_group[i_start:i_start+block_rows]
+                sub_dust = dust[:len(sub_group)]
+                numpy.multiply.outer(av_group[i_start:i_start+block_rows], a_over_av, out=sub_dust)
+                sub_dust *= -ln10_04
+                numpy.exp(sub_dust, out=sub_dust)
+                flambda = numpy.array([sedobj.flambda for sedobj in sub_group])
+                flambda *= sub_dust
+                for sedobj, row in zip(sub_group, flambda):
+                    sedobj.flambda = row
+                    sedobj.fnu = None
 
         return dustWavelen, aCoeffs, bCoeffs
 
 
-    def applyRedshift(self, sedList, redshiftList):
+    def resampleToWavelenMatch(self, sedList):
+        """
+        Resample the Seds in sedList onto self.wavelenMatch in situ
+        (as Sed.resampleSED(wavelen_match=self.wavelenMatch) would).
+
+        Seds sampled on the same (large) wavelength grid are resampled
+        with a single ResampleOperator, so that the grid is only searched
+        once (see ResampleOperator).  The resampled Seds all share
+        self.wavelenMatch as their wavelength array, so that applyAv can
+        recognize that they are on the same grid by identity.
+        """
+        # group the Seds on large grids by their wavelength grid (the
+        # first Sed in each group is its representative); an operator
+        # does not pay for a small grid
+        sed_groups = []
+        group_dex = {}
+        for sedObj in sedList:
+            if sedObj.wavelen is None:
+                continue
+            if not sedObj._needResample(wavelen_match=self._wavelen_match):
+                sedObj.wavelen = self._wavelen_match
+                continue
+            if len(sedObj.wavelen) < _min_operator_points:
+                sedObj.resampleSED(wavelen_match=self._wavelen_match, force=True)
+                sedObj.wavelen = self._wavelen_match
+                continue
+            key = (len(sedObj.wavelen), sedObj.wavelen[0], sedObj.wavelen[-1])
+            for ix in group_dex.get(key, []):
+                wavelen = sed_groups[ix][0].wavelen
+                if wavelen is sedObj.wavelen or numpy.array_equal(wavelen, sedObj.wavelen):
+                    sed_groups[ix].append(sedObj)
+                    break
+            else:
+                group_dex.setdefault(key, []).append(len(sed_groups))
+                sed_groups.append([sedObj])
+
+        for sed_group in sed_groups:
+            if len(sed_group) == 1:
+                # nor for a single Sed
+                sed_group[0].resampleSED(wavelen_match=self._wavelen_match, force=True)
+                sed_group[0].wavelen = self._wavelen_match
+                continue
+
+            wavelen = sed_group[0].wavelen
+            if wavelen.max() < self._wavelen_match.max() or wavelen.min() > self._wavelen_match.min():
+                for sedObj in sed_group:
+                    warnings.warn('There is an area of non-overlap between desired wavelength range '
+                                  + ' (%.2f to %.2f)' % (self._wavelen_match.min(), self._wavelen_match.max())
+                                  + 'and sed %s (%.2f to %.2f)' % (sedObj.name, wavelen.min(),
+                                                                   wavelen.max()))
+            operator = get_resample_operator(wavelen, self._wavelen_match)
+            for sedObj in sed_group:
+                sedObj.wavelen = self._wavelen_match
+                sedObj.flambda = operator.apply(sedObj.flambda)
+                sedObj.fnu = None
+
+
+    def applyRedshift(self, sedList, redshiftList, inPlace=False):
         """
         Take the array of SED objects sedList and apply the arrays of extinction and redshift
         (internalAV and redshift)
@@ -291,6 +690,11 @@ class SedList(object):
 
         @param [in] redshiftList is a list of redshift values
 
+        @param [in] inPlace is a boolean; if True, the wavelen/flambda arrays
+        of the Seds are overwritten (unless they are read-only) rather than
+        replaced (see Sed.redshiftSED).  Only use it for Seds which do not
+        share their arrays with anything else.
+
         This method will redshift each Sed object in sedList
         """
 
@@ -299,7 +703,7 @@ class SedList(object):
 
         for sedobj, redshift in zip(sedList, redshiftList):
             if sedobj.wavelen is not None and redshift is not None:
-                sedobj.redshiftSED(redshift, dimming=self._cosmological_dimming)
+                sedobj.redshiftSED(redshift, dimming=self._cosmological_dimming, in_place=inPlace)
                 sedobj.name = sedobj.name + '_Z' + '%.2f' %(redshift)
 
 
@@ -312,6 +716,7 @@ class SedList(object):
         self._internal_av_list = None
         self._galactic_av_list = None
         self._redshift_list = None
+        self._dust_sed_name_list = []
 
 
     @property
@@ -328,7 +733,7 @@ class SedList(object):
     def wavelenMatch(self):
         """
         Wavelength grid against which to match Seds stored in this
-        SedList.
+        SedList (the read-only array the Seds share as their wavelen).
         """
         return self._wavelen_match
 
@@ -358,3 +763,46 @@ class SedList(object):
         stored in this SedList
         """
         return self._galactic_av_list
+
+
+    @property
+    def galacticDustResponse(self):
+        """
+        The ExtinctionResponseSurface from which the galactic dust
+        of the Seds stored in this SedList is evaluated (None if
+        galactic dust is applied to the Seds themselves)
+        """
+        return self._galactic_dust_response
+
+
+    @property
+    def fluxDtype(self):
+        """
+        The dtype in which the flambda of the Seds stored in this
+        SedList are kept (None if they are left in float64)
+        """
+        return self._flux_dtype
+
+
+    def _galacticDustDeltaMags(self, bandpassDict, indices=None):
+        """
+        Return the change in the magnitudes of the Seds stored in this
+        SedList in the bandpasses of bandpassDict due to galactic dust
+        that was not applied to the Seds (see galacticDustResponse) as a
+        2-D numpy array (Seds are rows, bandpasses are columns; bandpasses
+        not in indices are numpy.NaN), or None if there is no such dust.
+        """
+        if self._galactic_dust_response is None or self._galactic_av_list is None:
+            return None
+
+        if bandpassDict is not self._galactic_dust_response.bandpassDict and \
+           (bandpassDict.keys() != self._galactic_dust_response.bandpassDict.keys() or
+            not numpy.array_equal(bandpassDict.phiArray,
+                                  self._galactic_dust_response.bandpassDict.phiArray)):
+            raise RuntimeError("The galacticDustResponse of this SedList was not built "
+                               "from the BandpassDict you are using")
+
+        # (Seds loaded without galacticAvList have A(V) = None, i.e. no dust)
+        return self._galactic_dust_response.deltaMagList(self._dust_sed_name_list,
+                                                         self._galactic_av_list,
+                                                         indices=indices)
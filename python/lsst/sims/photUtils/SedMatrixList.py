@@ -0,0 +1,126 @@
+from builtins import range
+import numpy
+from .Sed import _sed_physical_parameters
+from .SedList import SedList
+
+__all__ = ["SedMatrixList"]
+
+
+class SedMatrixList(SedList):
+    """
+    A SedList which stores the flambda of all of its Seds as the rows
+    of a single 2-D numpy array (the flambdaMatrix), sampled on the
+    single wavelength grid wavelenMatch (which is therefore required).
+
+    Seds are read in, normalized, extincted and redshifted exactly as
+    by SedList.  Once they have been loaded, the Seds returned by
+    indexing or iterating over a SedMatrixList share their wavelength
+    array with the SedMatrixList and their flambda arrays are views of
+    the rows of the flambdaMatrix.  The flambdaMatrix is authoritative:
+    Sed methods which assign new arrays to a Sed (e.g. multiplyFluxNorm,
+    addDust, redshiftSED) detach that Sed from the flambdaMatrix, so
+    Seds in a SedMatrixList should not be modified.
+
+    Rows corresponding to Seds named "None" are filled with numpy.NaN.
+
+    BandpassDict.magListForSedList and BandpassDict.fluxListForSedList
+    (and the methods built on them) calculate the magnitudes and fluxes
+    of all of the Seds in a SedMatrixList with matrix products of the
+    flambdaMatrix itself against the BandpassDict's phiArray (rather than
+    first stacking the Seds into blocks), provided that wavelenMatch is
+    the BandpassDict's wavelenMatch.
+    """
+
+    def __init__(self, sedNameList, magNormList, wavelenMatch=None, **kwargs):
+        """
+        The parameters are those of SedList, except that wavelenMatch
+        is required.
+        """
+        if wavelenMatch is None:
+            raise RuntimeError("SedMatrixList requires wavelenMatch")
+
+        fluxDtype = kwargs.get('fluxDtype', None)
+        self._flambda_matrix = numpy.zeros((0, len(wavelenMatch)),
+                                           dtype=float if fluxDtype is None else fluxDtype)
+        self._n_rows = 0
+
+        super(SedMatrixList, self).__init__(sedNameList, magNormList,
+                                            wavelenMatch=wavelenMatch, **kwargs)
+
+    def _reserveRows(self, nRows):
+        """
+        Make sure that the flambdaMatrix has room for nRows more rows,
+        growing it geometrically (so that loading Seds a few at a time
+        does not copy the matrix every time).  Seds whose flambda arrays
+        were views of the old matrix are pointed to the new one.
+        """
+        needed = self._n_rows + nRows
+        if needed <= len(self._flambda_matrix):
+            return
+
+        old_matrix = self._flambda_matrix
+        new_matrix = numpy.empty((max(needed, 2*len(old_matrix)), old_matrix.shape[1]),
+                                 dtype=old_matrix.dtype)
+        new_matrix[:self._n_rows] = old_matrix[:self._n_rows]
+        self._flambda_matrix = new_matrix
+
+        for ix in range(self._n_rows):
+            sedobj = self._sed_list[ix]
+            if sedobj.flambda is not None and sedobj.flambda.base is old_matrix:
+                sedobj.flambda = new_matrix[ix]
+
+    def loadSedsFromList(self, sedNameList, magNormList,
+                         internalAvList=None, galacticAvList=None, redshiftList=None):
+        """
+        Load the Seds specified by sedNameList (see SedList.loadSedsFromList)
+        and append them to the flambdaMatrix.
+        """
+        super(SedMatrixList, self).loadSedsFromList(sedNameList, magNormList,
+                                                    internalAvList=internalAvList,
+                                                    galacticAvList=galacticAvList,
+                                                    redshiftList=redshiftList)
+
+        n_new = len(self._sed_list) - self._n_rows
+        self._reserveRows(n_new)
+
+        for ix in range(self._n_rows, self._n_rows + n_new):
+            sedobj = self._sed_list[ix]
+            row = self._flambda_matrix[ix]
+            if sedobj.wavelen is None:
+                row[:] = numpy.NaN
+                continue
+            row[:] = sedobj.flambda
+            sedobj.wavelen = self._wavelen_match
+            sedobj.flambda = row
+            sedobj.fnu = None
+
+        self._n_rows += n_new
+
+    def flush(self):
+        """
+        Delete all SEDs stored in this SedMatrixList.
+        """
+        super(SedMatrixList, self).flush()
+        self._flambda_matrix = numpy.zeros((0, len(self._wavelen_match)),
+                                           dtype=self._flambda_matrix.dtype)
+        self._n_rows = 0
+
+    @property
+    def flambdaMatrix(self):
+        """
+        A 2-D numpy array whose rows are the flambda of the Seds
+        stored in this SedMatrixList, sampled on wavelenMatch.
+        """
+        return self._flambda_matrix[:self._n_rows]
+
+    @property
+    def fnuMatrix(self):
+        """
+        A 2-D numpy array whose rows are the fnu of the Seds stored in
+        this SedMatrixList (calculated from the flambdaMatrix every time
+        this property is accessed).
+        """
+        physParams = _sed_physical_parameters
+        conversion = (self._wavelen_match*self._wavelen_match*physParams.nm2m /
+                      physParams.lightspeed*physParams.ergsetc2jansky)
+        return self.flambdaMatrix*conversion
@@ -20,6 +20,15 @@ def getImsimFluxNorm(sed, magmatch):
     The factor by which the flux of sed needs to be multiplied to achieve
     the desired magnitude.
     """
+    dmag = magmatch - _getImsimMag(sed)
+    return np.power(10, (-0.4*dmag))
+
+
+def _getImsimMag(sed):
+    """
+    Calculate the magnitude of an SED in the imsim bandpass
+    (see getImsimFluxNorm)
+    """
 
     # This method works based on the assumption that the imsim bandpass
     # is a delta function.  If that ever ceases to be true, the unit test
@@ -44,6 +53,18 @@ def getImsimFluxNorm(sed, magmatch):
                            + "The SED does not cover that wavelength\n"
                            + "(Covers %e < lambda %e)" % (sed.wavelen.min(), sed.wavelen.max()))
 
-    mag = -2.5*np.log10(np.interp(getImsimFluxNorm.imsim_wavelen, sed.wavelen, sed.fnu)) - sed.zp
-    dmag = magmatch - mag
-    return np.power(10, (-0.4*dmag))
+    return -2.5*np.log10(np.interp(getImsimFluxNorm.imsim_wavelen, sed.wavelen, sed.fnu)) - sed.zp
+
+
+def _getNormalizingMag(sed, normalizingBandpass=None):
+    """
+    Calculate the magnitude of an SED in normalizingBandpass (or in the
+    imsim bandpass if normalizingBandpass is None), i.e. the magnitude
+    from which Sed.calcFluxNorm (or getImsimFluxNorm) calculates its
+    flux normalization:
+
+    fluxNorm = 10**(-0.4*(magmatch - _getNormalizingMag(sed, normalizingBandpass)))
+    """
+    if normalizingBandpass is not None:
+        return sed.calcMag(normalizingBandpass)
+    return _getImsimMag(sed)
@@ -0,0 +1,209 @@
+"""
+This file defines WavelenGrid, an immutable description of a wavelength
+grid: its (read-only) wavelength array, its limits, its step (if the
+grid is uniform) and a hash of its values.
+
+Sed, Bandpass, BandpassDict and SedList decide whether a spectrum must
+be resampled by checking whether its wavelength grid matches another
+one.  Done from the arrays alone, that check is a pass over both of them
+(or, against wavelen_min/max/step, a sort of the steps of the grid).
+When the arrays involved are the wavelength arrays of WavelenGrids, the
+check is instead an identity, limit or (cached) hash comparison: the
+wavelength grids of BandpassDicts and SedLists are WavelenGrids, and the
+Seds loaded by a SedList share the array of its grid.
+
+Sed.resampleSED and Bandpass.resampleBandpass do not make the Seds and
+Bandpasses they resample share the (read-only) array of a WavelenGrid:
+callers may modify their wavelength arrays in place, so those are
+writeable copies.
+"""
+
+from builtins import object
+from collections import OrderedDict
+import weakref
+import numpy
+from .SedCache import _wavelen_grid_key
+
+__all__ = ["WavelenGrid", "get_wavelen_grid", "uniform_wavelen_grid"]
+
+
+# the WavelenGrids in existence, keyed on the id of their wavelength arrays
+_wavelen_grids = weakref.WeakValueDictionary()
+
+# the grids made by uniform_wavelen_grid, keyed on their limits
+# (at most _max_uniform_wavelen_grids of them)
+_uniform_wavelen_grids = OrderedDict()
+_max_uniform_wavelen_grids = 64
+
+
+class WavelenGrid(object):
+    """
+    An immutable wavelength grid (in nm).  Its wavelength array is a
+    read-only copy of the one it was made from; objects sampled on the
+    grid should share that array (see get_wavelen_grid).
+    """
+
+    def __init__(self, wavelen):
+        """
+        Parameters
+        ----------
+        wavelen is a numpy array of (increasing) wavelengths in nm
+        """
+        self._wavelen = numpy.array(wavelen, dtype=float)
+        if self._wavelen.ndim != 1 or len(self._wavelen) < 2:
+            raise ValueError("A WavelenGrid needs a 1-D array of at least two wavelengths")
+        self._wavelen.flags.writeable = False
+
+        self._wavelen_min = self._wavelen[0]
+        self._wavelen_max = self._wavelen[-1]
+        # this is the test Bandpass.needResample uses for a uniform grid
+        step = numpy.unique(numpy.diff(self._wavelen))
+        self._wavelen_step = step[0] if len(step) == 1 else None
+        self._key = None
+
+        _wavelen_grids[id(self._wavelen)] = self
+
+    @property
+    def wavelen(self):
+        """
+        The (read-only) wavelength array of this grid
+        """
+        return self._wavelen
+
+    @property
+    def wavelenMin(self):
+        return self._wavelen_min
+
+    @property
+    def wavelenMax(self):
+        return self._wavelen_max
+
+    @property
+    def wavelenStep(self):
+        """
+        The step of this grid (None if it is not uniform)
+        """
+        return self._wavelen_step
+
+    @property
+    def key(self):
+        """
+        The hash of the values of this grid (computed when first needed)
+        """
+        if self._key is None:
+            self._key = _wavelen_grid_key(self._wavelen)
+        return self._key
+
+    def __len__(self):
+        return len(self._wavelen)
+
+    def __eq__(self, other):
+        if not isinstance(other, WavelenGrid):
+            return False
+        return other is self or (len(other) == len(self) and other.key == self.key)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def matches(self, wavelen):
+        """
+        Return True if the wavelength grid wavelen (an array or a WavelenGrid)
+        agrees with this one to 1e-10 nm at every point (the test used by
+        Sed._needResample)
+        """
+        if isinstance(wavelen, WavelenGrid):
+            if wavelen == self:
+                return True
+            wavelen = wavelen.wavelen
+        elif wavelen is self._wavelen:
+            return True
+        if numpy.shape(wavelen) != self._wavelen.shape:
+            return False
+        return not numpy.any(abs(self._wavelen - wavelen) > 1e-10)
+
+    def matchesLimits(self, wavelen_min, wavelen_max, wavelen_step):
+        """
+        Return True if this grid runs from wavelen_min to wavelen_max in uniform
+        steps of wavelen_step (the test used by Bandpass.needResample)
+        """
+        return (self._wavelen_min == wavelen_min and self._wavelen_max == wavelen_max and
+                self._wavelen_step is not None and self._wavelen_step == wavelen_step)
+
+
+def _find_wavelen_grid(wavelen):
+    """
+    Return the WavelenGrid whose wavelength array is wavelen (or wavelen
+    itself, if it is a WavelenGrid); None if there is none
+    """
+    if isinstance(wavelen, WavelenGrid):
+        return wavelen
+    grid = _wavelen_grids.get(id(wavelen))
+    if grid is not None and grid.wavelen is wavelen:
+        return grid
+    return None
+
+
+def get_wavelen_grid(wavelen):
+    """
+    Return a WavelenGrid for the wavelength array wavelen: the WavelenGrid
+    whose array it is if there is one (or wavelen itself, if it is a
+    WavelenGrid), otherwise a new WavelenGrid made from a copy of it
+    """
+    grid = _find_wavelen_grid(wavelen)
+    if grid is None:
+        grid = WavelenGrid(wavelen)
+    return grid
+
+
+def uniform_wavelen_grid(wavelen_min, wavelen_max, wavelen_step):
+    """
+    Return the WavelenGrid running from wavelen_min to wavelen_max in steps
+    of wavelen_step (as made by Bandpass.resampleBandpass), reusing the
+    grid made for earlier calls with the same limits
+    """
+    key = (float(wavelen_min), float(wavelen_max), float(wavelen_step))
+    grid = _uniform_wavelen_grids.pop(key, None)
+    if grid is None:
+        grid = WavelenGrid(numpy.arange(wavelen_min, wavelen_max+wavelen_step/2.0,
+                                        wavelen_step, dtype='float'))
+    _uniform_wavelen_grids[key] = grid
+    if len(_uniform_wavelen_grids) > _max_uniform_wavelen_grids:
+        _uniform_wavelen_grids.popitem(last=False)
+    return grid
+
+
+def _wavelen_grids_match(wavelen, wavelen_match):
+    """
+    Return True if the wavelength grids wavelen and wavelen_match (arrays or
+    WavelenGrids) agree to 1e-10 nm at every point.  This is an identity or
+    hash comparison if they are (the arrays of) WavelenGrids.
+    """
+    if wavelen is wavelen_match:
+        return True
+    grid = _find_wavelen_grid(wavelen)
+    grid_match = _find_wavelen_grid(wavelen_match)
+    if grid_match is not None:
+        return grid_match.matches(grid if grid is not None else wavelen)
+    if grid is not None:
+        return grid.matches(wavelen_match)
+    if numpy.shape(wavelen_match) != numpy.shape(wavelen):
+        return False
+    return not numpy.any(abs(wavelen_match - wavelen) > 1e-10)
+
+
+def _wavelen_grid_matches_limits(wavelen, wavelen_min, wavelen_max, wavelen_step):
+    """
+    Return True if the wavelength grid wavelen (an array or a WavelenGrid)
+    runs from wavelen_min to wavelen_max in uniform steps of wavelen_step.
+    This is a comparison of limits if wavelen is (the array of) a WavelenGrid.
+    """
+    grid = _find_wavelen_grid(wavelen)
+    if grid is not None:
+        return grid.matchesLimits(wavelen_min, wavelen_max, wavelen_step)
+    if wavelen[0] != wavelen_min or wavelen[len(wavelen)-1] != wavelen_max:
+        return False
+    stepsize = numpy.unique(numpy.diff(wavelen))
+    return len(stepsize) == 1 and stepsize[0] == wavelen_step
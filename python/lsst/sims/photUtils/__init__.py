@@ -1,10 +1,18 @@
 from .LSSTdefaults import *
 from .PhysicalParameters import *
+from .FileUtils import *
+from .SedCache import *
+from .WavelenGrid import *
+from .ResampleOperator import *
 from .Sed import *
 from .Bandpass import *
 from .SedUtils import *
 from .BandpassDict import *
+from .LogWavelenSed import *
 from .SedList import *
+from .SedMatrixList import *
+from .RedshiftMagTable import *
+from .ExtinctionResponseSurface import *
 from .PhotometricParameters import *
 from .SignalToNoise import *
 from .CosmologyObject import *
@@ -3,11 +3,14 @@ from builtins import zip
 from builtins import range
 import unittest
 import os
+import sys
 import copy
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import lsst.utils.tests
 from lsst.utils import getPackageDir
-from lsst.sims.photUtils import Bandpass, Sed, BandpassDict, SedList
+from lsst.sims.photUtils import Bandpass, Sed, BandpassDict, SedList, SedMatrixList
+from lsst.sims.photUtils import sedChunksFromRows
 
 
 def setup_module(module):
@@ -247,6 +250,57 @@ class BandpassDictTest(unittest.TestCase):
                 mag = dummySed.calcMag(bpList[iy])
                 self.assertAlmostEqual(mag, magList[ix][iy], 2)
 
+    def testSedMatrixList(self):
+        """
+        Test that the magnitudes and fluxes calculated from a SedMatrixList
+        (with a single matrix product) agree with those calculated from
+        the same Seds in a SedList
+        """
+        nBandpasses = 7
+        bpNameList, bpList = self.getListOfBandpasses(nBandpasses)
+        testBpDict = BandpassDict(bpList, bpNameList)
+
+        nSed = 20
+        sedNameList = self.getListOfSedNames(nSed)
+        sedNameList[3] = 'None'
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        internalAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+        redshiftList = self.rng.random_sample(nSed)*5.0
+        galacticAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+
+        controlSedList = SedList(sedNameList, magNormList,
+                                 fileDir=self.sedDir,
+                                 internalAvList=internalAvList,
+                                 redshiftList=redshiftList,
+                                 galacticAvList=galacticAvList,
+                                 wavelenMatch=testBpDict.wavelenMatch)
+
+        testSedList = SedMatrixList(sedNameList, magNormList,
+                                    fileDir=self.sedDir,
+                                    internalAvList=internalAvList,
+                                    redshiftList=redshiftList,
+                                    galacticAvList=galacticAvList,
+                                    wavelenMatch=testBpDict.wavelenMatch)
+
+        for indices in (None, [1, 2, 5]):
+            controlMag = testBpDict.magListForSedList(controlSedList, indices=indices)
+            testMag = testBpDict.magListForSedList(testSedList, indices=indices)
+            np.testing.assert_allclose(testMag, controlMag, rtol=0.0, atol=1.0e-10)
+
+            controlFlux = testBpDict.fluxListForSedList(controlSedList, indices=indices)
+            testFlux = testBpDict.fluxListForSedList(testSedList, indices=indices)
+            np.testing.assert_allclose(testFlux, controlFlux, rtol=1.0e-10, atol=0.0)
+
+            self.assertTrue(np.isnan(testMag[3]).all())
+            if indices is not None:
+                self.assertTrue(np.isnan(testMag[:, 0]).all())
+                self.assertTrue(np.isnan(testFlux[:, 0]).all())
+
+        testArray = testBpDict.magArrayForSedList(testSedList)
+        controlArray = testBpDict.magArrayForSedList(controlSedList)
+        for name in bpNameList:
+            np.testing.assert_allclose(testArray[name], controlArray[name], rtol=0.0, atol=1.0e-10)
+
     def testMagArrayForSedList(self):
         """
         Test that magArrayForSedList calculates the correct magnitude
@@ -298,6 +352,218 @@ class BandpassDictTest(unittest.TestCase):
                 mag = dummySed.calcMag(bpList[iy])
                 self.assertAlmostEqual(mag, magArray[bp][ix], 2)
 
+    def testBlockedSedListPhotometry(self):
+        """
+        Test that magListForSedList, fluxListForSedList, magArrayForSedList
+        and fluxArrayForSedList agree with magListForSed and fluxListForSed
+        when the Seds are split into several blocks
+        """
+        bandpassDictModule = sys.modules['lsst.sims.photUtils.BandpassDict']
+
+        nBandpasses = 5
+        bpNameList, bpList = self.getListOfBandpasses(nBandpasses)
+        testBpDict = BandpassDict(bpList, bpNameList)
+
+        nSed = 11
+        sedNameList = self.getListOfSedNames(nSed)
+        sedNameList[4] = 'None'
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        redshiftList = self.rng.random_sample(nSed)*2.0
+        testSedList = SedList(sedNameList, magNormList,
+                              fileDir=self.sedDir,
+                              redshiftList=redshiftList,
+                              wavelenMatch=testBpDict.wavelenMatch)
+
+        old_block_rows = bandpassDictModule._flux_block_rows
+        try:
+            bandpassDictModule._flux_block_rows = 3
+            for indices in (None, [0, 3], [4, 2, 1]):
+                magList = testBpDict.magListForSedList(testSedList, indices=indices)
+                fluxList = testBpDict.fluxListForSedList(testSedList, indices=indices)
+                magArray = testBpDict.magArrayForSedList(testSedList, indices=indices)
+                fluxArray = testBpDict.fluxArrayForSedList(testSedList, indices=indices)
+                self.assertEqual(magList.shape, (nSed, nBandpasses))
+                self.assertEqual(fluxList.shape, (nSed, nBandpasses))
+                self.assertEqual(len(magArray), nSed)
+                self.assertEqual(len(fluxArray), nSed)
+                for ix, sedObj in enumerate(testSedList):
+                    controlMag = testBpDict.magListForSed(sedObj, indices=indices)
+                    controlFlux = testBpDict.fluxListForSed(sedObj, indices=indices)
+                    np.testing.assert_allclose(magList[ix], controlMag, rtol=0.0, atol=1.0e-10)
+                    np.testing.assert_allclose(fluxList[ix], controlFlux, rtol=1.0e-10, atol=0.0)
+                    for iy, bp in enumerate(bpNameList):
+                        np.testing.assert_allclose(magArray[bp][ix], controlMag[iy],
+                                                   rtol=0.0, atol=1.0e-10)
+                        np.testing.assert_allclose(fluxArray[bp][ix], controlFlux[iy],
+                                                   rtol=1.0e-10, atol=0.0)
+                self.assertTrue(np.isnan(magList[4]).all())
+        finally:
+            bandpassDictModule._flux_block_rows = old_block_rows
+
+    def testPhotometryForSedNames(self):
+        """
+        Test that magListForSedNames and fluxListForSedNames agree with
+        magListForSedList and fluxListForSedList
+        """
+        nBandpasses = 4
+        bpNameList, bpList = self.getListOfBandpasses(nBandpasses)
+        testBpDict = BandpassDict(bpList, bpNameList)
+
+        nSed = 40
+        # many Seds sharing a few files
+        sedNameList = [self.sedPossibilities[ii].replace('.gz', '')
+                       for ii in self.rng.randint(0, 3, nSed)]
+        sedNameList[7] = 'None'
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+
+        for normalizingBandpass in (None, bpList[1]):
+            controlSedList = SedList(sedNameList, magNormList, fileDir=self.sedDir,
+                                     normalizingBandpass=normalizingBandpass,
+                                     wavelenMatch=testBpDict.wavelenMatch)
+            for indices in (None, [0, 2]):
+                controlMag = testBpDict.magListForSedList(controlSedList, indices=indices)
+                testMag = testBpDict.magListForSedNames(sedNameList, magNormList,
+                                                        fileDir=self.sedDir,
+                                                        normalizingBandpass=normalizingBandpass,
+                                                        indices=indices)
+                np.testing.assert_allclose(testMag, controlMag, rtol=0.0, atol=1.0e-10)
+
+                controlFlux = testBpDict.fluxListForSedList(controlSedList, indices=indices)
+                testFlux = testBpDict.fluxListForSedNames(sedNameList, magNormList,
+                                                          fileDir=self.sedDir,
+                                                          normalizingBandpass=normalizingBandpass,
+                                                          indices=indices)
+                np.testing.assert_allclose(testFlux, controlFlux, rtol=1.0e-10, atol=0.0)
+                self.assertTrue(np.isnan(testMag[7]).all())
+
+        # check that the magnitudes in the normalizing bandpass are magNormList
+        # (up to the difference between normalizing the Seds on their own
+        # wavelength grids and calculating magnitudes on wavelenMatch)
+        testMag = testBpDict.magListForSedNames(sedNameList, magNormList, fileDir=self.sedDir,
+                                                normalizingBandpass=bpList[1])
+        np.testing.assert_allclose(np.delete(testMag[:, 1], 7), np.delete(magNormList, 7),
+                                   rtol=0.0, atol=1.0e-5)
+
+    def testSedStream(self):
+        """
+        Test that magListForSedStream and fluxListForSedStream agree with
+        magListForSedList and fluxListForSedList
+        """
+        nBandpasses = 4
+        bpNameList, bpList = self.getListOfBandpasses(nBandpasses)
+        testBpDict = BandpassDict(bpList, bpNameList)
+
+        nSed = 23
+        sedNameList = self.getListOfSedNames(nSed)
+        sedNameList[5] = 'None'
+        magNormList = list(self.rng.random_sample(nSed)*5.0 + 15.0)
+        redshiftList = list(self.rng.random_sample(nSed)*2.0)
+        internalAvList = list(self.rng.random_sample(nSed)*0.5)
+        galacticAvList = list(self.rng.random_sample(nSed)*0.3)
+        redshiftList[8] = None
+        galacticAvList[9] = None
+
+        controlSedList = SedList(sedNameList, magNormList, fileDir=self.sedDir,
+                                 redshiftList=redshiftList, internalAvList=internalAvList,
+                                 galacticAvList=galacticAvList,
+                                 wavelenMatch=testBpDict.wavelenMatch)
+        controlMag = testBpDict.magListForSedList(controlSedList)
+        controlFlux = testBpDict.fluxListForSedList(controlSedList, indices=[1, 3])
+
+        # catalog rows, some of which leave off their galactic A(V)
+        rows = [(name, magNorm, z, iAv, gAv) for name, magNorm, z, iAv, gAv in
+                zip(sedNameList, magNormList, redshiftList, internalAvList, galacticAvList)]
+        rows[9] = rows[9][:4]
+        rowChunks = list(sedChunksFromRows(iter(rows), chunkSize=10))
+        self.assertEqual([len(chunk['sedNameList']) for chunk in rowChunks], [10, 10, 3])
+        self.assertIsNone(rowChunks[0]['galacticAvList'][9])
+
+        # column chunks, which are split into chunks of chunkSize
+        columnChunks = [{'sedNameList': sedNameList[:15], 'magNormList': magNormList[:15],
+                         'redshiftList': redshiftList[:15], 'internalAvList': internalAvList[:15],
+                         'galacticAvList': galacticAvList[:15]},
+                        {'sedNameList': sedNameList[15:], 'magNormList': magNormList[15:],
+                         'redshiftList': redshiftList[15:], 'internalAvList': internalAvList[15:],
+                         'galacticAvList': galacticAvList[15:]}]
+
+        for chunks, chunkSize, lengths in ((rowChunks, 10, [10, 10, 3]),
+                                           (columnChunks, 6, [6, 6, 3, 6, 2])):
+            sedList = SedList([], [], fileDir=self.sedDir,
+                              wavelenMatch=testBpDict.wavelenMatch)
+            dustCoeffs = []
+            magList = []
+            for mags in testBpDict.magListForSedStream(sedList, chunks, chunkSize=chunkSize):
+                self.assertEqual(len(sedList), len(mags))
+                dustCoeffs.append(sedList._a_gal)
+                magList.append(mags)
+            self.assertEqual([len(mags) for mags in magList], lengths)
+            self.assertEqual(len(sedList), 0)
+            # the dust model coefficients are only calculated once
+            for aCoeffs in dustCoeffs:
+                self.assertIs(aCoeffs, dustCoeffs[0])
+            np.testing.assert_allclose(np.concatenate(magList), controlMag, rtol=0.0, atol=1.0e-10)
+
+            fluxList = list(testBpDict.fluxListForSedStream(sedList, chunks, chunkSize=chunkSize,
+                                                            indices=[1, 3]))
+            np.testing.assert_allclose(np.concatenate(fluxList), controlFlux,
+                                       rtol=1.0e-10, atol=0.0)
+
+        with self.assertRaises(ValueError):
+            list(testBpDict.magListForSedStream(sedList, columnChunks, chunkSize=0))
+
+    def testPhotometryInParallel(self):
+        """
+        Test that magListForSedsInParallel and fluxListForSedsInParallel
+        reproduce magListForSedList and fluxListForSedList exactly
+        """
+        bandpassDictModule = sys.modules['lsst.sims.photUtils.BandpassDict']
+
+        nBandpasses = 4
+        bpNameList, bpList = self.getListOfBandpasses(nBandpasses)
+        testBpDict = BandpassDict(bpList, bpNameList)
+
+        nSed = 17
+        sedNameList = self.getListOfSedNames(nSed)
+        sedNameList[6] = 'None'
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        redshiftList = self.rng.random_sample(nSed)*2.0
+        galacticAvList = self.rng.random_sample(nSed)*0.3
+
+        old_block_rows = bandpassDictModule._flux_block_rows
+        try:
+            bandpassDictModule._flux_block_rows = 3
+            controlSedList = SedList(sedNameList, magNormList, fileDir=self.sedDir,
+                                     redshiftList=redshiftList, galacticAvList=galacticAvList,
+                                     wavelenMatch=testBpDict.wavelenMatch)
+            controlMag = testBpDict.magListForSedList(controlSedList)
+            controlFlux = testBpDict.fluxListForSedList(controlSedList, indices=[0, 2])
+
+            testMag = testBpDict.magListForSedsInParallel(sedNameList, magNormList, workers=2,
+                                                          fileDir=self.sedDir,
+                                                          redshiftList=redshiftList,
+                                                          galacticAvList=galacticAvList)
+            np.testing.assert_array_equal(testMag, controlMag)
+
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                for chunkSize in (1, 4, None):
+                    testMag = testBpDict.magListForSedsInParallel(sedNameList, magNormList,
+                                                                  executor=executor,
+                                                                  chunkSize=chunkSize,
+                                                                  fileDir=self.sedDir,
+                                                                  redshiftList=redshiftList,
+                                                                  galacticAvList=galacticAvList)
+                    np.testing.assert_array_equal(testMag, controlMag)
+                    testFlux = testBpDict.fluxListForSedsInParallel(sedNameList, magNormList,
+                                                                    executor=executor,
+                                                                    chunkSize=chunkSize,
+                                                                    indices=[0, 2],
+                                                                    fileDir=self.sedDir,
+                                                                    redshiftList=redshiftList,
+                                                                    galacticAvList=galacticAvList)
+                    np.testing.assert_array_equal(testFlux, controlFlux)
+        finally:
+            bandpassDictModule._flux_block_rows = old_block_rows
+
     def testIndicesOnMagnitudes(self):
         """
         Test that, when you pass a list of indices into the calcMagList
@@ -0,0 +1,164 @@
+from builtins import range
+import unittest
+import os
+import numpy as np
+
+import lsst.utils.tests
+from lsst.utils import getPackageDir
+from lsst.sims.photUtils import Bandpass, BandpassDict, Sed, SedList, ExtinctionResponseSurface
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class ExtinctionResponseSurfaceTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        wavelen = np.arange(300.0, 1200.0, 0.5)
+        bandpassList = []
+        for wavelen_min in range(300, 1200, 150):
+            sb = np.where(np.logical_and(wavelen >= wavelen_min, wavelen < wavelen_min + 150.0),
+                          0.8, 0.0)
+            bandpassList.append(Bandpass(wavelen=wavelen, sb=sb))
+        cls.bandpassDict = BandpassDict(bandpassList, ['u', 'g', 'r', 'i', 'z', 'y'])
+        cls.sedDir = os.path.join(getPackageDir('sims_photUtils'),
+                                  'tests/cartoonSedTestData/starSed/kurucz/')
+        cls.sedNames = sorted([name.replace('.gz', '') for name in os.listdir(cls.sedDir)])[:4]
+
+    def setUp(self):
+        self.rng = np.random.RandomState(771)
+
+    def test_delta_mags(self):
+        """
+        Test that ExtinctionResponseSurface.deltaMagList agrees with
+        Sed.addDust followed by BandpassDict.magListForSed
+        """
+        response = ExtinctionResponseSurface(self.bandpassDict, self.sedNames + ['None'],
+                                             fileDir=self.sedDir, avMax=2.0,
+                                             rvMin=2.5, rvMax=4.0)
+        self.assertEqual(response.sedNames, self.sedNames)
+        self.assertLess(np.nanmax(response.validate()), 1.0e-5)
+
+        nSed = 20
+        sedNameList = [self.sedNames[ii] for ii in self.rng.randint(0, len(self.sedNames), nSed)]
+        sedNameList[2] = 'None'
+        avList = list(self.rng.random_sample(nSed)*2.0)
+        avList[3] = None
+        avList[4] = 0.0
+        avList[5] = 2.0
+        rvList = self.rng.random_sample(nSed)*1.5 + 2.5
+
+        deltaMags = response.deltaMagList(sedNameList, avList, rvList)
+        np.testing.assert_array_equal(deltaMags[2:5], np.zeros((3, len(self.bandpassDict))))
+
+        for ix in range(nSed):
+            if sedNameList[ix] == 'None' or avList[ix] is None:
+                continue
+            sedObj = Sed()
+            sedObj.readSED_flambda(os.path.join(self.sedDir, sedNameList[ix]))
+            sedObj.resampleSED(wavelen_match=self.bandpassDict.wavelenMatch)
+            controlMags = self.bandpassDict.magListForSed(sedObj)
+            a_x, b_x = sedObj.setupCCM_ab()
+            sedObj.addDust(a_x, b_x, A_v=avList[ix], R_v=rvList[ix])
+            controlDelta = self.bandpassDict.magListForSed(sedObj) - controlMags
+            np.testing.assert_allclose(deltaMags[ix], controlDelta, rtol=0.0, atol=1.0e-5)
+
+        testMags = response.deltaMagList(sedNameList, avList, rvList, indices=[0, 3])
+        self.assertTrue(np.isnan(testMags[:, [1, 2, 4, 5]]).all())
+        np.testing.assert_allclose(testMags[:, [0, 3]], deltaMags[:, [0, 3]], rtol=1.0e-12, atol=1.0e-15)
+
+        with self.assertRaises(ValueError):
+            response.deltaMagList(sedNameList[:1], [2.5], [3.1])
+        with self.assertRaises(ValueError):
+            response.deltaMagList(sedNameList[:1], [1.0], [5.0])
+
+    def test_sed_list(self):
+        """
+        Test that a SedList with a galacticDustResponse yields the same
+        magnitudes and fluxes as one with galactic dust applied to its Seds
+        """
+        response = ExtinctionResponseSurface(self.bandpassDict, self.sedNames,
+                                             fileDir=self.sedDir)
+        self.assertLess(np.nanmax(response.validate()), 1.0e-5)
+
+        nSed = 50
+        sedNameList = [self.sedNames[ii] for ii in self.rng.randint(0, len(self.sedNames), nSed)]
+        sedNameList[7] = 'None'
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        galacticAvList = self.rng.random_sample(nSed)*3.0
+
+        controlList = SedList(sedNameList[:40], magNormList[:40], fileDir=self.sedDir,
+                              galacticAvList=galacticAvList[:40],
+                              wavelenMatch=self.bandpassDict.wavelenMatch)
+        controlList.loadSedsFromList(sedNameList[40:], magNormList[40:])
+        testList = SedList(sedNameList[:40], magNormList[:40], fileDir=self.sedDir,
+                           galacticAvList=galacticAvList[:40],
+                           wavelenMatch=self.bandpassDict.wavelenMatch,
+                           galacticDustResponse=response)
+        testList.loadSedsFromList(sedNameList[40:], magNormList[40:])
+        self.assertIs(testList.galacticDustResponse, response)
+        self.assertIsNone(controlList.galacticDustResponse)
+
+        controlMags = self.bandpassDict.magListForSedList(controlList)
+        testMags = self.bandpassDict.magListForSedList(testList)
+        self.assertTrue(np.isnan(testMags[7]).all())
+        np.testing.assert_allclose(testMags, controlMags, rtol=0.0, atol=1.0e-5)
+        # Seds loaded without galacticAvList are not extincted
+        np.testing.assert_array_equal(testList[45].flambda, controlList[45].flambda)
+
+        testFlux = self.bandpassDict.fluxListForSedList(testList, indices=[2, 5])
+        controlFlux = self.bandpassDict.fluxListForSedList(controlList, indices=[2, 5])
+        self.assertTrue(np.isnan(testFlux[:, [0, 1, 3, 4]]).all())
+        np.testing.assert_allclose(testFlux[:, [2, 5]], controlFlux[:, [2, 5]], rtol=1.0e-5)
+
+        # a response built from different bandpasses cannot be used
+        otherDict = BandpassDict(self.bandpassDict.values()[:3], ['u', 'g', 'r'])
+        with self.assertRaises(RuntimeError):
+            otherDict.magListForSedList(testList)
+
+    def test_mismatched_seds(self):
+        """
+        Test that Seds at a redshift other than that of the galacticDustResponse,
+        or with internal dust, are extincted exactly
+        """
+        response = ExtinctionResponseSurface(self.bandpassDict, self.sedNames,
+                                             fileDir=self.sedDir)
+
+        nSed = 30
+        sedNameList = [self.sedNames[ii] for ii in self.rng.randint(0, len(self.sedNames), nSed)]
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        galacticAvList = list(self.rng.random_sample(nSed)*0.5)
+        galacticAvList[3] = None
+        internalAvList = [0.0]*nSed
+        redshiftList = [response.redshift]*nSed
+        redshiftList[0] = None
+        for ix in range(5, nSed, 3):
+            internalAvList[ix] = 0.4
+        for ix in range(6, nSed, 3):
+            redshiftList[ix] = 0.3
+
+        kwargs = dict(fileDir=self.sedDir, galacticAvList=galacticAvList,
+                      internalAvList=internalAvList, redshiftList=redshiftList,
+                      wavelenMatch=self.bandpassDict.wavelenMatch)
+        controlList = SedList(sedNameList, magNormList, **kwargs)
+        testList = SedList(sedNameList, magNormList, galacticDustResponse=response, **kwargs)
+
+        for ix in range(nSed):
+            if internalAvList[ix] or redshiftList[ix]:
+                np.testing.assert_array_equal(testList[ix].flambda, controlList[ix].flambda)
+            elif galacticAvList[ix]:
+                self.assertFalse(np.array_equal(testList[ix].flambda, controlList[ix].flambda))
+
+        np.testing.assert_allclose(self.bandpassDict.magListForSedList(testList),
+                                   self.bandpassDict.magListForSedList(controlList),
+                                   rtol=0.0, atol=1.0e-5)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
@@ -0,0 +1,131 @@
+from builtins import zip
+import unittest
+import gzip
+import os
+import shutil
+import tempfile
+import numpy as np
+
+import lsst.utils.tests
+from lsst.utils import getPackageDir
+from lsst.sims.photUtils import read_ascii_columns
+
+ROOT = os.path.abspath(os.path.dirname(__file__))
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class ReadAsciiColumnsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.scratch_dir = tempfile.mkdtemp(prefix='ReadAsciiColumnsTestCase',
+                                            dir=ROOT)
+
+    def tearDown(self):
+        if os.path.exists(self.scratch_dir):
+            shutil.rmtree(self.scratch_dir)
+
+    def test_against_genfromtxt(self):
+        """
+        Test that read_ascii_columns gives identical results to
+        numpy.genfromtxt on the SEDs in the test data
+        """
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        dtype = np.dtype([('wavelen', float), ('flambda', float)])
+        for sed_name in os.listdir(sed_dir):
+            full_name = os.path.join(sed_dir, sed_name)
+            control = np.genfromtxt(full_name, dtype=dtype)
+            wavelen, flambda = read_ascii_columns(full_name)
+            np.testing.assert_array_equal(wavelen, control['wavelen'])
+            np.testing.assert_array_equal(flambda, control['flambda'])
+
+    def test_comments(self):
+        """
+        Test that read_ascii_columns honors the '#', '$' and '!' comment
+        conventions, skips short lines and ignores extra columns
+        """
+        lines = ['# a header\n',
+                 '$ 1 2\n',
+                 '  ! 3 4\n',
+                 '5 6 7\n',
+                 '8 9 # 10\n',
+                 '11\n',
+                 '\n',
+                 '12\t13\n',
+                 '14 15']
+        control_wavelen = np.array([5.0, 8.0, 12.0, 14.0])
+        control_sb = np.array([6.0, 9.0, 13.0, 15.0])
+
+        file_name = os.path.join(self.scratch_dir, 'comments.txt')
+        with open(file_name, 'w') as output_file:
+            output_file.writelines(lines)
+        with gzip.open(file_name + '.gz', 'wt') as output_file:
+            output_file.writelines(lines)
+
+        for name in (file_name, file_name + '.gz'):
+            wavelen, sb = read_ascii_columns(name)
+            np.testing.assert_array_equal(wavelen, control_wavelen)
+            np.testing.assert_array_equal(sb, control_sb)
+
+        wavelen, sb, extra = read_ascii_columns(file_name, n_columns=3)
+        np.testing.assert_array_equal(wavelen, [5.0])
+        np.testing.assert_array_equal(extra, [7.0])
+
+    def test_gz_fallback(self):
+        """
+        Test that read_ascii_columns finds files whose gzipped state
+        was not correctly specified, and raises an IOError for files
+        that do not exist
+        """
+        wv = np.arange(100.0, 200.0, 10.0)
+        flux = np.arange(len(wv), dtype=float)
+        zipped_name = os.path.join(self.scratch_dir, 'zipped.txt.gz')
+        with gzip.open(zipped_name, 'wt') as output_file:
+            for ww, ff in zip(wv, flux):
+                output_file.write("%e %e\n" % (ww, ff))
+        for name in (zipped_name, zipped_name[:-3]):
+            wavelen, flambda = read_ascii_columns(name)
+            np.testing.assert_array_equal(wavelen, wv)
+            np.testing.assert_array_equal(flambda, flux)
+
+        with self.assertRaises(IOError) as context:
+            read_ascii_columns(os.path.join(self.scratch_dir, 'nonsense.txt'))
+        self.assertIn('does not exist', str(context.exception))
+
+        # a file that exists but is not really gzipped is not
+        # reported as missing
+        bad_name = os.path.join(self.scratch_dir, 'not_zipped.txt.gz')
+        with open(bad_name, 'w') as output_file:
+            output_file.write("1.0 2.0\n")
+        for name in (bad_name, bad_name[:-3]):
+            with self.assertRaises(IOError) as context:
+                read_ascii_columns(name)
+            self.assertNotIn('does not exist', str(context.exception))
+
+    def test_bad_values(self):
+        """
+        Test that a ValueError is raised for entries that are not numbers
+        """
+        file_name = os.path.join(self.scratch_dir, 'bad.txt')
+        with open(file_name, 'w') as output_file:
+            output_file.write('1.0 2.0\n3.0 abc\n')
+        with self.assertRaises(ValueError):
+            read_ascii_columns(file_name)
+
+        # numpy.fromstring would read the start of a malformed last token
+        for last_line in ('3.0 4x', '3.0 4x\n', '3.0 1-2\n', '3.0 4x # comment\n'):
+            with open(file_name, 'w') as output_file:
+                output_file.write('1.0 2.0\n' + last_line)
+            with self.assertRaises(ValueError):
+                read_ascii_columns(file_name)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
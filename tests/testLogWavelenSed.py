@@ -0,0 +1,114 @@
+from builtins import zip
+import unittest
+import os
+import numpy as np
+
+import lsst.utils.tests
+from lsst.utils import getPackageDir
+from lsst.sims.photUtils import Sed, SedList, LogWavelenSed
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class LogWavelenSedTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(8812)
+        # a smooth SED, so that interpolation errors are small
+        self.wavelen = np.arange(100.0, 3000.0, 0.5)
+        self.flambda = 1.0e-10*np.exp(-0.5*((self.wavelen - 600.0)/300.0)**2) + 1.0e-12
+        self.sedDir = os.path.join(getPackageDir('sims_photUtils'),
+                                   'tests/cartoonSedTestData/galaxySed/')
+
+    def test_grid(self):
+        """
+        Test that the wavelength grid of a LogWavelenSed is log-uniform
+        and that flambda is sampled correctly on it
+        """
+        log_sed = LogWavelenSed(self.wavelen, self.flambda, 10000.0)
+        self.assertAlmostEqual(log_sed.dlnwavelen, np.log(1.0 + 1.0/10000.0), 15)
+        np.testing.assert_allclose(np.diff(np.log(log_sed.wavelen)), log_sed.dlnwavelen,
+                                   rtol=1.0e-8, atol=0.0)
+        self.assertEqual(log_sed.wavelen[0], self.wavelen[0])
+        self.assertLessEqual(log_sed.wavelen[-1], self.wavelen[-1])
+        np.testing.assert_array_equal(log_sed.flambda,
+                                      np.interp(log_sed.wavelen, self.wavelen, self.flambda))
+
+        with self.assertRaises(ValueError):
+            LogWavelenSed(self.wavelen, self.flambda, 10000.0, wavelen_min=0.0)
+
+    def test_redshift(self):
+        """
+        Test that redshiftSED and redshiftOntoGrid agree with
+        Sed.redshiftSED followed by Sed.resampleSED
+        """
+        wavelen_match = np.arange(300.0, 1200.0, 1.0)
+        log_sed = LogWavelenSed(self.wavelen, self.flambda, 100000.0)
+        redshiftArray = np.append(self.rng.random_sample(20)*2.0, [0.0, -0.1])
+
+        for dimming in (False, True):
+            batch = log_sed.redshiftOntoGrid(redshiftArray, wavelen_match, dimming=dimming)
+            self.assertEqual(batch.shape, (len(redshiftArray), len(wavelen_match)))
+            for redshift, row in zip(redshiftArray, batch):
+                control = Sed(wavelen=self.wavelen, flambda=self.flambda)
+                control.redshiftSED(redshift, dimming=dimming)
+                control.resampleSED(wavelen_match=wavelen_match)
+                np.testing.assert_allclose(row, control.flambda, rtol=1.0e-6, atol=0.0)
+
+                shifted = log_sed.redshiftSED(redshift, dimming=dimming)
+                np.testing.assert_array_equal(shifted.wavelen, log_sed.wavelen)
+                test = shifted.toSed(wavelen_match=wavelen_match)
+                np.testing.assert_allclose(test.flambda, control.flambda, rtol=1.0e-6, atol=0.0)
+
+        # redshifted out of the grid
+        batch = log_sed.redshiftOntoGrid(np.array([4.0]), wavelen_match)
+        self.assertTrue(np.isnan(batch[0][wavelen_match < 500.0]).all())
+        self.assertFalse(np.isnan(batch[0][wavelen_match > 501.0]).any())
+
+    def test_sed_list(self):
+        """
+        Test that a SedList with logWavelenResolution set agrees with one
+        without it
+        """
+        sedPossibilities = os.listdir(self.sedDir)
+        nSed = 30
+        sedNameList = [sedPossibilities[ii].replace('.gz', '')
+                       for ii in self.rng.randint(0, len(sedPossibilities), nSed)]
+        sedNameList[3] = 'None'
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        redshiftList = list(self.rng.random_sample(nSed)*3.0)
+        redshiftList[5] = 0.0
+        internalAvList = list(self.rng.random_sample(nSed)*0.3 + 0.1)
+        for ix in range(0, nSed, 2):
+            internalAvList[ix] = None
+        galacticAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+        wavelen_match = np.arange(300.0, 1500.0, 1.0)
+
+        controlList = SedList(sedNameList, magNormList, fileDir=self.sedDir,
+                              redshiftList=redshiftList, internalAvList=internalAvList,
+                              galacticAvList=galacticAvList, wavelenMatch=wavelen_match)
+        testList = SedList(sedNameList, magNormList, fileDir=self.sedDir,
+                           redshiftList=redshiftList, internalAvList=internalAvList,
+                           galacticAvList=galacticAvList, wavelenMatch=wavelen_match,
+                           logWavelenResolution=100000.0)
+
+        self.assertEqual(len(testList), nSed)
+        for controlSed, testSed in zip(controlList, testList):
+            self.assertEqual(testSed.name, controlSed.name)
+            if controlSed.wavelen is None:
+                self.assertIsNone(testSed.wavelen)
+                continue
+            np.testing.assert_array_equal(testSed.wavelen, controlSed.wavelen)
+            np.testing.assert_array_equal(np.isnan(testSed.flambda), np.isnan(controlSed.flambda))
+            np.testing.assert_allclose(testSed.flambda, controlSed.flambda, rtol=1.0e-2, atol=0.0)
+            self.assertLess(np.nanmedian(np.abs(testSed.flambda/controlSed.flambda - 1.0)), 1.0e-8)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
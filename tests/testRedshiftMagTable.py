@@ -0,0 +1,129 @@
+from builtins import range
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+import lsst.utils.tests
+from lsst.utils import getPackageDir
+from lsst.sims.photUtils import Bandpass, BandpassDict, SedList, RedshiftMagTable
+
+ROOT = os.path.abspath(os.path.dirname(__file__))
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class RedshiftMagTableTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        wavelen = np.arange(300.0, 1200.0, 0.5)
+        bandpassList = []
+        for wavelen_min in range(300, 1200, 150):
+            sb = np.where(np.logical_and(wavelen >= wavelen_min, wavelen < wavelen_min + 150.0),
+                          0.8, 0.0)
+            bandpassList.append(Bandpass(wavelen=wavelen, sb=sb))
+        cls.bandpassDict = BandpassDict(bandpassList, ['u', 'g', 'r', 'i', 'z', 'y'])
+        cls.sedDir = os.path.join(getPackageDir('sims_photUtils'),
+                                  'tests/cartoonSedTestData/galaxySed/')
+        cls.sedNames = sorted([name.replace('.gz', '') for name in os.listdir(cls.sedDir)])[:3]
+
+    def setUp(self):
+        self.rng = np.random.RandomState(4412)
+        self.scratch_dir = tempfile.mkdtemp(prefix='RedshiftMagTableTestCase', dir=ROOT)
+
+    def tearDown(self):
+        if os.path.exists(self.scratch_dir):
+            shutil.rmtree(self.scratch_dir)
+
+    def test_against_sed_list(self):
+        """
+        Test that magnitudes and fluxes interpolated from a RedshiftMagTable
+        agree with those calculated from a SedList to within the tolerance
+        """
+        tolerance = 0.002
+        table = RedshiftMagTable(self.bandpassDict, self.sedNames + ['None', self.sedNames[0]],
+                                 redshiftMin=0.0, redshiftMax=2.0, tolerance=tolerance,
+                                 fileDir=self.sedDir, cacheDir=self.scratch_dir)
+        self.assertEqual(table.sedNames, self.sedNames)
+        self.assertEqual(table.redshiftGrid[0], 0.0)
+        self.assertEqual(table.redshiftGrid[-1], 2.0)
+        self.assertTrue((np.diff(table.redshiftGrid) > 0.0).all())
+
+        nSed = 200
+        sedNameList = [self.sedNames[ii] for ii in self.rng.randint(0, len(self.sedNames), nSed)]
+        sedNameList[4] = 'None'
+        redshiftList = self.rng.random_sample(nSed)*2.0
+        redshiftList[5] = 0.0
+        redshiftList[6] = 2.0
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+
+        controlList = SedList(sedNameList, magNormList, fileDir=self.sedDir,
+                              redshiftList=redshiftList,
+                              wavelenMatch=self.bandpassDict.wavelenMatch)
+        controlMag = self.bandpassDict.magListForSedList(controlList)
+        controlFlux = self.bandpassDict.fluxListForSedList(controlList)
+
+        testMag = table.magListForSeds(sedNameList, redshiftList, magNormList)
+        testFlux = table.fluxListForSeds(sedNameList, redshiftList, magNormList)
+        self.assertTrue(np.isnan(testMag[4]).all())
+
+        error = np.abs(np.delete(testMag, 4, axis=0) - np.delete(controlMag, 4, axis=0))
+        self.assertLess(np.percentile(error, 99), tolerance)
+        self.assertLess(error.max(), 2.0*tolerance)
+        # grid points are reproduced to rounding
+        self.assertLess(error[4].max(), 1.0e-10)
+        self.assertLess(error[5].max(), 1.0e-10)
+        np.testing.assert_allclose(np.delete(testFlux, 4, axis=0),
+                                   np.delete(controlFlux, 4, axis=0), rtol=2.0*tolerance, atol=0.0)
+
+        testMag = table.magListForSeds(sedNameList, redshiftList, magNormList, indices=[1, 3])
+        self.assertTrue(np.isnan(testMag[:, [0, 2, 4, 5]]).all())
+        np.testing.assert_array_equal(testMag[:, [1, 3]],
+                                      table.magListForSeds(sedNameList, redshiftList,
+                                                           magNormList)[:, [1, 3]])
+
+        with self.assertRaises(ValueError):
+            table.magListForSeds(sedNameList[:1], [2.5], magNormList[:1])
+        with self.assertRaises(KeyError):
+            table.magListForSeds(['nonsense'], [0.5], [15.0])
+
+    def test_cache(self):
+        """
+        Test that tables are cached on disk and read back in
+        """
+        table = RedshiftMagTable(self.bandpassDict, self.sedNames, redshiftMax=1.0,
+                                 tolerance=0.01, fileDir=self.sedDir, cacheDir=self.scratch_dir)
+        self.assertTrue(os.path.exists(table.cacheName))
+        self.assertEqual(os.path.dirname(table.cacheName), self.scratch_dir)
+        self.assertEqual(os.listdir(self.scratch_dir), [os.path.basename(table.cacheName)])
+
+        cached_table = RedshiftMagTable(self.bandpassDict, self.sedNames, redshiftMax=1.0,
+                                        tolerance=0.01, fileDir=self.sedDir,
+                                        cacheDir=self.scratch_dir)
+        self.assertEqual(cached_table.cacheName, table.cacheName)
+        np.testing.assert_array_equal(cached_table.redshiftGrid, table.redshiftGrid)
+        redshiftList = self.rng.random_sample(10)
+        magNormList = self.rng.random_sample(10)*5.0 + 15.0
+        sedNameList = [self.sedNames[ii] for ii in self.rng.randint(0, len(self.sedNames), 10)]
+        np.testing.assert_array_equal(cached_table.magListForSeds(sedNameList, redshiftList,
+                                                                  magNormList),
+                                      table.magListForSeds(sedNameList, redshiftList, magNormList))
+
+        # a different tolerance makes a different table
+        other_table = RedshiftMagTable(self.bandpassDict, self.sedNames, redshiftMax=1.0,
+                                       tolerance=0.02, fileDir=self.sedDir,
+                                       cacheDir=self.scratch_dir)
+        self.assertNotEqual(other_table.cacheName, table.cacheName)
+        self.assertEqual(len(os.listdir(self.scratch_dir)), 2)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+import sys
+import warnings
+import numpy as np
+
+import lsst.utils.tests
+from lsst.sims.photUtils import Sed, SedList
+from lsst.sims.photUtils import ResampleOperator, get_resample_operator, resample_flux
+from lsst.sims.photUtils import clear_resample_operators
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+def control_resample(wavelen, flux, wavelen_match):
+    """
+    Resample flux the way Sed.resampleSED used to (with numpy.interp,
+    setting points outside of wavelen to NaN)
+    """
+    return np.interp(wavelen_match, wavelen, flux, left=np.NaN, right=np.NaN)
+
+
+class ResampleOperatorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(4417)
+        self.operator_module = sys.modules['lsst.sims.photUtils.ResampleOperator']
+        clear_resample_operators()
+
+    def tearDown(self):
+        clear_resample_operators()
+
+    def test_apply(self):
+        """
+        Test that ResampleOperator.apply gives exactly what numpy.interp
+        gives, for single spectra and stacked blocks of spectra
+        """
+        wavelen = np.sort(self.rng.random_sample(1000))*800.0 + 300.0
+        for wavelen_match in (np.arange(350.0, 1050.0, 0.7),
+                              np.arange(100.0, 1500.0, 1.3),
+                              np.concatenate(([wavelen[0]], wavelen[10:20], [wavelen[-1]]))):
+            operator = ResampleOperator(wavelen, wavelen_match)
+            flux = self.rng.random_sample((7, len(wavelen)))
+            # infinite values make numpy.interp fall back on
+            # interpolating from the other end of the interval
+            flux[2, 40] = np.inf
+            flux[3, 41:43] = -np.inf
+            flux[4, 100] = np.NaN
+            control = np.array([control_resample(wavelen, row, wavelen_match) for row in flux])
+
+            np.testing.assert_array_equal(operator.apply(flux), control)
+            for row, control_row in zip(flux, control):
+                np.testing.assert_array_equal(operator.apply(row), control_row)
+
+        with self.assertRaises(ValueError):
+            operator.apply(np.ones(len(wavelen) - 1))
+        with self.assertRaises(ValueError):
+            ResampleOperator(wavelen[:1], wavelen_match)
+
+    def test_cache(self):
+        """
+        Test that get_resample_operator reuses operators for equal grids
+        and evicts the least recently used ones
+        """
+        wavelen = np.arange(300.0, 1100.0, 0.3)
+        wavelen_match = np.arange(300.0, 1100.0, 1.0)
+        operator = get_resample_operator(wavelen, wavelen_match)
+        self.assertIs(get_resample_operator(wavelen.copy(), wavelen_match.copy()), operator)
+
+        # same length and ends, different points
+        other_wavelen = wavelen.copy()
+        other_wavelen[10] += 0.1
+        other = get_resample_operator(other_wavelen, wavelen_match)
+        self.assertIsNot(other, operator)
+        self.assertTrue(other.matches(other_wavelen, wavelen_match))
+        self.assertFalse(other.matches(wavelen, wavelen_match))
+
+        max_operators = self.operator_module._max_resample_operators
+        try:
+            self.operator_module._max_resample_operators = 2
+            self.assertIs(get_resample_operator(wavelen, wavelen_match), operator)
+            third = get_resample_operator(wavelen, wavelen_match[:-1])
+            # other was the least recently used
+            self.assertIs(get_resample_operator(wavelen, wavelen_match), operator)
+            self.assertIs(get_resample_operator(wavelen, wavelen_match[:-1]), third)
+            self.assertIsNot(get_resample_operator(other_wavelen, wavelen_match), other)
+            self.assertEqual(self.operator_module._n_resample_operators, 2)
+        finally:
+            self.operator_module._max_resample_operators = max_operators
+
+    def test_resample_flux(self):
+        """
+        Test that resample_flux only builds an operator for grids it has
+        seen before, and that its results do not depend on whether it does
+        """
+        wavelen = np.linspace(200.0, 1100.0, self.operator_module._min_operator_points)
+        wavelen_match = np.arange(300.0, 1200.0, 0.5)
+        flux = self.rng.random_sample(len(wavelen))
+        control = control_resample(wavelen, flux, wavelen_match)
+
+        np.testing.assert_array_equal(resample_flux(wavelen, flux, wavelen_match), control)
+        self.assertEqual(self.operator_module._n_resample_operators, 0)
+        np.testing.assert_array_equal(resample_flux(wavelen, flux, wavelen_match), control)
+        self.assertEqual(self.operator_module._n_resample_operators, 1)
+        np.testing.assert_array_equal(resample_flux(wavelen, flux, wavelen_match), control)
+        self.assertEqual(self.operator_module._n_resample_operators, 1)
+
+        # small grids are always interpolated directly
+        np.testing.assert_array_equal(resample_flux(wavelen[::2], flux[::2], wavelen_match),
+                                      control_resample(wavelen[::2], flux[::2], wavelen_match))
+        np.testing.assert_array_equal(resample_flux(wavelen[::2], flux[::2], wavelen_match),
+                                      control_resample(wavelen[::2], flux[::2], wavelen_match))
+        self.assertEqual(self.operator_module._n_resample_operators, 1)
+
+    def test_sed_list(self):
+        """
+        Test that SedList.resampleToWavelenMatch resamples Seds exactly
+        as Sed.resampleSED does
+        """
+        n_points = self.operator_module._min_operator_points
+        wavelen_match = np.arange(300.0, 1200.0, 0.5)
+        grid_list = [np.linspace(200.0, 1300.0, n_points),
+                     np.linspace(400.0, 1300.0, n_points),
+                     np.linspace(200.0, 1300.0, 1000)]
+
+        test_list = []
+        control_list = []
+        for ix in self.rng.randint(0, len(grid_list), 20):
+            flambda = self.rng.random_sample(len(grid_list[ix]))
+            test_list.append(Sed(wavelen=grid_list[ix].copy(), flambda=flambda))
+            control_list.append(Sed(wavelen=grid_list[ix].copy(), flambda=flambda))
+        # a Sed alone on its grid
+        test_list.append(Sed(wavelen=np.linspace(250.0, 1250.0, n_points), flambda=np.ones(n_points)))
+        control_list.append(Sed(wavelen=np.linspace(250.0, 1250.0, n_points), flambda=np.ones(n_points)))
+        # a Sed already on wavelen_match
+        test_list.append(Sed(wavelen=wavelen_match.copy(), flambda=np.ones(len(wavelen_match))))
+        control_list.append(Sed(wavelen=wavelen_match.copy(), flambda=np.ones(len(wavelen_match))))
+
+        sed_list = SedList([], [], wavelenMatch=wavelen_match)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            sed_list.resampleToWavelenMatch(test_list)
+            for controlSed in control_list:
+                controlSed.resampleSED(wavelen_match=wavelen_match)
+
+        for testSed, controlSed in zip(test_list, control_list):
+            self.assertIs(testSed.wavelen, sed_list.wavelenMatch)
+            self.assertIsNone(testSed.fnu)
+            np.testing.assert_array_equal(testSed.flambda, controlSed.flambda)
+
+        self.assertGreater(self.operator_module._n_resample_operators, 0)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()
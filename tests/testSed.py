@@ -10,16 +10,29 @@ import gzip
 import os
 import tempfile
 import shutil
+import pickle
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import lsst.utils.tests
 from lsst.utils import getPackageDir
 import lsst.sims.photUtils.Sed as Sed
 import lsst.sims.photUtils.Bandpass as Bandpass
-from lsst.sims.photUtils import PhotometricParameters
+from lsst.sims.photUtils import PhotometricParameters, read_ascii_columns
+from lsst.sims.photUtils import ColumnarSedCache, write_columnar_sed_cache
+from lsst.sims.photUtils import LazySedCache, BoundedSedCache, SharedSedCache
+from lsst.sims.photUtils.SedCache import _sed_shard_list, _sed_shard_is_complete
+from lsst.sims.photUtils.SedCache import _generate_sed_shard, _read_sed_shard
+from lsst.sims.photUtils.SedCache import _build_sed_manifest, _write_sed_manifest
+from lsst.sims.photUtils.SedCache import _read_sed_manifest, _diff_sed_manifests
+from lsst.sims.photUtils.SedCache import shared_memory
 
 
 ROOT = os.path.abspath(os.path.dirname(__file__))
 
+# lsst.sims.photUtils.Sed resolves to the Sed class; we need the module
+sed_module = sys.modules['lsst.sims.photUtils.Sed']
+
 
 def setup_module(module):
     lsst.utils.tests.init()
@@ -243,6 +256,539 @@ class SedBasicFunctionsTestCase(unittest.TestCase):
         self.assertNotEqual(ss1, ss2, msg=msg)
         self.assertNotEqual(ss2, ss3, msg=msg)
 
+    def test_cache_view(self):
+        """
+        Test that readSED_flambda can return read-only views of the
+        cached SEDs, and that Sed methods copy them before modifying them
+        """
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        full_name = os.path.join(sed_dir, sorted(os.listdir(sed_dir))[0])
+
+        ss_copy = Sed()
+        ss_copy.readSED_flambda(full_name)
+        ss_view = Sed()
+        ss_view.readSED_flambda(full_name, cache_view=True)
+        self.assertEqual(ss_copy, ss_view)
+        self.assertTrue(ss_copy.flambda.flags.writeable)
+        self.assertFalse(ss_view.flambda.flags.writeable)
+        self.assertFalse(ss_view.wavelen.flags.writeable)
+
+        other_view = Sed()
+        other_view.readSED_flambda(full_name, cache_view=True)
+        self.assertTrue(np.shares_memory(ss_view.flambda, other_view.flambda))
+
+        # modifying the view in place should be impossible
+        with self.assertRaises(ValueError):
+            ss_view.flambda *= 2.0
+
+        # addDust should copy the view, rather than modifying the cache
+        a_x, b_x = ss_copy.setupCCM_ab()
+        ss_copy.addDust(a_x, b_x, A_v=0.3)
+        ss_view.addDust(a_x, b_x, A_v=0.3)
+        self.assertEqual(ss_copy, ss_view)
+        self.assertFalse(np.shares_memory(ss_view.flambda, other_view.flambda))
+
+        control = Sed()
+        control.readSED_flambda(full_name, cache_sed=False)
+        np.testing.assert_array_equal(other_view.flambda, control.flambda)
+
+    def test_resampled_cache(self):
+        """
+        Test that readSED_flambda with wavelen_match gives the same results
+        as reading an SED and then resampling it and calculating fnu
+        """
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        name_list = [os.path.join(sed_dir, name) for name in sorted(os.listdir(sed_dir))[:3]]
+        wavelen_match = np.arange(300.0, 1100.0, 5.0)
+
+        sed_module.clear_resampled_sed_caches()
+        for full_name in name_list:
+            control = Sed()
+            control.readSED_flambda(full_name)
+            control.resampleSED(wavelen_match=wavelen_match)
+            control.flambdaTofnu()
+
+            # the first read fills the cache; the second reads from it
+            for cache_view in (False, True):
+                test = Sed()
+                test.readSED_flambda(full_name, wavelen_match=wavelen_match,
+                                     cache_view=cache_view)
+                np.testing.assert_array_equal(test.wavelen, control.wavelen)
+                np.testing.assert_array_equal(test.flambda, control.flambda)
+                np.testing.assert_array_equal(test.fnu, control.fnu)
+                self.assertEqual(test.name, full_name)
+                self.assertEqual(test.flambda.flags.writeable, not cache_view)
+                # fnu is not recalculated, whether or not the cache was hit
+                fnu = test.fnu
+                test.flambdaTofnu()
+                self.assertIs(test.fnu, fnu)
+
+        resampled_cache = sed_module._get_resampled_sed_cache(wavelen_match)
+        self.assertEqual(len(resampled_cache), len(name_list))
+        self.assertEqual(len(sed_module._get_resampled_sed_cache(wavelen_match[1:])), 0)
+        sed_module.clear_resampled_sed_caches()
+        self.assertEqual(len(sed_module._get_resampled_sed_cache(wavelen_match)), 0)
+
+    def test_resampled_cache_limits(self):
+        """
+        Test that the caches of resampled SEDs obey the limits of the
+        cache of SEDs read in by the user, that only a few grids are kept
+        and that the caches are emptied by clear_misc_sed_cache
+        """
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        name_list = [os.path.join(sed_dir, name) for name in sorted(os.listdir(sed_dir))[:4]]
+        wavelen_match = np.arange(300.0, 1100.0, 5.0)
+
+        old_cache = sed_module._global_misc_sed_cache
+        max_caches = sed_module._max_resampled_sed_caches
+        try:
+            sed_module.clear_resampled_sed_caches()
+            sed_module._global_misc_sed_cache = None
+            sed_module.configure_misc_sed_cache(max_entries=3)
+            for full_name in name_list:
+                ss = Sed()
+                ss.readSED_flambda(full_name, wavelen_match=wavelen_match)
+            resampled_cache = sed_module._get_resampled_sed_cache(wavelen_match)
+            info = resampled_cache.info()
+            self.assertEqual(info['entries'], 3)
+            self.assertEqual(info['evictions'], 1)
+            self.assertNotIn(name_list[0], resampled_cache)
+
+            ss = Sed()
+            ss.readSED_flambda(name_list[-1], wavelen_match=wavelen_match)
+            self.assertEqual(resampled_cache.info()['hits'], 1)
+
+            sed_module.configure_misc_sed_cache(max_entries=1)
+            self.assertEqual(resampled_cache.keys(), [name_list[-1]])
+
+            # only the most recently used grids are kept
+            sed_module._max_resampled_sed_caches = 2
+            sed_module._get_resampled_sed_cache(wavelen_match[1:])
+            sed_module._get_resampled_sed_cache(wavelen_match[2:])
+            self.assertIsNot(sed_module._get_resampled_sed_cache(wavelen_match), resampled_cache)
+            self.assertEqual(len(sed_module._global_resampled_sed_caches), 2)
+
+            resampled_cache = sed_module._get_resampled_sed_cache(wavelen_match)
+            ss.readSED_flambda(name_list[0], wavelen_match=wavelen_match)
+            self.assertEqual(len(resampled_cache), 1)
+            sed_module.clear_misc_sed_cache()
+            self.assertEqual(len(sed_module._get_resampled_sed_cache(wavelen_match)), 0)
+        finally:
+            sed_module._global_misc_sed_cache = old_cache
+            sed_module._max_resampled_sed_caches = max_caches
+            sed_module.clear_resampled_sed_caches()
+
+    def test_lazy_cache(self):
+        """
+        Test that LazySedCache only reads SEDs as they are accessed, and
+        that readSED_flambda reads SEDs from it correctly
+        """
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        name_list = [os.path.join(sed_dir, name) for name in sorted(os.listdir(sed_dir))]
+
+        cache = LazySedCache(name_list, sed_module._read_sed_for_cache)
+        self.assertEqual(len(cache), len(name_list))
+        self.assertEqual(sorted(cache.keys()), name_list)
+        self.assertIn(name_list[0], cache)
+        self.assertNotIn('nonsense.gz', cache)
+        self.assertEqual(cache.loaded_keys(), [])
+        with self.assertRaises(KeyError):
+            cache['nonsense.gz']
+
+        old_cache = sed_module._global_lsst_sed_cache
+        try:
+            sed_module._global_lsst_sed_cache = cache
+            ss_cache = Sed()
+            ss_cache.readSED_flambda(name_list[1])
+        finally:
+            sed_module._global_lsst_sed_cache = old_cache
+        self.assertEqual(cache.loaded_keys(), [name_list[1]])
+
+        ss_control = Sed()
+        ss_control.readSED_flambda(name_list[1], cache_sed=False)
+        self.assertEqual(ss_cache, ss_control)
+
+        cache.set_wavelen_limits(300.0, 900.0)
+        wav, fl = cache[name_list[1]]
+        self.assertGreaterEqual(wav.min(), 300.0)
+        self.assertLessEqual(wav.max(), 900.0)
+        valid = np.where(np.logical_and(ss_control.wavelen >= 300.0,
+                                        ss_control.wavelen <= 900.0))
+        np.testing.assert_array_equal(fl, ss_control.flambda[valid])
+
+    @unittest.skipIf(shared_memory is None, "multiprocessing.shared_memory is not available")
+    def test_shared_cache(self):
+        """
+        Test that a SharedSedCache attached to by handle contains the same
+        SEDs as the cache it was published from, and that readSED_flambda
+        reads SEDs from it correctly
+        """
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        name_list = [os.path.join(sed_dir, name) for name in sorted(os.listdir(sed_dir))]
+        sed_dict = dict((name, sed_module._read_sed_for_cache(name)) for name in name_list)
+
+        old_cache = sed_module._global_lsst_sed_cache
+        try:
+            sed_module._global_lsst_sed_cache = sed_dict
+            handle = sed_module.publish_LSST_sed_cache()
+            published = sed_module._global_lsst_sed_cache
+            self.assertIsInstance(published, SharedSedCache)
+            self.assertTrue(published.owner)
+
+            # attach as a worker process would
+            attached = SharedSedCache(handle)
+            self.assertFalse(attached.owner)
+            self.assertEqual(sorted(attached.keys()), name_list)
+            for name in name_list:
+                wavelen, flambda = attached[name]
+                np.testing.assert_array_equal(wavelen, sed_dict[name][0])
+                np.testing.assert_array_equal(flambda, sed_dict[name][1])
+                self.assertFalse(flambda.flags.writeable)
+            del wavelen, flambda
+            attached.close()
+
+            ss_cache = Sed()
+            ss_cache.readSED_flambda(name_list[1])
+            ss_uncache = Sed()
+            ss_uncache.readSED_flambda(name_list[1], cache_sed=False)
+            self.assertEqual(ss_cache, ss_uncache)
+            self.assertTrue(ss_cache.flambda.flags.writeable)
+        finally:
+            sed_module.release_LSST_sed_cache()
+            sed_module._global_lsst_sed_cache = old_cache
+
+        self.assertEqual(len(published), 0)
+        with self.assertRaises(FileNotFoundError):
+            SharedSedCache(handle)
+
+    def test_bounded_cache(self):
+        """
+        Test that BoundedSedCache evicts SEDs according to its limits
+        and policy, and that readSED_flambda respects those limits
+        """
+        wv = np.arange(100.0, 200.0, 1.0)
+        fl = np.ones(len(wv))
+        sed_bytes = wv.nbytes + fl.nbytes
+
+        cache = BoundedSedCache(max_entries=3)
+        for name in ('a', 'b', 'c'):
+            cache[name] = (wv, fl)
+        self.assertIsNotNone(cache.get('a'))
+        cache['d'] = (wv, fl)
+        self.assertEqual(sorted(cache.keys()), ['a', 'c', 'd'])
+        self.assertIsNone(cache.get('b'))
+        info = cache.info()
+        self.assertEqual(info['entries'], 3)
+        self.assertEqual(info['bytes'], 3*sed_bytes)
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['misses'], 1)
+        self.assertEqual(info['evictions'], 1)
+
+        cache = BoundedSedCache(max_entries=3, policy='fifo')
+        for name in ('a', 'b', 'c'):
+            cache[name] = (wv, fl)
+        self.assertIsNotNone(cache.get('a'))
+        cache['d'] = (wv, fl)
+        self.assertEqual(sorted(cache.keys()), ['b', 'c', 'd'])
+
+        cache = BoundedSedCache(max_bytes=2*sed_bytes)
+        for name in ('a', 'b', 'c'):
+            cache[name] = (wv, fl)
+        self.assertEqual(sorted(cache.keys()), ['b', 'c'])
+        # an SED that cannot fit in the cache is not stored
+        cache['big'] = (np.zeros(3*len(wv)), np.zeros(3*len(wv)))
+        self.assertEqual(sorted(cache.keys()), ['b', 'c'])
+        cache.set_limits(max_entries=1)
+        self.assertEqual(cache.keys(), ['c'])
+
+        with self.assertRaises(ValueError):
+            BoundedSedCache(policy='random')
+
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        sed_name_list = sorted(os.listdir(sed_dir))[:4]
+        old_cache = sed_module._global_misc_sed_cache
+        try:
+            sed_module._global_misc_sed_cache = None
+            sed_module.configure_misc_sed_cache(max_entries=2)
+            for sed_name in sed_name_list:
+                ss = Sed()
+                ss.readSED_flambda(os.path.join(sed_dir, sed_name))
+            info = sed_module.misc_sed_cache_info()
+            self.assertEqual(info['entries'], 2)
+            self.assertEqual(info['misses'], 4)
+            self.assertEqual(info['evictions'], 2)
+            ss = Sed()
+            ss.readSED_flambda(os.path.join(sed_dir, sed_name_list[-1]))
+            self.assertEqual(sed_module.misc_sed_cache_info()['hits'], 1)
+            sed_module.clear_misc_sed_cache()
+            info = sed_module.misc_sed_cache_info()
+            self.assertEqual(info['entries'], 0)
+            self.assertEqual(info['hits'], 0)
+            self.assertEqual(info['max_entries'], 2)
+        finally:
+            sed_module._global_misc_sed_cache = old_cache
+
+    def test_prefetch(self):
+        """
+        Test that prefetch_seds reads SEDs into the in-memory cache,
+        from which readSED_flambda then reads them
+        """
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        file_list = [os.path.join(sed_dir, sed_name.replace('.gz', ''))
+                     for sed_name in sorted(os.listdir(sed_dir))[:3]]
+        old_cache = sed_module._global_misc_sed_cache
+        try:
+            sed_module._global_misc_sed_cache = None
+            n_read = sed_module.prefetch_seds(file_list + file_list[:1] +
+                                              [os.path.join(sed_dir, 'not_a_file')],
+                                              n_workers=2)
+            self.assertEqual(n_read, 3)
+            info = sed_module.misc_sed_cache_info()
+            self.assertEqual(info['entries'], 3)
+            self.assertEqual(info['misses'], 0)
+
+            for file_name in file_list:
+                ss = Sed()
+                ss.readSED_flambda(file_name)
+                control_wavelen, control_flambda = read_ascii_columns(file_name + '.gz')
+                np.testing.assert_array_equal(ss.wavelen, control_wavelen)
+                np.testing.assert_array_equal(ss.flambda, control_flambda)
+            self.assertEqual(sed_module.misc_sed_cache_info()['hits'], 3)
+
+            # files already in the cache are not read again
+            self.assertEqual(sed_module.prefetch_seds(file_list), 0)
+
+            sed_module.clear_misc_sed_cache()
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                self.assertEqual(sed_module.prefetch_seds(file_list, executor=executor), 3)
+            self.assertEqual(sed_module.misc_sed_cache_info()['entries'], 3)
+        finally:
+            sed_module._global_misc_sed_cache = old_cache
+
+    def test_columnar_cache(self):
+        """
+        Test that SEDs written to the columnar cache format are read back
+        identically, both directly and through readSED_flambda
+        """
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        scratch_dir = tempfile.mkdtemp(prefix='test_columnar_cache',
+                                       dir=ROOT)
+
+        dtype = np.dtype([('wavelen', float), ('flambda', float)])
+        sed_dict = {}
+        for file_name in os.listdir(sed_dir):
+            full_name = os.path.join(sed_dir, file_name)
+            data = np.genfromtxt(full_name, dtype=dtype)
+            sed_dict[full_name] = (data['wavelen'], data['flambda'])
+
+        cache = write_columnar_sed_cache(sed_dict, os.path.join(scratch_dir, 'columnar'))
+        self.assertEqual(len(cache), len(sed_dict))
+        for name in sed_dict:
+            self.assertIn(name, cache)
+            np.testing.assert_array_equal(cache[name][0], sed_dict[name][0])
+            np.testing.assert_array_equal(cache[name][1], sed_dict[name][1])
+
+        # make sure readSED_flambda finds SEDs in the columnar cache
+        # and hands back writeable copies
+        sed_module._global_lsst_sed_cache = ColumnarSedCache(os.path.join(scratch_dir, 'columnar'))
+        try:
+            name = sorted(sed_dict.keys())[0]
+            ss = Sed()
+            ss.readSED_flambda(name)
+            np.testing.assert_array_equal(ss.wavelen, sed_dict[name][0])
+            np.testing.assert_array_equal(ss.flambda, sed_dict[name][1])
+            ss.flambda *= 2.0
+            np.testing.assert_array_equal(sed_module._global_lsst_sed_cache[name][1],
+                                          sed_dict[name][1])
+
+            # test truncation of the wavelength range
+            sed_module._global_lsst_sed_cache.set_wavelen_limits(300.0, 1100.0)
+            ss = Sed()
+            ss.readSED_flambda(name)
+            self.assertGreaterEqual(ss.wavelen.min(), 300.0)
+            self.assertLessEqual(ss.wavelen.max(), 1100.0)
+            valid = np.where(np.logical_and(sed_dict[name][0] >= 300.0,
+                                            sed_dict[name][0] <= 1100.0))
+            np.testing.assert_array_equal(ss.flambda, sed_dict[name][1][valid])
+        finally:
+            sed_module._global_lsst_sed_cache = None
+            if os.path.exists(scratch_dir):
+                shutil.rmtree(scratch_dir)
+
+    def test_sed_cache_shards(self):
+        """
+        Test that the shards used to generate the SED cache are written,
+        recognized as complete (or not), and read back correctly
+        """
+        sed_dir = os.path.join(getPackageDir('sims_photUtils'), 'tests',
+                               'cartoonSedTestData', 'starSed', 'kurucz')
+        scratch_dir = tempfile.mkdtemp(prefix='test_sed_cache_shards',
+                                       dir=ROOT)
+
+        file_list = [os.path.join(sed_dir, name) for name in os.listdir(sed_dir)]
+        file_list.append(os.path.join(sed_dir, 'not_a_file.gz'))
+        shard_list = _sed_shard_list(file_list, scratch_dir, 2)
+        self.assertEqual(len(shard_list), 3)
+        self.assertEqual(sorted(file_list), [name for shard in shard_list for name in shard[1]])
+
+        # simulate an interrupted generation in which only the
+        # first shard was written
+        self.assertEqual(_generate_sed_shard((shard_list[0][0], shard_list[0][1],
+                                              sed_module._read_sed_for_cache)), 2)
+        self.assertTrue(_sed_shard_is_complete(*shard_list[0]))
+        self.assertFalse(_sed_shard_is_complete(*shard_list[1]))
+        self.assertFalse(_sed_shard_is_complete(shard_list[0][0], shard_list[1][1]))
+
+        for shard_path, shard_files in shard_list[1:]:
+            _generate_sed_shard((shard_path, shard_files, sed_module._read_sed_for_cache))
+
+        cache = {}
+        for shard_path, shard_files in shard_list:
+            self.assertTrue(_sed_shard_is_complete(shard_path, shard_files))
+            cache.update(_read_sed_shard(shard_path))
+
+        # the file that does not exist should have been skipped
+        self.assertEqual(len(cache), len(file_list)-1)
+        for name in file_list[:-1]:
+            ss = Sed()
+            ss.readSED_flambda(name, cache_sed=False)
+            np.testing.assert_array_equal(cache[name][0], ss.wavelen)
+            np.testing.assert_array_equal(cache[name][1], ss.flambda)
+
+        if os.path.exists(scratch_dir):
+            shutil.rmtree(scratch_dir)
+
+    def test_sed_cache_manifest(self):
+        """
+        Test that the SED cache manifest detects added, changed and removed
+        files, and that a columnar cache can be patched in place
+        """
+        scratch_dir = tempfile.mkdtemp(prefix='test_sed_cache_manifest',
+                                       dir=ROOT)
+        sed_root = os.path.join(scratch_dir, 'library')
+        os.makedirs(sed_root)
+
+        rng = np.random.RandomState(77)
+        wv = np.arange(100.0, 1000.0, 10.0)
+
+        def write_sed(file_name, flux):
+            with gzip.open(os.path.join(sed_root, file_name), 'wt') as output_file:
+                for ww, ff in zip(wv, flux):
+                    output_file.write("%e %e\n" % (ww, ff))
+
+        for ix in range(4):
+            write_sed('sed_%d.gz' % ix, rng.random_sample(len(wv)))
+        file_list = [os.path.join(sed_root, 'sed_%d.gz' % ix) for ix in range(4)]
+
+        manifest_name = os.path.join(scratch_dir, 'manifest.txt')
+        old_manifest = _build_sed_manifest(sed_root, file_list)
+        _write_sed_manifest(old_manifest, sed_root, manifest_name)
+        root, manifest = _read_sed_manifest(manifest_name)
+        self.assertEqual(root, sed_root)
+        self.assertEqual(manifest, old_manifest)
+
+        cache = write_columnar_sed_cache(dict([(name, sed_module._read_sed_for_cache(name))
+                                               for name in file_list]),
+                                         os.path.join(scratch_dir, 'columnar'))
+
+        # change one file, remove one and add one
+        write_sed('sed_1.gz', rng.random_sample(len(wv)))
+        # the rewritten file has the same size; make sure its
+        # modification time differs even on coarse-grained file systems
+        os.utime(file_list[1], (0.0, 0.0))
+        os.unlink(file_list[2])
+        write_sed('sed_4.gz', rng.random_sample(len(wv)))
+        file_list = [os.path.join(sed_root, 'sed_%d.gz' % ix) for ix in (0, 1, 3, 4)]
+
+        new_manifest = _build_sed_manifest(sed_root, file_list, old_manifest=manifest)
+        added, changed, removed = _diff_sed_manifests(manifest, new_manifest)
+        self.assertEqual(added, ['sed_4.gz'])
+        self.assertEqual(changed, ['sed_1.gz'])
+        self.assertEqual(removed, ['sed_2.gz'])
+
+        cache.patch(dict([(os.path.join(sed_root, name),
+                           sed_module._read_sed_for_cache(os.path.join(sed_root, name)))
+                          for name in added + changed]),
+                    [os.path.join(sed_root, name) for name in removed])
+
+        reopened = ColumnarSedCache(os.path.join(scratch_dir, 'columnar'))
+        for test_cache in (cache, reopened):
+            self.assertEqual(sorted(test_cache.keys()), sorted(file_list))
+            for name in file_list:
+                control = sed_module._read_sed_for_cache(name)
+                np.testing.assert_array_equal(test_cache[name][0], control[0])
+                np.testing.assert_array_equal(test_cache[name][1], control[1])
+
+        # test moving the cache to a new root directory
+        cache.relocate(sed_root, os.path.join(scratch_dir, 'moved'))
+        self.assertIn(os.path.join(scratch_dir, 'moved', 'sed_4.gz'), cache)
+        self.assertNotIn(os.path.join(sed_root, 'sed_4.gz'), cache)
+
+        if os.path.exists(scratch_dir):
+            shutil.rmtree(scratch_dir)
+
+    def test_sed_cache_manifest_validation(self):
+        """
+        Test that the SED cache can be validated against its manifest
+        and that the validation fails if the cache and manifest disagree
+        """
+        scratch_dir = tempfile.mkdtemp(prefix='test_sed_cache_manifest_validation',
+                                       dir=ROOT)
+        sed_root = os.path.join(scratch_dir, 'library')
+        os.makedirs(os.path.join(sed_root, 'starSED'))
+
+        wv = np.arange(100.0, 1000.0, 10.0)
+        file_list = []
+        for ix in range(3):
+            file_name = os.path.join(sed_root, 'starSED', 'sed_%d.gz' % ix)
+            with gzip.open(file_name, 'wt') as output_file:
+                for ww in wv:
+                    output_file.write("%e %e\n" % (ww, ix + 1.0))
+            file_list.append(file_name)
+
+        cache_name = 'test_cache.p'
+        cache = dict([(name, sed_module._read_sed_for_cache(name)) for name in file_list])
+        _write_sed_manifest(_build_sed_manifest(sed_root, file_list), sed_root,
+                            sed_module._sed_manifest_name(scratch_dir, cache_name))
+        sed_module._write_sed_cache_version(scratch_dir, sed_root, cache_name)
+        version_dir, version_name, manifest_hash = sed_module._read_sed_cache_version(scratch_dir)
+        self.assertEqual(version_dir, sed_root)
+        self.assertEqual(version_name, cache_name)
+
+        old_cache = sed_module._global_lsst_sed_cache
+        try:
+            sed_module._global_lsst_sed_cache = cache
+            sed_module._validate_sed_cache_against_manifest(scratch_dir, cache_name,
+                                                            sed_root, manifest_hash)
+
+            # a star SED missing from the cache
+            sed_module._global_lsst_sed_cache = dict([(name, cache[name])
+                                                      for name in file_list[1:]])
+            with self.assertRaises(sed_module.SedCacheError):
+                sed_module._validate_sed_cache_against_manifest(scratch_dir, cache_name,
+                                                                sed_root, manifest_hash)
+
+            # a manifest that no longer matches its checksum
+            sed_module._global_lsst_sed_cache = cache
+            with open(sed_module._sed_manifest_name(scratch_dir, cache_name), 'a') as file_handle:
+                file_handle.write("extra.gz 1 1.0 abcd\n")
+            with self.assertRaises(sed_module.SedCacheError):
+                sed_module._validate_sed_cache_against_manifest(scratch_dir, cache_name,
+                                                                sed_root, manifest_hash)
+        finally:
+            sed_module._global_lsst_sed_cache = old_cache
+
+        if os.path.exists(scratch_dir):
+            shutil.rmtree(scratch_dir)
+
     def test_calcErgs(self):
         """
         Test that calcErgs actually calculates the flux of a source in
@@ -344,6 +890,170 @@ class SedBasicFunctionsTestCase(unittest.TestCase):
         self.assertAlmostEqual(ss.magFromFlux(flux)/mag, 1.0, 10)
         self.assertAlmostEqual(ss.fluxFromMag(mag)/flux, 1.0, 10)
 
+    def test_fnu_reuse(self):
+        """
+        Test that flambdaTofnu only recalculates fnu when wavelen, flambda
+        or fnu have been set since it last calculated fnu
+        """
+        wavelen = np.arange(100.0, 1500.0, 1.0)
+        flambda = np.exp(-0.5*np.power((wavelen-500.0)/100.0,2))
+
+        ss = Sed(wavelen=wavelen, flambda=flambda)
+        ss.flambdaTofnu()
+        fnu = ss.fnu
+        ss.flambdaTofnu()
+        self.assertIs(ss.fnu, fnu)
+        np.testing.assert_array_equal(fnu, ss.flambdaTofnu(wavelen, flambda)[1])
+
+        ss.flambda = 2.0*flambda
+        ss.flambdaTofnu()
+        self.assertIsNot(ss.fnu, fnu)
+        np.testing.assert_array_equal(ss.fnu, ss.flambdaTofnu(wavelen, 2.0*flambda)[1])
+
+        # fnu set directly (or the source of flambda) is recalculated from flambda
+        ss.fnu = fnu
+        ss.flambdaTofnu()
+        np.testing.assert_array_equal(ss.fnu, ss.flambdaTofnu(wavelen, 2.0*flambda)[1])
+
+        ss.multiplyFluxNorm(3.0)
+        control = Sed(wavelen=ss.wavelen, flambda=ss.flambda)
+        control.flambdaTofnu()
+        ss.flambdaTofnu()
+        np.testing.assert_array_equal(ss.fnu, control.fnu)
+
+        ss.redshiftSED(0.5)
+        control = Sed(wavelen=ss.wavelen, flambda=ss.flambda)
+        control.flambdaTofnu()
+        ss.flambdaTofnu()
+        np.testing.assert_array_equal(ss.fnu, control.fnu)
+
+    def test_in_place(self):
+        """
+        Test that the out/in_place modes of flambdaTofnu, fnuToflambda,
+        multiplyFluxNorm, addDust and redshiftSED give exactly the results
+        of the default modes, and only overwrite the arrays they should
+        """
+        rng = np.random.RandomState(8812)
+        wavelen = np.arange(250.0, 1200.0, 0.7)
+        flambda = rng.random_sample(len(wavelen))*1.0e-12
+        phys = Sed()._physParams
+        control_fnu = flambda*wavelen*wavelen*phys.nm2m/phys.lightspeed*phys.ergsetc2jansky
+
+        ss = Sed()
+        out = np.zeros(len(wavelen))
+        flambda_in = flambda.copy()
+        ww, fnu = ss.flambdaTofnu(wavelen, flambda_in, out=out)
+        self.assertIs(fnu, out)
+        np.testing.assert_array_equal(fnu, control_fnu)
+        np.testing.assert_array_equal(flambda_in, flambda)
+        self.assertIsNot(ss.flambdaTofnu(wavelen, flambda_in)[1], flambda_in)
+        ww, ff = ss.fnuToflambda(wavelen, fnu, out=fnu)
+        self.assertIs(ff, out)
+        np.testing.assert_array_equal(ff, ss.fnuToflambda(wavelen, control_fnu)[1])
+        with self.assertRaises(ValueError):
+            ss.flambdaTofnu(wavelen, flambda_in, out=wavelen)
+
+        # out receives fnu whether or not self.fnu is recalculated,
+        # but never becomes self.fnu
+        test_sed = Sed(wavelen=wavelen, flambda=flambda)
+        out = np.zeros(len(wavelen))
+        test_sed.flambdaTofnu(out=out)
+        self.assertIsNot(test_sed.fnu, out)
+        np.testing.assert_array_equal(out, control_fnu)
+        np.testing.assert_array_equal(test_sed.fnu, control_fnu)
+        other_out = np.zeros(len(wavelen))
+        test_sed.flambdaTofnu(out=other_out)
+        np.testing.assert_array_equal(other_out, control_fnu)
+        with self.assertRaises(ValueError):
+            test_sed.flambdaTofnu(out=test_sed.flambda)
+
+        # reusing out for another Sed leaves the first Sed's fnu alone
+        bandpass = Bandpass(wavelen=wavelen, sb=np.ones(len(wavelen)))
+        sed_a = Sed(wavelen=wavelen, flambda=flambda)
+        sed_b = Sed(wavelen=wavelen, flambda=flambda*3.0)
+        control_mag = Sed(wavelen=wavelen, flambda=flambda).calcMag(bandpass)
+        sed_a.flambdaTofnu(out=out)
+        sed_b.flambdaTofnu(out=out)
+        np.testing.assert_array_equal(sed_a.fnu, control_fnu)
+        self.assertEqual(sed_a.calcMag(bandpass), control_mag)
+        np.testing.assert_array_equal(out, sed_b.fnu)
+
+        # acting on self
+        for dimming in (False, True):
+            test_sed = Sed(wavelen=wavelen, flambda=flambda)
+            control_sed = Sed(wavelen=wavelen, flambda=flambda)
+            test_wavelen = test_sed.wavelen
+            test_flambda = test_sed.flambda
+
+            test_sed.multiplyFluxNorm(2.5e3, in_place=True)
+            control_sed.multiplyFluxNorm(2.5e3)
+            self.assertIs(test_sed.flambda, test_flambda)
+            np.testing.assert_array_equal(test_sed.flambda, control_sed.flambda)
+            np.testing.assert_array_equal(test_sed.fnu, control_sed.fnu)
+
+            a_x, b_x = test_sed.setupCCM_ab()
+            test_sed.addDust(a_x, b_x, A_v=0.3, in_place=True)
+            control_sed.addDust(a_x, b_x, A_v=0.3)
+            self.assertIs(test_sed.flambda, test_flambda)
+            np.testing.assert_array_equal(test_sed.flambda, control_sed.flambda)
+
+            test_sed.redshiftSED(0.7, dimming=dimming, in_place=True)
+            control_sed.redshiftSED(0.7, dimming=dimming)
+            self.assertIs(test_sed.wavelen, test_wavelen)
+            self.assertIs(test_sed.flambda, test_flambda)
+            np.testing.assert_array_equal(test_sed.wavelen, control_sed.wavelen)
+            np.testing.assert_array_equal(test_sed.flambda, control_sed.flambda)
+
+        # read-only arrays are replaced, not overwritten
+        read_only = flambda.copy()
+        read_only.flags.writeable = False
+        test_sed = Sed(wavelen=wavelen, flambda=flambda)
+        test_sed.flambda = read_only
+        test_sed.multiplyFluxNorm(2.5e3, in_place=True)
+        test_sed.redshiftSED(0.7, dimming=True, in_place=True)
+        self.assertIsNot(test_sed.flambda, read_only)
+        np.testing.assert_array_equal(read_only, flambda)
+
+        # passed arrays are only overwritten with in_place=True
+        for in_place in (False, True):
+            ww = wavelen.copy()
+            ff = flambda.copy()
+            ww_out, ff_out = ss.redshiftSED(-0.2, dimming=True, wavelen=ww, flambda=ff,
+                                            in_place=in_place)
+            ww_control, ff_control = ss.redshiftSED(-0.2, dimming=True, wavelen=wavelen,
+                                                    flambda=flambda)
+            np.testing.assert_array_equal(ww_out, ww_control)
+            np.testing.assert_array_equal(ff_out, ff_control)
+            self.assertEqual(ww_out is ww, in_place)
+            self.assertEqual(ff_out is ff, in_place)
+            control_fnu = ff*3.0
+            ww_out, fnu_out = ss.multiplyFluxNorm(3.0, wavelen=ww, fnu=ff, in_place=in_place)
+            self.assertEqual(fnu_out is ff, in_place)
+            np.testing.assert_array_equal(fnu_out, control_fnu)
+            if not in_place:
+                np.testing.assert_array_equal(ww, wavelen)
+                np.testing.assert_array_equal(ff, flambda)
+
+    def test_slots(self):
+        """
+        Test that Seds are slotted, share their PhysicalParameters,
+        still accept other attributes and survive pickling
+        """
+        wavelen = np.arange(100.0, 1500.0, 1.0)
+        flambda = np.exp(-0.5*np.power((wavelen-500.0)/100.0,2))
+        ss = Sed(wavelen=wavelen, flambda=flambda, name='test')
+        for name in ('_wavelen', '_flambda', '_fnu', 'zp', 'name', 'badval'):
+            self.assertIn(name, Sed.__slots__)
+            self.assertNotIn(name, ss.__dict__)
+        self.assertIs(ss._physParams, Sed()._physParams)
+
+        ss.flambdaTofnu()
+        ss.redshift = 0.3
+        unpickled = pickle.loads(pickle.dumps(ss))
+        self.assertEqual(unpickled, ss)
+        self.assertEqual(unpickled.zp, ss.zp)
+        self.assertEqual(unpickled.redshift, 0.3)
+
 
 class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
     pass
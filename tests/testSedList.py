@@ -3,11 +3,12 @@ from builtins import zip
 from builtins import range
 import unittest
 import os
+import sys
 import numpy as np
 import lsst.utils.tests
 from lsst.utils import getPackageDir
 
-from lsst.sims.photUtils import Bandpass, Sed, SedList
+from lsst.sims.photUtils import Bandpass, BandpassDict, Sed, SedList, SedMatrixList
 
 
 def setup_module(module):
@@ -291,6 +292,313 @@ class SedListTest(unittest.TestCase):
             np.testing.assert_array_equal(sedControl.flambda, sedTest.flambda)
             np.testing.assert_array_equal(sedControl.fnu, sedTest.fnu)
 
+    def testCacheView(self):
+        """
+        Test that a SedList that reads its Seds as views of the SED caches
+        gives the same results as one that copies them
+        """
+        imsimBand = Bandpass()
+        imsimBand.imsimBandpass()
+        nSed = 10
+        sedNameList = self.getListOfSedNames(nSed)
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        internalAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+        redshiftList = self.rng.random_sample(nSed)*5.0
+        galacticAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+
+        lists = []
+        for cacheView in (False, True):
+            lists.append(SedList(sedNameList, magNormList,
+                                 fileDir=self.sedDir,
+                                 internalAvList=internalAvList,
+                                 redshiftList=redshiftList,
+                                 galacticAvList=galacticAvList,
+                                 cacheView=cacheView))
+
+        for sedControl, sedTest in zip(lists[0], lists[1]):
+            np.testing.assert_array_equal(sedControl.wavelen, sedTest.wavelen)
+            np.testing.assert_array_equal(sedControl.flambda, sedTest.flambda)
+            np.testing.assert_array_equal(sedControl.fnu, sedTest.fnu)
+
+        # make sure that the cached SEDs were not modified
+        for name in sedNameList:
+            sedCache = Sed()
+            sedCache.readSED_flambda(os.path.join(self.sedDir, name+'.gz'))
+            sedDisk = Sed()
+            sedDisk.readSED_flambda(os.path.join(self.sedDir, name+'.gz'), cache_sed=False)
+            np.testing.assert_array_equal(sedCache.flambda, sedDisk.flambda)
+
+    def testReadOnlyWavelen(self):
+        """
+        Test that the Seds in a SedList with a wavelenMatch share its
+        read-only wavelen array, which can be replaced but not modified
+        """
+        nSed = 10
+        sedNameList = self.getListOfSedNames(nSed)
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        redshiftList = np.where(np.arange(nSed) % 2 == 0, 0.0,
+                                self.rng.random_sample(nSed)*2.0)
+        galacticAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+        wavelen_match = np.arange(300.0, 1500.0, 10.0)
+
+        for useResampledCache in (False, True):
+            testList = SedList(sedNameList, magNormList,
+                               fileDir=self.sedDir,
+                               redshiftList=redshiftList,
+                               galacticAvList=galacticAvList,
+                               wavelenMatch=wavelen_match,
+                               useResampledCache=useResampledCache)
+            self.assertFalse(testList.wavelenMatch.flags.writeable)
+            for sedObj in testList:
+                self.assertIs(sedObj.wavelen, testList.wavelenMatch)
+
+            sedObj = testList[1]
+            with self.assertRaises(ValueError):
+                sedObj.wavelen *= 1.5
+            np.testing.assert_array_equal(testList.wavelenMatch, wavelen_match)
+            sedObj.wavelen = sedObj.wavelen*1.5
+            np.testing.assert_array_equal(sedObj.wavelen, wavelen_match*1.5)
+            np.testing.assert_array_equal(testList[0].wavelen, wavelen_match)
+
+    def testResampledCache(self):
+        """
+        Test that a SedList that reads rest-frame Seds from the cache of
+        resampled Seds gives the same results as one that does not
+        """
+        nSed = 20
+        sedNameList = self.getListOfSedNames(nSed)
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        # make about half of the Seds rest-frame
+        internalAvList = np.where(self.rng.random_sample(nSed) > 0.5, 0.0,
+                                  self.rng.random_sample(nSed)*0.3 + 0.1)
+        redshiftList = np.where(self.rng.random_sample(nSed) > 0.5, 0.0,
+                                self.rng.random_sample(nSed)*5.0)
+        galacticAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+        wavelen_match = np.arange(300.0, 1500.0, 10.0)
+
+        normalizingBandpass = Bandpass()
+        normalizingBandpass.setBandpass(np.arange(400.0, 600.0, 1.0), np.ones(200))
+
+        for bp in (None, normalizingBandpass):
+            lists = []
+            for useResampledCache in (False, True):
+                lists.append(SedList(sedNameList, magNormList,
+                                     fileDir=self.sedDir,
+                                     normalizingBandpass=bp,
+                                     internalAvList=internalAvList,
+                                     redshiftList=redshiftList,
+                                     galacticAvList=galacticAvList,
+                                     wavelenMatch=wavelen_match,
+                                     useResampledCache=useResampledCache))
+
+            for sedControl, sedTest in zip(lists[0], lists[1]):
+                self.assertEqual(sedControl.name, sedTest.name)
+                np.testing.assert_array_equal(sedControl.wavelen, sedTest.wavelen)
+                np.testing.assert_allclose(sedControl.flambda, sedTest.flambda,
+                                           rtol=1.0e-12, atol=0.0)
+                if sedControl.fnu is None:
+                    self.assertIsNone(sedTest.fnu)
+                else:
+                    np.testing.assert_allclose(sedControl.fnu, sedTest.fnu,
+                                               rtol=1.0e-12, atol=0.0)
+
+    def testPrefetch(self):
+        """
+        Test that a SedList which prefetches its Sed files gives the same
+        results as one that does not, and that it reads each file once
+        """
+        sedModule = sys.modules['lsst.sims.photUtils.Sed']
+
+        nSed = 20
+        sedNameList = self.getListOfSedNames(nSed)
+        sedNameList[3] = 'None'
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        redshiftList = self.rng.random_sample(nSed)*2.0
+
+        controlList = SedList(sedNameList, magNormList, fileDir=self.sedDir,
+                              redshiftList=redshiftList)
+
+        old_cache = sedModule._global_misc_sed_cache
+        try:
+            sedModule._global_misc_sed_cache = None
+            testList = SedList(sedNameList[:10], magNormList[:10], fileDir=self.sedDir,
+                               redshiftList=redshiftList[:10], prefetchWorkers=3)
+            nUnique = len(set(sedNameList[:10]) - set(['None']))
+            info = sedModule.misc_sed_cache_info()
+            self.assertEqual(info['entries'], nUnique)
+            self.assertEqual(info['misses'], 0)
+
+            testList.loadSedsFromList(sedNameList[10:], magNormList[10:],
+                                      redshiftList=redshiftList[10:])
+            nUnique = len(set(sedNameList) - set(['None']))
+            info = sedModule.misc_sed_cache_info()
+            self.assertEqual(info['entries'], nUnique)
+            self.assertEqual(info['misses'], 0)
+        finally:
+            sedModule._global_misc_sed_cache = old_cache
+
+        self.assertEqual(len(testList), nSed)
+        for sedControl, sedTest in zip(controlList, testList):
+            self.assertEqual(sedControl.name, sedTest.name)
+            np.testing.assert_array_equal(sedControl.wavelen, sedTest.wavelen)
+            np.testing.assert_array_equal(sedControl.flambda, sedTest.flambda)
+
+    def testSedMatrixList(self):
+        """
+        Test that SedMatrixList stores the same Seds as SedList, as the
+        rows of its flambdaMatrix, as Seds are added to it
+        """
+        nSed = 10
+        wavelen_match = np.arange(300.0, 1500.0, 10.0)
+
+        with self.assertRaises(RuntimeError) as context:
+            SedMatrixList(self.getListOfSedNames(nSed), np.zeros(nSed), fileDir=self.sedDir)
+        self.assertIn('requires wavelenMatch', context.exception.args[0])
+
+        controlList = None
+        testList = None
+        for iteration in range(3):
+            sedNameList = self.getListOfSedNames(nSed)
+            sedNameList[iteration] = 'None'
+            magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+            internalAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+            redshiftList = self.rng.random_sample(nSed)*5.0
+            galacticAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+            if controlList is None:
+                controlList = SedList(sedNameList, magNormList, fileDir=self.sedDir,
+                                      internalAvList=internalAvList, redshiftList=redshiftList,
+                                      galacticAvList=galacticAvList, wavelenMatch=wavelen_match)
+                testList = SedMatrixList(sedNameList, magNormList, fileDir=self.sedDir,
+                                         internalAvList=internalAvList, redshiftList=redshiftList,
+                                         galacticAvList=galacticAvList, wavelenMatch=wavelen_match)
+            else:
+                for sedList in (controlList, testList):
+                    sedList.loadSedsFromList(sedNameList, magNormList,
+                                             internalAvList=internalAvList,
+                                             redshiftList=redshiftList,
+                                             galacticAvList=galacticAvList)
+
+            self.assertEqual(len(testList), len(controlList))
+            self.assertEqual(testList.flambdaMatrix.shape, (len(controlList), len(wavelen_match)))
+            for ix, (controlSed, testSed) in enumerate(zip(controlList, testList)):
+                self.assertEqual(controlSed.name, testSed.name)
+                if controlSed.wavelen is None:
+                    self.assertIsNone(testSed.wavelen)
+                    self.assertTrue(np.isnan(testList.flambdaMatrix[ix]).all())
+                    continue
+                np.testing.assert_array_equal(testSed.wavelen, controlSed.wavelen)
+                np.testing.assert_array_equal(testSed.flambda, controlSed.flambda)
+                np.testing.assert_array_equal(testList.flambdaMatrix[ix], controlSed.flambda)
+                self.assertIs(testSed.flambda.base, testList.flambdaMatrix.base)
+                controlSed.flambdaTofnu()
+                np.testing.assert_allclose(testList.fnuMatrix[ix], controlSed.fnu,
+                                           rtol=1.0e-12, atol=0.0)
+
+        testList.flush()
+        self.assertEqual(len(testList), 0)
+        self.assertEqual(testList.flambdaMatrix.shape, (0, len(wavelen_match)))
+
+    def testFluxDtype(self):
+        """
+        Test that SedLists (and SedMatrixLists) with fluxDtype=float32 store
+        float32 flambda, and that their magnitudes are within the documented
+        accuracy budget of those of float64 Seds
+        """
+        nSed = 20
+        wavelen_match = np.arange(300.0, 1500.0, 1.0)
+        bandpassList = []
+        for ix in range(4):
+            sb = np.where(np.abs(wavelen_match - 400.0 - 250.0*ix) < 100.0, 0.8, 0.0)
+            bandpassList.append(Bandpass(wavelen=wavelen_match, sb=sb))
+        bandpassDict = BandpassDict(bandpassList, ['a', 'b', 'c', 'd'])
+
+        sedNameList = self.getListOfSedNames(nSed)
+        sedNameList[3] = 'None'
+        magNormList = self.rng.random_sample(nSed)*5.0 + 15.0
+        redshiftList = self.rng.random_sample(nSed)*2.0
+        galacticAvList = self.rng.random_sample(nSed)*0.3 + 0.1
+        kwargs = dict(fileDir=self.sedDir, redshiftList=redshiftList,
+                      galacticAvList=galacticAvList, wavelenMatch=wavelen_match)
+
+        controlList = SedList(sedNameList, magNormList, **kwargs)
+        controlMags = bandpassDict.magListForSedList(controlList)
+        self.assertIsNone(controlList.fluxDtype)
+        for listClass in (SedList, SedMatrixList):
+            testList = listClass(sedNameList, magNormList, fluxDtype=np.float32, **kwargs)
+            self.assertEqual(testList.fluxDtype, np.float32)
+            for controlSed, testSed in zip(controlList, testList):
+                if controlSed.wavelen is None:
+                    self.assertIsNone(testSed.wavelen)
+                    continue
+                self.assertEqual(testSed.flambda.dtype, np.float32)
+                np.testing.assert_array_equal(testSed.flambda, controlSed.flambda.astype(np.float32))
+            if listClass is SedMatrixList:
+                self.assertEqual(testList.flambdaMatrix.dtype, np.float32)
+
+            testMags = bandpassDict.magListForSedList(testList)
+            np.testing.assert_array_equal(np.isnan(testMags), np.isnan(controlMags))
+            valid = ~np.isnan(controlMags)
+            self.assertLess(np.abs(testMags[valid] - controlMags[valid]).max(), 6.5e-8)
+
+    def testApplyAv(self):
+        """
+        Test that applyAv extincts Seds exactly as Sed.addDust does,
+        whether or not the Seds share a wavelength grid
+        """
+        wavelen_match = np.arange(300.0, 1500.0, 10.0)
+        testList = SedList([], [], wavelenMatch=wavelen_match)
+
+        sedNameList = self.getListOfSedNames(12)
+        avList = list(self.rng.random_sample(len(sedNameList))*0.3 + 0.1)
+        avList[2] = None
+        sedList = []
+        for ix, name in enumerate(sedNameList):
+            sedObj = Sed()
+            sedObj.readSED_flambda(os.path.join(self.sedDir, name + '.gz'))
+            if ix % 3 == 0:
+                # a Sed on its own grid
+                sedObj.resampleSED(wavelen_match=np.arange(350.0, 1400.0, 7.0))
+            elif ix % 3 == 1:
+                # a Sed on a copy of wavelen_match
+                sedObj.resampleSED(wavelen_match=wavelen_match)
+            else:
+                # a Sed sharing wavelen_match
+                sedObj.resampleSED(wavelen_match=wavelen_match)
+                sedObj.wavelen = wavelen_match
+            sedList.append(sedObj)
+        sedList.append(Sed())
+        avList.append(0.2)
+
+        controlList = []
+        for sedObj, av in zip(sedList, avList):
+            if sedObj.wavelen is None:
+                controlList.append(Sed())
+                continue
+            controlSed = Sed(wavelen=sedObj.wavelen, flambda=sedObj.flambda)
+            if av is not None:
+                a_x, b_x = controlSed.setupCCM_ab()
+                controlSed.addDust(a_x, b_x, A_v=av)
+            controlList.append(controlSed)
+
+        sedListModule = sys.modules['lsst.sims.photUtils.SedList']
+        old_block_rows = sedListModule._av_block_rows
+        try:
+            # make sure that Seds on the same grid are split into several blocks
+            sedListModule._av_block_rows = 3
+            dustWavelen, a_x, b_x = testList.applyAv(sedList, avList, None, None, None)
+        finally:
+            sedListModule._av_block_rows = old_block_rows
+        for sedObj, controlSed in zip(sedList, controlList):
+            if controlSed.wavelen is None:
+                self.assertIsNone(sedObj.wavelen)
+                continue
+            np.testing.assert_array_equal(sedObj.flambda, controlSed.flambda)
+            self.assertIsNone(sedObj.fnu)
+
+        # the returned coefficients can be passed back in
+        np.testing.assert_array_equal(a_x, Sed(wavelen=dustWavelen,
+                                               flambda=np.ones(len(dustWavelen))).setupCCM_ab()[0])
+
     def testAddingToList(self):
         """
         Test that we can add Seds to an already instantiated SedList
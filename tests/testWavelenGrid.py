@@ -0,0 +1,159 @@
+import unittest
+import numpy as np
+
+import lsst.utils.tests
+from lsst.sims.photUtils import Bandpass, BandpassDict, Sed, SedList
+from lsst.sims.photUtils import WavelenGrid, get_wavelen_grid, uniform_wavelen_grid
+
+
+def setup_module(module):
+    lsst.utils.tests.init()
+
+
+class WavelenGridTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(2213)
+        self.wavelen = np.arange(300.0, 1200.5, 0.5)
+
+    def test_grid(self):
+        """
+        Test that a WavelenGrid describes its grid and cannot be changed
+        """
+        grid = WavelenGrid(self.wavelen)
+        self.assertIsNot(grid.wavelen, self.wavelen)
+        np.testing.assert_array_equal(grid.wavelen, self.wavelen)
+        self.assertEqual(len(grid), len(self.wavelen))
+        self.assertEqual(grid.wavelenMin, 300.0)
+        self.assertEqual(grid.wavelenMax, 1200.0)
+        self.assertEqual(grid.wavelenStep, 0.5)
+        with self.assertRaises(ValueError):
+            grid.wavelen[3] = 1.0
+
+        irregular = WavelenGrid(np.sort(self.rng.random_sample(100))*900.0 + 300.0)
+        self.assertIsNone(irregular.wavelenStep)
+        self.assertFalse(irregular.matchesLimits(irregular.wavelenMin, irregular.wavelenMax, 0.5))
+
+        self.assertTrue(grid.matchesLimits(300.0, 1200.0, 0.5))
+        self.assertFalse(grid.matchesLimits(300.0, 1200.0, 1.0))
+        self.assertFalse(grid.matchesLimits(300.5, 1200.0, 0.5))
+
+        other = WavelenGrid(self.wavelen)
+        self.assertEqual(grid, other)
+        self.assertEqual(hash(grid), hash(other))
+        self.assertNotEqual(grid, irregular)
+
+        with self.assertRaises(ValueError):
+            WavelenGrid(self.wavelen[:1])
+
+    def test_get_wavelen_grid(self):
+        """
+        Test that get_wavelen_grid and uniform_wavelen_grid reuse grids
+        """
+        grid = get_wavelen_grid(self.wavelen)
+        self.assertIs(get_wavelen_grid(grid.wavelen), grid)
+        self.assertIs(get_wavelen_grid(grid), grid)
+        self.assertIsNot(get_wavelen_grid(self.wavelen), grid)
+
+        uniform = uniform_wavelen_grid(300.0, 1200.0, 0.5)
+        self.assertIs(uniform_wavelen_grid(300.0, 1200.0, 0.5), uniform)
+        np.testing.assert_array_equal(uniform.wavelen, self.wavelen)
+
+    def test_need_resample(self):
+        """
+        Test that Sed._needResample and Bandpass.needResample give the
+        same answers for WavelenGrids as for plain arrays
+        """
+        grid = WavelenGrid(self.wavelen)
+        nearby = self.wavelen + 1.0e-11
+        shifted = self.wavelen + 1.0e-3
+        sed = Sed()
+        for wavelen in (self.wavelen, nearby, shifted, self.wavelen[1:]):
+            control = sed._needResample(wavelen_match=self.wavelen, wavelen=wavelen.copy())
+            self.assertEqual(sed._needResample(wavelen_match=grid.wavelen, wavelen=wavelen), control)
+            self.assertEqual(sed._needResample(wavelen_match=wavelen, wavelen=grid.wavelen), control)
+            other = WavelenGrid(wavelen)
+            self.assertEqual(sed._needResample(wavelen_match=grid.wavelen, wavelen=other.wavelen), control)
+            self.assertEqual(grid.matches(other), not control)
+        self.assertFalse(sed._needResample(wavelen_match=self.wavelen, wavelen=nearby))
+        self.assertTrue(sed._needResample(wavelen_match=self.wavelen, wavelen=shifted))
+
+        for limits in ((300.0, 1200.0, 0.5), (300.0, 1200.0, 1.0), (300.0, 1100.0, 0.5)):
+            control = sed._needResample(wavelen=self.wavelen.copy(), wavelen_min=limits[0],
+                                        wavelen_max=limits[1], wavelen_step=limits[2])
+            self.assertEqual(sed._needResample(wavelen=grid.wavelen, wavelen_min=limits[0],
+                                               wavelen_max=limits[1], wavelen_step=limits[2]), control)
+
+        bandpass = Bandpass(wavelen_min=300.0, wavelen_max=1200.0, wavelen_step=0.5)
+        bandpass.setBandpass(self.wavelen, np.ones(len(self.wavelen)))
+        self.assertFalse(bandpass.needResample())
+        self.assertTrue(bandpass.needResample(wavelen=shifted))
+        self.assertFalse(bandpass.needResample(wavelen=uniform_wavelen_grid(300.0, 1200.0, 0.5).wavelen))
+
+    def test_writeable_wavelen(self):
+        """
+        Test that Seds and Bandpasses resampled onto a WavelenGrid get
+        writeable copies of its wavelength array, which callers may
+        modify in place
+        """
+        grid = uniform_wavelen_grid(300.0, 1200.0, 0.5)
+        wavelen = np.linspace(250.0, 1300.0, 3000)
+        sed = Sed(wavelen=wavelen, flambda=np.ones(len(wavelen)))
+        sed.resampleSED(wavelen_match=grid.wavelen)
+        self.assertIsNot(sed.wavelen, grid.wavelen)
+        np.testing.assert_array_equal(sed.wavelen, grid.wavelen)
+        sed.wavelen *= 1.5
+        wavelen_out, flambda_out = sed.resampleSED(wavelen=wavelen, flux=np.ones(len(wavelen)),
+                                                   wavelen_match=grid.wavelen)
+        wavelen_out *= 1.5
+
+        bandpass = Bandpass(wavelen_min=300.0, wavelen_max=1200.0, wavelen_step=0.5)
+        bandpass.setBandpass(wavelen, np.ones(len(wavelen)))
+        self.assertIsNot(bandpass.wavelen, grid.wavelen)
+        np.testing.assert_array_equal(bandpass.wavelen, grid.wavelen)
+        bandpass.wavelen *= 1.5
+        np.testing.assert_array_equal(grid.wavelen, self.wavelen)
+
+    def test_shared_grids(self):
+        """
+        Test that Seds loaded by a SedList share the wavelength array of its
+        grid (and of the grid of a BandpassDict it was made from), and that
+        photometry of Seds resampled onto those grids is unchanged
+        """
+        bandpass_list = []
+        for ix in range(3):
+            sb = np.where(np.abs(self.wavelen - 500.0 - 200.0*ix) < 80.0, 0.8, 0.0)
+            bandpass_list.append(Bandpass(wavelen=self.wavelen, sb=sb))
+        bandpass_dict = BandpassDict(bandpass_list, ['a', 'b', 'c'])
+        other_dict = BandpassDict(bandpass_list, ['a', 'b', 'c'])
+        self.assertEqual(get_wavelen_grid(bandpass_dict.wavelenMatch),
+                         get_wavelen_grid(other_dict.wavelenMatch))
+
+        wavelen = np.linspace(250.0, 1300.0, 3000)
+        flambda = 1.0e-10/(1.0 + ((wavelen - 600.0)/300.0)**2)
+        sed = Sed(wavelen=wavelen, flambda=flambda)
+        control_sed = Sed(wavelen=wavelen, flambda=flambda)
+        control_sed.resampleSED(wavelen_match=self.wavelen.copy())
+        sed.resampleSED(wavelen_match=bandpass_dict.wavelenMatch)
+        np.testing.assert_array_equal(sed.flambda, control_sed.flambda)
+        self.assertFalse(sed._needResample(wavelen_match=other_dict.wavelenMatch))
+        np.testing.assert_array_equal(bandpass_dict.magListForSed(sed),
+                                      bandpass_dict.magListForSed(control_sed))
+
+        sed_list = SedList([], [], wavelenMatch=bandpass_dict.wavelenMatch)
+        self.assertIs(sed_list.wavelenMatch, bandpass_dict.wavelenMatch)
+        list_sed = Sed(wavelen=wavelen, flambda=flambda)
+        sed_list.resampleToWavelenMatch([list_sed])
+        self.assertIs(list_sed.wavelen, bandpass_dict.wavelenMatch)
+        np.testing.assert_array_equal(list_sed.flambda, control_sed.flambda)
+        copied_list = SedList([], [], wavelenMatch=self.wavelen)
+        self.assertIsNot(copied_list.wavelenMatch, self.wavelen)
+        np.testing.assert_array_equal(copied_list.wavelenMatch, self.wavelen)
+
+
+class MemoryTestClass(lsst.utils.tests.MemoryTestCase):
+    pass
+
+if __name__ == "__main__":
+    lsst.utils.tests.init()
+    unittest.main()